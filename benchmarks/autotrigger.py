@@ -0,0 +1,75 @@
+"""
+Times finding the auto-trigger a message activates with `AutoTriggerMatcher`
+against checking every trigger one after the other, as before.
+
+Triggers are random eight letter words, the message is random text that
+matches none of them, the worst case for both.
+
+    python benchmarks/autotrigger.py --length 2000
+"""
+
+import argparse
+import random
+import re
+import string
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.autotrigger import AutoTriggerMatcher  # noqa: E402
+
+
+def per_call(func, number: int) -> float:
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def main(args) -> None:
+    random.seed(args.seed)
+    words = ["".join(random.choices(string.ascii_lowercase, k=8)) for _ in range(max(args.triggers))]
+    text = "".join(random.choices(string.ascii_lowercase + " ", k=args.length))
+
+    print(f"message of {args.length} characters")
+    print(f"{'triggers':>8} {'kind':<6} {'build':>10} {'matcher':>10} {'one by one':>12}")
+    for count in args.triggers:
+        triggers = {word: "reply" for word in words[:count]}
+        for regex in (False, True):
+            start = time.perf_counter()
+            matcher = AutoTriggerMatcher(triggers, regex=regex)
+            build = time.perf_counter() - start
+
+            if regex:
+
+                def naive():
+                    return next((t for t in triggers if re.search(t, text)), None)
+
+            else:
+
+                def naive():
+                    return next((t for t in triggers if t.lower() in text.lower()), None)
+
+            assert (matcher.match(text) or (None,))[0] == naive()
+            fast = per_call(lambda: matcher.match(text), args.number)
+            slow = per_call(naive, max(1, args.number // 10))
+            print(
+                f"{count:>8} {'regex' if regex else 'plain':<6} {build * 1e3:>8.2f}ms "
+                f"{fast * 1e6:>8.1f}us {slow * 1e6:>10.1f}us"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--length", type=int, default=2000, help="characters in the message")
+    parser.add_argument("--triggers", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--number", type=int, default=50, help="calls per timing")
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
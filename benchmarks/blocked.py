@@ -0,0 +1,91 @@
+"""
+Times `ModmailBot.is_blocked` for a user who isn't blocked, the common case,
+with and without remembering users found not blocked.
+
+Runs against a stand-in bot, no Discord connection or database is needed.
+
+    python benchmarks/blocked.py --roles 10 --blocked-roles 50
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+import discord
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bot import ModmailBot  # noqa: E402
+from core.blocklist import BlockList  # noqa: E402
+from core.config import ConfigManager  # noqa: E402
+
+
+class StandInBot:
+    """The parts of `ModmailBot` that `is_blocked` uses."""
+
+    is_blocked = ModmailBot.is_blocked
+    check_account_age = ModmailBot.check_account_age
+    check_guild_age = ModmailBot.check_guild_age
+    check_manual_blocked = ModmailBot.check_manual_blocked
+    check_manual_blocked_roles = ModmailBot.check_manual_blocked_roles
+    blocked_users = ModmailBot.blocked_users
+    blocked_whitelisted_users = ModmailBot.blocked_whitelisted_users
+
+    def __init__(self, member, blocked_roles: int):
+        self.config = ConfigManager(self)
+        self.config.populate_cache()
+        self.config["account_age"] = "P1D"
+        self.config["guild_age"] = "PT1H"
+        self.guild = SimpleNamespace(get_member=lambda user_id: member if user_id == member.id else None)
+        self.guilds = [self.guild]
+        self.blocks = BlockList(self)
+        for n in range(blocked_roles):
+            self.blocks._store({"id": str(10**6 + n), "kind": "role", "reason": "", "expires_at": None})
+
+
+async def per_call(func, number: int) -> float:
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(number):
+            await func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+async def main(args) -> None:
+    now = discord.utils.utcnow()
+    member = SimpleNamespace(
+        id=42,
+        name="user",
+        created_at=now - timedelta(days=365),
+        joined_at=now - timedelta(days=30),
+        roles=[discord.Object(id=n) for n in range(1, args.roles + 1)],
+    )
+    bot = StandInBot(member, args.blocked_roles)
+    user = discord.Object(id=member.id)
+
+    async def uncached():
+        bot.blocks.invalidate(member.id)
+        assert not await bot.is_blocked(user)
+
+    async def cached():
+        assert not await bot.is_blocked(user)
+
+    print(f"is_blocked, user with {args.roles} roles, {args.blocked_roles} blocked roles")
+    print(f"  checked every time  {await per_call(uncached, args.number) * 1e6:8.2f}us")
+    print(f"  remembered          {await per_call(cached, args.number) * 1e6:8.2f}us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--number", type=int, default=20000, help="calls per timing")
+    parser.add_argument("--roles", type=int, default=10, help="number of roles of the user")
+    parser.add_argument("--blocked-roles", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,71 @@
+"""
+Times `ConfigManager.get` with and without the cache of converted values,
+and checks that `update()` keeps that cache when nothing changed.
+
+No database is needed, writes go to a stand-in client.
+
+    python benchmarks/config.py
+"""
+
+import argparse
+import asyncio
+import sys
+import timeit
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.config import ConfigManager  # noqa: E402
+
+# one key of each kind of conversion
+KEYS = [
+    "main_color",
+    "account_age",
+    "recipient_thread_close",
+    "dm_disabled",
+    "snooze_default_duration",
+    "level_permissions",
+]
+
+
+async def update_config(data, *, unset=None, version=None):
+    pass
+
+
+def per_call(func, number: int) -> float:
+    return min(timeit.repeat(func, number=number, repeat=5)) / number
+
+
+async def main(args) -> None:
+    config = ConfigManager(SimpleNamespace(api=SimpleNamespace(update_config=update_config)))
+    config.populate_cache()
+
+    def cached():
+        for key in KEYS:
+            config.get(key)
+
+    def uncached():
+        for key in KEYS:
+            config._converted.clear()
+            config.get(key)
+
+    print(f"get, {len(KEYS)} keys of every kind")
+    print(f"  converted every time  {per_call(uncached, args.number) / len(KEYS) * 1e6:8.2f}us per get")
+    print(f"  cached                {per_call(cached, args.number) / len(KEYS) * 1e6:8.2f}us per get")
+
+    cached()
+    generation = config.generation
+    await config.update(flush=True)
+    print(f"update() without changes keeps the cache: {config.generation == generation}")
+    config["main_color"] = "#123456"
+    await config.update(flush=True)
+    print(f"update() after a change invalidates it:    {config.generation != generation}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--number", type=int, default=20000, help="calls per timing")
+    asyncio.run(main(parser.parse_args()))
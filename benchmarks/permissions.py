@@ -0,0 +1,88 @@
+"""
+Times `check_permissions` with and without the permission decision cache.
+When the cached decisions are dropped is tested in tests/test_permissions.py.
+
+Runs against a stand-in bot and context, no Discord connection is needed.
+
+    python benchmarks/permissions.py
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import discord
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bot import ModmailBot  # noqa: E402
+from core.checks import (  # noqa: E402
+    PermissionCache,
+    _check_permissions,
+    check_permissions,
+    has_permissions_predicate,
+)
+from core.config import ConfigManager  # noqa: E402
+from core.models import PermissionLevel  # noqa: E402
+
+
+class Member:
+    def __init__(self, id_: int, roles: list):
+        self.id = id_
+        self.roles = roles
+
+
+def make_context(roles: int):
+    guild = SimpleNamespace(id=1)
+    command = SimpleNamespace(checks=[has_permissions_predicate(PermissionLevel.SUPPORTER)])
+
+    async def is_owner(user):
+        return False
+
+    bot = SimpleNamespace(
+        config=ConfigManager(None),
+        permission_cache=PermissionCache(),
+        user=SimpleNamespace(id=0),
+        modmail_guild=guild,
+        is_owner=is_owner,
+        get_command=lambda name: command,
+    )
+    bot.config.populate_cache()
+    bot.command_perm = lambda name: ModmailBot.command_perm(bot, name)
+    bot.config["level_permissions"] = {"SUPPORTER": [str(roles)]}
+
+    author = Member(42, [discord.Object(id=n) for n in range(1, roles + 1)])
+    channel = SimpleNamespace(permissions_for=lambda member: SimpleNamespace(administrator=False))
+    return SimpleNamespace(bot=bot, author=author, guild=guild, channel=channel)
+
+
+async def per_call(func, number: int) -> float:
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(number):
+            await func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+async def main(args) -> None:
+    ctx = make_context(args.roles)
+
+    uncached = await per_call(lambda: _check_permissions(ctx, "reply"), args.number)
+    cached = await per_call(lambda: check_permissions(ctx, "reply"), args.number)
+    print(f"check_permissions, author with {args.roles} roles")
+    print(f"  uncached  {uncached * 1e6:8.2f}us")
+    print(f"  cached    {cached * 1e6:8.2f}us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--number", type=int, default=20000, help="calls per timing")
+    parser.add_argument("--roles", type=int, default=10, help="number of roles of the author")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,127 @@
+"""
+Compares log searches through the search index with MongoDB's `$text` index.
+
+Fills a throwaway database with synthetic closed logs, indexes their
+messages both ways, then times the same queries against each. The
+database is dropped afterwards.
+
+    python benchmarks/search.py mongodb://localhost:27017 --logs 5000
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import string
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from motor.motor_asyncio import AsyncIOMotorClient  # noqa: E402
+
+from core.search import SearchIndex, rank  # noqa: E402
+
+GUILD_ID = "0"
+
+
+def vocabulary(size: int) -> list:
+    return ["".join(random.choices(string.ascii_lowercase, k=random.randint(3, 10))) for _ in range(size)]
+
+
+def make_logs(count: int, words: list, messages: int) -> list:
+    # word frequencies follow Zipf's law, like in real conversations
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+    logs = []
+    for n in range(count):
+        logs.append(
+            {
+                "key": f"{n:012x}",
+                "guild_id": GUILD_ID,
+                "open": False,
+                "messages": [
+                    {
+                        "message_id": f"{n}-{m}",
+                        "author": {"name": random.choice(words[:200])},
+                        "content": " ".join(random.choices(words, weights, k=random.randint(3, 30))),
+                    }
+                    for m in range(random.randint(1, messages))
+                ],
+            }
+        )
+    return logs
+
+
+async def timed(func, repeat: int) -> float:
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await func()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+async def main(args) -> None:
+    random.seed(args.seed)
+    client = AsyncIOMotorClient(args.uri)
+    db = client[args.database]
+    await client.drop_database(args.database)
+    try:
+        words = vocabulary(args.vocabulary)
+        logs = make_logs(args.logs, words, args.messages)
+        await db.logs.insert_many(logs)
+        await db.logs.create_index(
+            [("messages.content", "text"), ("messages.author.name", "text"), ("key", "text")]
+        )
+        index = SearchIndex(db.search_index)
+        await db.search_index.create_index([("token", 1), ("key", 1)])
+        start = time.perf_counter()
+        for i in range(0, len(logs), 100):
+            await index.add({log["key"]: log["messages"] for log in logs[i : i + 100]})
+        print(
+            f"{args.logs} logs, {sum(len(log['messages']) for log in logs)} messages, "
+            f"search index built in {time.perf_counter() - start:.1f}s"
+        )
+
+        queries = {
+            "common word": words[0],
+            "rare word": words[-1],
+            "two words": f"{words[1]} {words[50]}",
+            "prefix": words[5][:3] + "*",
+        }
+        print(f"{'query':<12} {'$text':>10} {'index':>10}")
+        for name, query in queries.items():
+
+            async def text():
+                # the way `?logs search` queries `$text`, as a phrase
+                search = {"guild_id": GUILD_ID, "open": False, "$text": {"$search": f'"{query}"'}}
+                await db.logs.find(search, {"key": 1}).to_list(None)
+
+            async def indexed():
+                await rank(index, query, len(logs))
+
+            # `$text` has no prefix search
+            text_time = await timed(text, args.repeat) if not query.endswith("*") else None
+            index_time = await timed(indexed, args.repeat)
+            print(
+                f"{name:<12} "
+                + (f"{text_time * 1000:>8.2f}ms" if text_time is not None else f"{'-':>10}")
+                + f" {index_time * 1000:>8.2f}ms"
+            )
+    finally:
+        await client.drop_database(args.database)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("uri", help="MongoDB connection string")
+    parser.add_argument("--database", default="modmail_benchmark", help="throwaway database, dropped")
+    parser.add_argument("--logs", type=int, default=5000)
+    parser.add_argument("--messages", type=int, default=50, help="maximum number of messages per log")
+    parser.add_argument("--vocabulary", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
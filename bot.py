@@ -5,13 +5,13 @@ import asyncio
 import copy
 import hashlib
 import os
-import re
 import string
 import struct
 import sys
 import platform
+import time
 import typing
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from subprocess import PIPE
 from types import SimpleNamespace
 
@@ -33,11 +33,14 @@ except ImportError:
     pass
 
 from core import checks
+from core.autotrigger import AutoTriggerMatcher
+from core.blocklist import BlockList
 from core.changelog import Changelog
-from core.clients import ApiClient, MongoDBClient, PluginDatabaseClient
+from core.clients import ApiClient, MongoDBClient, PluginDatabaseClient, SQLiteClient
 from core.config import ConfigManager
 from core.models import (
     DMDisabled,
+    Default,
     HostingMethod,
     InvalidConfigError,
     PermissionLevel,
@@ -45,12 +48,14 @@ from core.models import (
     configure_logging,
     getLogger,
 )
+from core.profiler import StartupProfiler, format_report
+from core.reconcile import StartupReconciler
 from core.thread import ThreadManager
 from core.time import human_timedelta
 from core.utils import (
-    extract_block_timestamp,
+    NgramIndex,
+    compile_alias,
     normalize_alias,
-    parse_alias,
     truncate,
     tryint,
     human_join,
@@ -72,6 +77,7 @@ if sys.platform == "win32":
 
 class ModmailBot(commands.Bot):
     def __init__(self):
+        self.startup_profiler = StartupProfiler()
         self.config = ConfigManager(self)
         self.config.populate_cache()
 
@@ -80,6 +86,7 @@ class ModmailBot(commands.Bot):
             intents.presences = False
 
         super().__init__(command_prefix=None, intents=intents)  # implemented in `get_prefix`
+        self.startup_profiler.watch_http(self.http)
         self.session = None
         self._api = None
         self.formatter = SafeFormatter()
@@ -94,7 +101,17 @@ class ModmailBot(commands.Bot):
         self._started = False
 
         self.threads = ThreadManager(self)
+        self.blocks = BlockList(self)
+        self.permission_cache = checks.PermissionCache()
+        self._auto_trigger_matcher = None
+        self._auto_trigger_generation = None
+        self._name_indexes = {}  # config key -> NgramIndex of its names
         self._message_queues = {}  # User ID -> asyncio.Queue for message ordering
+        # guild messages triaged by on_message, those dropped, and the time spent deciding
+        self.messages_triaged = 0
+        self.messages_dropped = 0
+        self.triage_time = 0.0
+        self.triage_log_interval = 10000  # messages between triage counter log lines
 
         log_dir = os.path.join(temp_dir, "logs")
         if not os.path.exists(log_dir):
@@ -134,7 +151,7 @@ class ModmailBot(commands.Bot):
             return name
 
         try:
-            (command,) = parse_alias(self.aliases[name])
+            (command,) = compile_alias(self.aliases[name])
         except (KeyError, ValueError):
             # There is either no alias by this name present or the
             # alias has multiple steps.
@@ -194,12 +211,23 @@ class ModmailBot(commands.Bot):
                 continue
             logger.debug("Loading %s.", cog)
             try:
-                await self.load_extension(cog)
+                with self.startup_profiler.phase(f"load {cog}"):
+                    await self.load_extension(cog)
                 logger.debug("Successfully loaded %s.", cog)
             except Exception:
                 logger.exception("Failed to load %s.", cog)
         logger.line("debug")
 
+    async def add_cog(self, cog, /, **kwargs) -> None:
+        await super().add_cog(cog, **kwargs)
+        # commands may have been replaced, with other permission levels
+        self.permission_cache.invalidate()
+
+    async def remove_cog(self, name, /, **kwargs):
+        cog = await super().remove_cog(name, **kwargs)
+        self.permission_cache.invalidate()
+        return cog
+
     @property
     def version(self):
         return Version(__version__)
@@ -207,7 +235,9 @@ class ModmailBot(commands.Bot):
     @property
     def api(self) -> ApiClient:
         if self._api is None:
-            if self.config["database_type"].lower() == "mongodb":
+            if (self.config["connection_uri"] or "").startswith("sqlite://"):
+                self._api = SQLiteClient(self)
+            elif self.config["database_type"].lower() == "mongodb":
                 self._api = MongoDBClient(self)
             else:
                 logger.critical("Invalid database type.")
@@ -226,7 +256,9 @@ class ModmailBot(commands.Bot):
         async def runner():
             async with self:
                 self._connected = asyncio.Event()
-                self.session = ClientSession(loop=self.loop)
+                self.session = ClientSession(
+                    loop=self.loop, trace_configs=[self.startup_profiler.trace_config()]
+                )
 
                 if self.config["enable_presence_intent"]:
                     logger.info("Starting bot with presence intent.")
@@ -291,6 +323,19 @@ class ModmailBot(commands.Bot):
             finally:
                 logger.info("Closing the event loop.")
 
+    async def close(self):
+        if self._api is not None:
+            try:
+                await self._api.flush_logs()
+            except Exception:
+                logger.error("Failed to flush pending log messages.", exc_info=True)
+            try:
+                await self.config.close()
+            except Exception:
+                logger.error("Failed to write pending configurations.", exc_info=True)
+            await self._api.close()
+        await super().close()
+
     @property
     def bot_owner_ids(self):
         owner_ids = self.config["owners"]
@@ -385,6 +430,39 @@ class ModmailBot(commands.Bot):
     def auto_triggers(self) -> typing.Dict[str, str]:
         return self.config["auto_triggers"]
 
+    @property
+    def auto_trigger_matcher(self) -> AutoTriggerMatcher:
+        regex = self.config.get("use_regex_autotrigger")
+        matcher = self._auto_trigger_matcher
+        if matcher is None or matcher.regex != regex:
+            return self.rebuild_auto_triggers()
+        if self._auto_trigger_generation != self.config.generation:
+            # the triggers may have been changed elsewhere
+            self._auto_trigger_generation = self.config.generation
+            if matcher.triggers != self.auto_triggers:
+                return self.rebuild_auto_triggers()
+        return matcher
+
+    def name_index(self, key: str) -> NgramIndex:
+        """
+        An index of the names of a config, such as `snippets`, to suggest close names.
+
+        It's rebuilt when the names changed since it was last used.
+        """
+        names = self.config[key]
+        index = self._name_indexes.get(key)
+        if index is None or index.names != names.keys():
+            index = self._name_indexes[key] = NgramIndex(names)
+        return index
+
+    def rebuild_auto_triggers(self) -> AutoTriggerMatcher:
+        """Compiles the auto-triggers again, to be called after they're changed."""
+        self._auto_trigger_matcher = AutoTriggerMatcher(
+            self.auto_triggers, regex=self.config.get("use_regex_autotrigger")
+        )
+        self._auto_trigger_generation = self.config.generation
+        return self._auto_trigger_matcher
+
     @property
     def token(self) -> str:
         token = self.config["token"]
@@ -460,12 +538,14 @@ class ModmailBot(commands.Bot):
         return None
 
     @property
-    def blocked_users(self) -> typing.Dict[str, str]:
-        return self.config["blocked"]
+    def blocked_users(self) -> typing.Mapping[str, str]:
+        """The reasons of the blocked users, by ID, read-only. Change blocks through `blocks`."""
+        return self.blocks.reasons("user")
 
     @property
-    def blocked_roles(self) -> typing.Dict[str, str]:
-        return self.config["blocked_roles"]
+    def blocked_roles(self) -> typing.Mapping[str, str]:
+        """The reasons of the blocked roles, by ID, read-only. Change blocks through `blocks`."""
+        return self.blocks.reasons("role")
 
     @property
     def blocked_whitelisted_users(self) -> typing.List[str]:
@@ -514,16 +594,24 @@ class ModmailBot(commands.Bot):
         return level
 
     async def on_connect(self):
-        try:
-            await self.api.validate_database_connection()
-        except Exception:
-            logger.debug("Logging out due to failed database connection.")
-            return await self.close()
-
-        logger.debug("Connected to gateway.")
-        await self.config.refresh()
-        await self.api.setup_indexes()
-        await self.load_extensions()
+        with self.startup_profiler.phase("on_connect"):
+            try:
+                with self.startup_profiler.phase("validate database"):
+                    await self.api.validate_database_connection()
+            except Exception:
+                logger.debug("Logging out due to failed database connection.")
+                return await self.close()
+
+            logger.debug("Connected to gateway.")
+            with self.startup_profiler.phase("config refresh"):
+                await self.config.refresh()
+            self.config.start_watching()
+            with self.startup_profiler.phase("setup indexes"):
+                await self.api.setup_indexes()
+            with self.startup_profiler.phase("load blocks"):
+                await self.blocks.load()
+            with self.startup_profiler.phase("load extensions"):
+                await self.load_extensions()
         self._connected.set()
 
     async def on_ready(self):
@@ -565,86 +653,41 @@ class ModmailBot(commands.Bot):
             )
             logger.line()
 
-        await self.threads.populate_cache()
-
-        # closures
-        closures = self.config["closures"]
-        logger.info("There are %d thread(s) pending to be closed.", len(closures))
-        logger.line()
-
-        for recipient_id, items in tuple(closures.items()):
-            after = (
-                datetime.fromisoformat(items["time"]).astimezone(timezone.utc) - discord.utils.utcnow()
-            ).total_seconds()
-            if after <= 0:
-                logger.debug("Closing thread for recipient %s.", recipient_id)
-                after = 0
-            else:
-                logger.debug(
-                    "Thread for recipient %s will be closed after %s seconds.",
-                    recipient_id,
-                    after,
-                )
-
-            thread = await self.threads.find(recipient_id=int(recipient_id))
-
-            if not thread:
-                # If the channel is deleted
-                logger.debug("Failed to close thread for recipient %s.", recipient_id)
-                self.config["closures"].pop(recipient_id)
-                await self.config.update()
-                continue
-
-            await thread.close(
-                closer=await self.get_or_fetch_user(items["closer_id"]),
-                after=after,
-                silent=items["silent"],
-                delete_channel=items["delete_channel"],
-                message=items["message"],
-                auto_close=items.get("auto_close", False),
-            )
+        with self.startup_profiler.phase("on_ready"):
+            # threads are found on demand until the cache is warmed up
+            self.loop.create_task(self.threads.populate_cache())
 
-        for log in await self.api.get_open_logs():
-            if log.get("channel_id") is None or self.get_channel(int(log["channel_id"])) is None:
-                logger.debug("Unable to resolve thread with channel %s.", log["channel_id"])
-                log_data = await self.api.post_log(
-                    log["channel_id"],
-                    {
-                        "open": False,
-                        "title": None,
-                        "closed_at": str(discord.utils.utcnow()),
-                        "close_message": "Channel has been deleted, no closer found.",
-                        "closer": {
-                            "id": str(self.user.id),
-                            "name": self.user.name,
-                            "discriminator": self.user.discriminator,
-                            "avatar_url": self.user.display_avatar.url,
-                            "mod": True,
-                        },
-                    },
+            other_guilds = [guild for guild in self.guilds if guild not in {self.guild, self.modmail_guild}]
+            if any(other_guilds):
+                logger.warning(
+                    "The bot is in more servers other than the main and staff server. "
+                    "This may cause data compromise (%s).",
+                    ", ".join(str(guild.name) for guild in other_guilds),
                 )
-                if log_data:
-                    logger.debug("Successfully closed thread with channel %s.", log["channel_id"])
-                else:
-                    logger.debug(
-                        "Failed to close thread with channel %s, skipping.",
-                        log["channel_id"],
-                    )
-
-        other_guilds = [guild for guild in self.guilds if guild not in {self.guild, self.modmail_guild}]
-        if any(other_guilds):
-            logger.warning(
-                "The bot is in more servers other than the main and staff server. "
-                "This may cause data compromise (%s).",
-                ", ".join(str(guild.name) for guild in other_guilds),
-            )
-            logger.warning("If the external servers are valid, you may ignore this message.")
+                logger.warning("If the external servers are valid, you may ignore this message.")
 
         self.post_metadata.start()
         self.autoupdate.start()
         self.log_expiry.start()
         self._started = True
 
+        # scheduled closes, snoozes and orphaned logs are caught up in the background
+        self.loop.create_task(self.reconcile())
+
+    async def reconcile(self) -> None:
+        """Reconciles the stored state with Discord, then writes the startup report."""
+        with self.startup_profiler.phase("reconcile"):
+            await StartupReconciler(self).run()
+        logger.line()
+
+        report = self.startup_profiler.finish(__version__)
+        logger.info("Startup took %.2fs:\n%s", report["total"], format_report(report))
+        logger.line()
+        try:
+            await self.api.save_startup_report(report)
+        except Exception:
+            logger.warning("Failed to save the startup report.", exc_info=True)
+
     async def convert_emoji(self, name: str) -> str:
         ctx = SimpleNamespace(bot=self, guild=self.modmail_guild)
         converter = commands.EmojiConverter()
@@ -698,7 +741,7 @@ class ModmailBot(commands.Bot):
 
         return sent_emoji, blocked_emoji
 
-    def check_account_age(self, author: discord.Member) -> bool:
+    async def check_account_age(self, author: discord.Member) -> bool:
         account_age = self.config.get("account_age")
         now = discord.utils.utcnow()
 
@@ -713,14 +756,14 @@ class ModmailBot(commands.Bot):
             delta = human_timedelta(min_account_age)
             logger.debug("Blocked due to account age, user %s.", author.name)
 
-            if str(author.id) not in self.blocked_users:
+            if self.blocks.get("user", author.id) is None:
                 new_reason = f"System Message: New Account. User can try again {delta}."
-                self.blocked_users[str(author.id)] = new_reason
+                await self.blocks.add("user", author.id, new_reason, expires_at=min_account_age)
 
             return False
         return True
 
-    def check_guild_age(self, author: discord.Member) -> bool:
+    async def check_guild_age(self, author: discord.Member) -> bool:
         guild_age = self.config.get("guild_age")
         now = discord.utils.utcnow()
 
@@ -739,9 +782,9 @@ class ModmailBot(commands.Bot):
             delta = human_timedelta(min_guild_age)
             logger.debug("Blocked due to guild age, user %s.", author.name)
 
-            if str(author.id) not in self.blocked_users:
+            if self.blocks.get("user", author.id) is None:
                 new_reason = f"System Message: Recently Joined. User can try again {delta}."
-                self.blocked_users[str(author.id)] = new_reason
+                await self.blocks.add("user", author.id, new_reason, expires_at=min_guild_age)
 
             return False
         return True
@@ -749,48 +792,14 @@ class ModmailBot(commands.Bot):
     def check_manual_blocked_roles(self, author: discord.Member) -> bool:
         if isinstance(author, discord.Member):
             for r in author.roles:
-                if str(r.id) in self.blocked_roles:
-                    blocked_reason = self.blocked_roles.get(str(r.id)) or ""
-
-                    try:
-                        end_time, after = extract_block_timestamp(blocked_reason, author.id)
-                    except ValueError:
-                        return False
-
-                    if end_time is not None:
-                        if after <= 0:
-                            # No longer blocked
-                            self.blocked_roles.pop(str(r.id))
-                            logger.debug("No longer blocked, role %s.", r.name)
-                            return True
+                if self.blocks.get("role", r.id) is not None:
                     logger.debug("User blocked, role %s.", r.name)
                     return False
-
         return True
 
     def check_manual_blocked(self, author: discord.Member) -> bool:
-        if str(author.id) not in self.blocked_users:
+        if self.blocks.get("user", author.id) is None:
             return True
-
-        blocked_reason = self.blocked_users.get(str(author.id)) or ""
-
-        if blocked_reason.startswith("System Message:"):
-            # Met the limits already, otherwise it would've been caught by the previous checks
-            logger.debug("No longer internally blocked, user %s.", author.name)
-            self.blocked_users.pop(str(author.id))
-            return True
-
-        try:
-            end_time, after = extract_block_timestamp(blocked_reason, author.id)
-        except ValueError:
-            return False
-
-        if end_time is not None:
-            if after <= 0:
-                # No longer blocked
-                self.blocked_users.pop(str(author.id))
-                logger.debug("No longer blocked, user %s.", author.name)
-                return True
         logger.debug("User blocked, user %s.", author.name)
         return False
 
@@ -808,6 +817,10 @@ class ModmailBot(commands.Bot):
         channel: discord.TextChannel = None,
         send_message: bool = False,
     ) -> bool:
+        if self.blocks.is_allowed(author.id):
+            return False
+        token = self.blocks.decision_token()
+
         member = self.guild.get_member(author.id)
         if member is None:
             # try to find in other guilds
@@ -823,14 +836,15 @@ class ModmailBot(commands.Bot):
             author = member
 
         if str(author.id) in self.blocked_whitelisted_users:
-            if str(author.id) in self.blocked_users:
-                self.blocked_users.pop(str(author.id))
-                await self.config.update()
+            if self.blocks.get("user", author.id) is not None:
+                await self.blocks.remove("user", author.id)
+            self.blocks.allow(author.id, token)
             return False
 
-        blocked_reason = self.blocked_users.get(str(author.id)) or ""
+        block = self.blocks.get("user", author.id)
+        blocked_reason = block["reason"] if block is not None else ""
 
-        if not self.check_account_age(author) or not self.check_guild_age(author):
+        if not await self.check_account_age(author) or not await self.check_guild_age(author):
             new_reason = self.blocked_users.get(str(author.id))
             if new_reason != blocked_reason:
                 if send_message:
@@ -843,13 +857,18 @@ class ModmailBot(commands.Bot):
                     )
             return True
 
+        if blocked_reason.startswith("System Message:"):
+            # Met the limits already, otherwise it would've been caught by the previous checks
+            logger.debug("No longer internally blocked, user %s.", author.name)
+            await self.blocks.remove("user", author.id)
+
         if not self.check_manual_blocked(author):
             return True
 
         if not self.check_manual_blocked_roles(author):
             return True
 
-        await self.config.update()
+        self.blocks.allow(author.id, token)
         return False
 
     async def get_thread_cooldown(self, author: discord.Member):
@@ -859,16 +878,11 @@ class ModmailBot(commands.Bot):
         if thread_cooldown == isodate.Duration():
             return
 
-        last_log = await self.api.get_latest_user_logs(author.id)
-
-        if last_log is None:
-            logger.debug("Last thread wasn't found, %s.", author.name)
-            return
-
-        last_log_closed_at = last_log.get("closed_at")
+        stats = await self.api.get_user_stats(author.id)
+        last_log_closed_at = stats.get("last_closed_at")
 
         if not last_log_closed_at:
-            logger.debug("Last thread was not closed, %s.", author.name)
+            logger.debug("No closed thread was found, %s.", author.name)
             return
 
         try:
@@ -1258,15 +1272,19 @@ class ModmailBot(commands.Bot):
 
         return self.get_command(f"{modifiers}reply")
 
-    async def get_contexts(self, message, *, cls=commands.Context):
+    async def get_contexts(self, message, *, cls=commands.Context, thread=Default):
         """
         Returns all invocation contexts from the message.
         Supports getting the prefix from database as well as command aliases.
+
+        `thread` is the thread of the message channel, when already known.
         """
 
         view = StringView(message.content)
         ctx = cls(prefix=self.prefix, view=view, bot=self, message=message)
-        thread = await self.threads.find(channel=ctx.channel)
+        if thread is Default:
+            thread = await self.threads.find(channel=ctx.channel)
+        ctx.thread = thread
 
         if message.author.id == self.user.id:  # type: ignore
             return [ctx]
@@ -1331,6 +1349,11 @@ class ModmailBot(commands.Bot):
         return [ctx]
 
     async def trigger_auto_triggers(self, message, channel, *, cls=commands.Context):
+        found = self.auto_trigger_matcher.match(message.content)
+        if found is None:
+            return
+        trigger, invoker = found
+
         message.author = self.modmail_guild.me
         message.channel = channel
         message.guild = channel.guild
@@ -1340,21 +1363,6 @@ class ModmailBot(commands.Bot):
         thread = await self.threads.find(channel=ctx.channel)
 
         invoked_prefix = self.prefix
-        invoker = None
-
-        if self.config.get("use_regex_autotrigger"):
-            trigger = next(filter(lambda x: re.search(x, message.content), self.auto_triggers.keys()))
-            if trigger:
-                invoker = re.search(trigger, message.content).group(0)
-        else:
-            trigger = next(
-                filter(
-                    lambda x: x.lower() in message.content.lower(),
-                    self.auto_triggers.keys(),
-                )
-            )
-            if trigger:
-                invoker = trigger.lower()
 
         alias = self.auto_triggers[trigger]
 
@@ -1465,29 +1473,59 @@ class ModmailBot(commands.Bot):
                 content = ""
             await self.mention_channel.send(content=content, embed=em)
 
+        if message.author.bot or isinstance(message.channel, discord.DMChannel):
+            return await self.process_commands(message)
+
+        ctxs = await self._triage(message)
+        if ctxs is None:
+            return
+
         # --- MODERATOR-ONLY MESSAGE LOGGING ---
         # If a moderator sends a message directly in a thread channel (not via modmail command), log it
-        if not message.author.bot and not isinstance(message.channel, discord.DMChannel):
-            thread = await self.threads.find(channel=message.channel)
-            if thread is not None:
-                ctxs = await self.get_contexts(message)
-                is_command = any(ctx.command for ctx in ctxs)
-                if not is_command:
-                    # Only log if not a command
-                    perms = message.channel.permissions_for(message.author)
-                    if perms.manage_messages or perms.administrator:
-                        await self.api.append_log(message, type_="internal")
+        if ctxs[0].thread is not None and not any(ctx.command for ctx in ctxs):
+            # Only log if not a command
+            perms = message.channel.permissions_for(message.author)
+            if perms.manage_messages or perms.administrator:
+                await self.api.append_log(message, type_="internal")
+
+        await self.process_commands(message, ctxs=ctxs)
 
-        await self.process_commands(message)
+    async def _triage(self, message) -> typing.Optional[typing.List[commands.Context]]:
+        """
+        Decides whether a guild message can matter, returning its invocation contexts if so.
 
-    async def process_commands(self, message):
+        Only messages in a thread channel or starting with a prefix can, the
+        thread and contexts are then looked up once for every later stage.
+        """
+        started = time.perf_counter()
+        self.messages_triaged += 1
+        try:
+            thread = None
+            if isinstance(message.channel, discord.TextChannel):
+                thread = await self.threads.find(channel=message.channel)
+            if thread is None and not message.content.startswith(tuple(await self.get_prefix())):
+                self.messages_dropped += 1
+                return None
+            return await self.get_contexts(message, thread=thread)
+        finally:
+            self.triage_time += time.perf_counter() - started
+            if self.messages_triaged % self.triage_log_interval == 0:
+                logger.debug(
+                    "Triaged %d guild messages, dropped %d early, %.1fus per message.",
+                    self.messages_triaged,
+                    self.messages_dropped,
+                    self.triage_time / self.messages_triaged * 1e6,
+                )
+
+    async def process_commands(self, message, *, ctxs: typing.List[commands.Context] = None):
         if message.author.bot:
             return
 
         if isinstance(message.channel, discord.DMChannel):
             return await self._queue_dm_message(message)
 
-        ctxs = await self.get_contexts(message)
+        if ctxs is None:
+            ctxs = await self.get_contexts(message)
         for ctx in ctxs:
             if ctx.command:
                 if not any(1 for check in ctx.command.checks if hasattr(check, "permission_level")):
@@ -1498,7 +1536,7 @@ class ModmailBot(commands.Bot):
                     checks.has_permissions(PermissionLevel.INVALID)(ctx.command)
 
                 # Check if thread is unsnoozing and queue command if so
-                thread = await self.threads.find(channel=ctx.channel)
+                thread = ctx.thread
                 if thread and thread._unsnoozing:
                     queued = await thread.queue_command(ctx, ctx.command)
                     if queued:
@@ -1512,7 +1550,7 @@ class ModmailBot(commands.Bot):
                 await self.invoke(ctx)
                 continue
 
-            thread = await self.threads.find(channel=ctx.channel)
+            thread = ctx.thread
             if thread is not None:
                 # If thread is snoozed (moved), auto-unsnooze when a mod sends a message directly in channel
                 behavior = (self.config.get("snooze_behavior") or "delete").lower()
@@ -1741,6 +1779,10 @@ class ModmailBot(commands.Bot):
         if self.config["transfer_reactions"]:
             await self.handle_reaction_events(payload)
 
+    async def on_guild_channel_create(self, channel):
+        if channel.guild == self.modmail_guild and isinstance(channel, discord.TextChannel):
+            self.threads.channel_created(channel)
+
     async def on_guild_channel_delete(self, channel):
         if channel.guild != self.modmail_guild:
             return
@@ -1755,6 +1797,8 @@ class ModmailBot(commands.Bot):
         if not isinstance(channel, discord.TextChannel):
             return
 
+        self.threads.channel_deleted(channel)
+
         if self.log_channel is None or self.log_channel == channel:
             logger.info("Log channel deleted.")
             self.config.remove("log_channel_id")
@@ -1829,7 +1873,19 @@ class ModmailBot(commands.Bot):
                 embed = discord.Embed(description=leave_message, color=self.error_color)
                 await thread.channel.send(embed=embed)
 
+    async def on_member_update(self, before, after):
+        if before.roles != after.roles:
+            self.blocks.invalidate(after.id)
+            self.permission_cache.invalidate(after.id)
+
+    async def on_guild_role_update(self, before, after):
+        if before.permissions != after.permissions:
+            # e.g. administrators are allowed every command
+            self.permission_cache.invalidate()
+
     async def on_member_join(self, member):
+        # the guild age and role blocks apply to them now
+        self.blocks.invalidate(member.id)
         thread = await self.threads.find(recipient=member)
         if thread:
             if len(self.guilds) > 1:
@@ -2162,17 +2218,23 @@ class ModmailBot(commands.Bot):
 
     @tasks.loop(hours=1, reconnect=False)
     async def log_expiry(self):
-        log_expire_after = self.config.get("log_expiration")
-        if log_expire_after == isodate.Duration():
-            return self.log_expiry.stop()
+        # keeps running while disabled, so enabling log_expiration takes effect without a restart
+        expire_after = self.api.log_expire_after
+        await self.api.set_log_expiration(expire_after)
+        if expire_after is None:
+            return
 
-        now = discord.utils.utcnow()
-        expiration_datetime = now - log_expire_after
-        # WARNING: comparison is done lexicographically, not by date.
-        # This is fine as long as the date is in zero-padded ISO format, which it should be.
-        expired_logs = await self.db.logs.delete_many({"closed_at": {"$lte": str(expiration_datetime)}})
+        expiration_datetime = discord.utils.utcnow() - timedelta(seconds=expire_after)
+        deleted, done = await self.api.delete_expired_logs(expiration_datetime)
+        if deleted:
+            logger.info("Deleted %d expired logs.", deleted)
 
-        logger.info(f"Deleted {expired_logs.deleted_count} expired logs.")
+        # come back sooner while a backlog of expired logs remains
+        if done:
+            self.log_expiry.change_interval(hours=1)
+        else:
+            logger.debug("Expired logs remain, deleting the next batches in 5 minutes.")
+            self.log_expiry.change_interval(minutes=5)
 
     def format_channel_name(self, author, exclude_channel=None, force_null=False):
         """Sanitises a username for use with text channel names
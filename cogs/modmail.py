@@ -7,7 +7,6 @@ import logging
 
 import discord
 from discord.ext import commands
-from discord.ext import tasks
 from discord.ext.commands.view import StringView
 from discord.ext.commands.cooldowns import BucketType
 from discord.role import Role
@@ -17,74 +16,32 @@ from dateutil import parser
 
 from core import checks
 from core.models import DMDisabled, PermissionLevel, SimilarCategoryConverter, getLogger
-from core.paginator import EmbedPaginatorSession
+from core.paginator import EmbedPaginatorSession, LogStreamPageSource, SequencePageSource
 from core.thread import Thread
 from core.time import UserFriendlyTime, human_timedelta
 from core.utils import *
 
 logger = getLogger(__name__)
 
+# the fields of a log entry used by Modmail.format_log_embeds
+LOG_EMBED_PROJECTION = {
+    "key": 1,
+    "created_at": 1,
+    "closed_at": 1,
+    "recipient": 1,
+    "creator": 1,
+    "closer": 1,
+    "title": 1,
+    "message_count": 1,
+    "messages": {"$slice": 5},
+}
+
 
 class Modmail(commands.Cog):
     """Commands directly related to Modmail functionality."""
 
     def __init__(self, bot):
         self.bot = bot
-        self._snoozed_cache = []
-        self._auto_unsnooze_task = self.bot.loop.create_task(self.auto_unsnooze_task())
-
-    async def auto_unsnooze_task(self):
-        await self.bot.wait_until_ready()
-        last_db_query = 0
-        while not self.bot.is_closed():
-            now = datetime.now(timezone.utc)
-            try:
-                # Query DB every 2 minutes
-                if (now.timestamp() - last_db_query) > 120:
-                    snoozed_threads = await self.bot.api.logs.find(
-                        {"snooze_until": {"$gte": now.isoformat()}}
-                    ).to_list(None)
-                    self._snoozed_cache = snoozed_threads or []
-                    last_db_query = now.timestamp()
-                # Check cache every 10 seconds
-                to_unsnooze = []
-                for thread_data in list(self._snoozed_cache):
-                    snooze_until = thread_data.get("snooze_until")
-                    recipient = thread_data.get("recipient")
-                    if not recipient or not recipient.get("id"):
-                        continue
-                    thread_id = int(recipient.get("id"))
-                    if snooze_until:
-                        try:
-                            dt = parser.isoparse(snooze_until)
-                        except Exception:
-                            continue
-                        if now >= dt:
-                            to_unsnooze.append(thread_data)
-                for thread_data in to_unsnooze:
-                    recipient = thread_data.get("recipient")
-                    if not recipient or not recipient.get("id"):
-                        continue
-                    thread_id = int(recipient.get("id"))
-                    thread = self.bot.threads.cache.get(thread_id) or await self.bot.threads.find(
-                        id=thread_id
-                    )
-                    if thread and thread.snoozed:
-                        await thread.restore_from_snooze()
-                        logging.info(f"[AUTO-UNSNOOZE] Thread {thread_id} auto-unsnoozed.")
-                        try:
-                            channel = thread.channel
-                            if channel:
-                                await channel.send("⏰ This thread has been automatically unsnoozed.")
-                        except Exception as e:
-                            logger.info(
-                                "Failed to notify channel after auto-unsnooze: %s",
-                                e,
-                            )
-                        self._snoozed_cache.remove(thread_data)
-            except Exception as e:
-                logging.error(f"Error in auto_unsnooze_task: {e}")
-            await asyncio.sleep(10)
 
     def _resolve_user(self, user_str):
         """Helper to resolve a user from mention, ID, or username."""
@@ -244,7 +201,7 @@ class Modmail(commands.Cog):
             snippet_name = self.bot._resolve_snippet(name)
 
             if snippet_name is None:
-                embed = create_not_found_embed(name, self.bot.snippets.keys(), "Snippet")
+                embed = create_not_found_embed(name, self.bot.name_index("snippets"), "Snippet")
             else:
                 val = self.bot.snippets[snippet_name]
                 embed = discord.Embed(
@@ -286,7 +243,7 @@ class Modmail(commands.Cog):
         """
         snippet_name = self.bot._resolve_snippet(name)
         if snippet_name is None:
-            embed = create_not_found_embed(name, self.bot.snippets.keys(), "Snippet")
+            embed = create_not_found_embed(name, self.bot.name_index("snippets"), "Snippet")
         else:
             val = truncate(escape_code_block(self.bot.snippets[snippet_name]), 2048 - 7)
             embed = discord.Embed(
@@ -370,7 +327,7 @@ class Modmail(commands.Cog):
 
         # Using a copy since we might need to delete aliases
         for alias, val in self.bot.aliases.copy().items():
-            values = parse_alias(val)
+            values = compile_alias(val)
 
             save_aliases = []
 
@@ -454,7 +411,7 @@ class Modmail(commands.Cog):
             self.bot.snippets.pop(name)
             await self.bot.config.update()
         else:
-            embed = create_not_found_embed(name, self.bot.snippets.keys(), "Snippet")
+            embed = create_not_found_embed(name, self.bot.name_index("snippets"), "Snippet")
         await ctx.send(embed=embed)
 
     @snippet.command(name="edit")
@@ -477,7 +434,7 @@ class Modmail(commands.Cog):
                 description=f'`{name}` will now send "{value}".',
             )
         else:
-            embed = create_not_found_embed(name, self.bot.snippets.keys(), "Snippet")
+            embed = create_not_found_embed(name, self.bot.name_index("snippets"), "Snippet")
         await ctx.send(embed=embed)
 
     @commands.command(usage="<category> [options]")
@@ -834,54 +791,60 @@ class Modmail(commands.Cog):
         log_link = await self.bot.api.get_log_link(ctx.channel.id)
         await ctx.send(embed=discord.Embed(color=self.bot.main_color, description=log_link))
 
-    def format_log_embeds(self, logs, avatar_url):
-        embeds = []
-        logs = tuple(logs)
-        title = f"Total Results Found ({len(logs)})"
-
-        for entry in logs:
-            created_at = parser.parse(entry["created_at"]).astimezone(timezone.utc)
-
-            prefix = self.bot.config["log_url_prefix"].strip("/")
-            if prefix == "NONE":
-                prefix = ""
-            log_url = (
-                f"{self.bot.config['log_url'].strip('/')}{'/' + prefix if prefix else ''}/{entry['key']}"
-            )
-
-            username = entry["recipient"]["name"]
-            if entry["recipient"]["discriminator"] != "0":
-                username += "#" + entry["recipient"]["discriminator"]
+    def format_log_embeds(self, logs, avatar_url, total=None):
+        if total is None:
+            logs = tuple(logs)
+            total = len(logs)
+        title = f"Total Results Found ({total})"
+        return [self.format_log_embed(entry, avatar_url, title) for entry in logs]
+
+    def format_log_embed(self, entry, avatar_url, title):
+        created_at = parser.parse(entry["created_at"]).astimezone(timezone.utc)
+
+        prefix = self.bot.config["log_url_prefix"].strip("/")
+        if prefix == "NONE":
+            prefix = ""
+        log_url = f"{self.bot.config['log_url'].strip('/')}{'/' + prefix if prefix else ''}/{entry['key']}"
+
+        username = entry["recipient"]["name"]
+        if entry["recipient"]["discriminator"] != "0":
+            username += "#" + entry["recipient"]["discriminator"]
+
+        embed = discord.Embed(color=self.bot.main_color, timestamp=created_at)
+        embed.set_author(name=f"{title} - {username}", icon_url=avatar_url, url=log_url)
+        embed.url = log_url
+        embed.add_field(name="Created", value=human_timedelta(created_at))
+        closer = entry.get("closer")
+        if closer is None:
+            closer_msg = "Unknown"
+        else:
+            closer_msg = f"<@{closer['id']}>"
+        embed.add_field(name="Closed By", value=closer_msg)
 
-            embed = discord.Embed(color=self.bot.main_color, timestamp=created_at)
-            embed.set_author(name=f"{title} - {username}", icon_url=avatar_url, url=log_url)
-            embed.url = log_url
-            embed.add_field(name="Created", value=human_timedelta(created_at))
-            closer = entry.get("closer")
-            if closer is None:
-                closer_msg = "Unknown"
-            else:
-                closer_msg = f"<@{closer['id']}>"
-            embed.add_field(name="Closed By", value=closer_msg)
+        if entry["recipient"]["id"] != entry["creator"]["id"]:
+            embed.add_field(name="Created by", value=f"<@{entry['creator']['id']}>")
 
-            if entry["recipient"]["id"] != entry["creator"]["id"]:
-                embed.add_field(name="Created by", value=f"<@{entry['creator']['id']}>")
+        if entry.get("title"):
+            embed.add_field(name="Title", value=entry["title"], inline=False)
 
-            if entry.get("title"):
-                embed.add_field(name="Title", value=entry["title"], inline=False)
+        embed.add_field(name="Preview", value=format_preview(entry["messages"]), inline=False)
 
-            embed.add_field(name="Preview", value=format_preview(entry["messages"]), inline=False)
+        if closer is not None:
+            # BUG: Currently, logviewer can't display logs without a closer.
+            embed.add_field(name="Link", value=log_url)
+        else:
+            logger.debug("Invalid log entry: no closer.")
+            embed.add_field(name="Log Key", value=f"`{entry['key']}`")
 
-            if closer is not None:
-                # BUG: Currently, logviewer can't display logs without a closer.
-                embed.add_field(name="Link", value=log_url)
-            else:
-                logger.debug("Invalid log entry: no closer.")
-                embed.add_field(name="Log Key", value=f"`{entry['key']}`")
+        embed.set_footer(text="Recipient ID: " + str(entry["recipient"]["id"]))
+        return embed
 
-            embed.set_footer(text="Recipient ID: " + str(entry["recipient"]["id"]))
-            embeds.append(embed)
-        return embeds
+    def log_page_source(self, stream, avatar_url, total):
+        """Pages the log entries of `stream` lazily, one embed per entry."""
+        title = f"Total Results Found ({total})"
+        return LogStreamPageSource(
+            stream, lambda entry: self.format_log_embed(entry, avatar_url, title), total=total
+        )
 
     @commands.command(cooldown_after_parsing=True)
     @checks.has_permissions(PermissionLevel.SUPPORTER)
@@ -1306,20 +1269,17 @@ class Modmail(commands.Cog):
         default_avatar = "https://cdn.discordapp.com/embed/avatars/0.png"
         icon_url = getattr(user, "avatar_url", default_avatar)
 
-        logs = await self.bot.api.get_user_logs(user.id)
+        stream = self.bot.api.iter_user_logs(user.id, projection=LOG_EMBED_PROJECTION)
+        total = await stream.count()
 
-        if not any(not log["open"] for log in logs):
+        if not total:
             embed = discord.Embed(
                 color=self.bot.error_color,
                 description="This user does not have any previous logs.",
             )
             return await ctx.send(embed=embed)
 
-        logs = reversed([log for log in logs if not log["open"]])
-
-        embeds = self.format_log_embeds(logs, avatar_url=icon_url)
-
-        session = EmbedPaginatorSession(ctx, *embeds)
+        session = EmbedPaginatorSession(ctx, source=self.log_page_source(stream, icon_url, total))
         await session.run()
 
     @logs.command(name="closed-by", aliases=["closeby"])
@@ -1333,17 +1293,18 @@ class Modmail(commands.Cog):
         """
         user = user if user is not None else ctx.author
 
-        entries = await self.bot.api.search_closed_by(user.id)
-        embeds = self.format_log_embeds(entries, avatar_url=self.bot.get_guild_icon(guild=ctx.guild))
+        stream = self.bot.api.iter_closed_by(user.id, projection=LOG_EMBED_PROJECTION)
+        total = await stream.count()
 
-        if not embeds:
+        if not total:
             embed = discord.Embed(
                 color=self.bot.error_color,
                 description="No log entries have been found for that query.",
             )
             return await ctx.send(embed=embed)
 
-        session = EmbedPaginatorSession(ctx, *embeds)
+        source = self.log_page_source(stream, self.bot.get_guild_icon(guild=ctx.guild), total)
+        session = EmbedPaginatorSession(ctx, source=source)
         await session.run()
 
     @logs.command(name="key", aliases=["id"])
@@ -1393,6 +1354,52 @@ class Modmail(commands.Cog):
 
         await ctx.send(embed=embed)
 
+    @logs.command(name="migrate")
+    @checks.has_permissions(PermissionLevel.OWNER)
+    async def logs_migrate(self, ctx):
+        """
+        Move the messages of existing log entries to the `log_messages` collection.
+
+        Only available when `LOG_MESSAGE_BUCKETS` is enabled.
+        The bot remains usable while the migration is running.
+        """
+        if not self.bot.config["log_message_buckets"]:
+            embed = discord.Embed(
+                title="Error",
+                description="Enable `LOG_MESSAGE_BUCKETS` before migrating the log messages.",
+                color=self.bot.error_color,
+            )
+            return await ctx.send(embed=embed)
+
+        async with safe_typing(ctx):
+            converted = await self.bot.api.migrate_log_messages()
+
+        embed = discord.Embed(
+            title="Success",
+            description=f"Moved the messages of {converted} log entr{'y' if converted == 1 else 'ies'}.",
+            color=self.bot.main_color,
+        )
+        await ctx.send(embed=embed)
+
+    @logs.command(name="migrate-dates")
+    @checks.has_permissions(PermissionLevel.OWNER)
+    async def logs_migrate_dates(self, ctx):
+        """
+        Add typed dates to log entries created before the current version.
+
+        Log expiration relies on these to delete old logs efficiently.
+        The bot remains usable while the migration is running.
+        """
+        async with safe_typing(ctx):
+            updated = await self.bot.api.backfill_log_dates()
+
+        embed = discord.Embed(
+            title="Success",
+            description=f"Added typed dates to {updated} log entr{'y' if updated == 1 else 'ies'}.",
+            color=self.bot.main_color,
+        )
+        await ctx.send(embed=embed)
+
     @logs.command(name="responded")
     @checks.has_permissions(PermissionLevel.SUPPORTER)
     async def logs_responded(self, ctx, *, user: User = None):
@@ -1404,18 +1411,18 @@ class Modmail(commands.Cog):
         """
         user = user if user is not None else ctx.author
 
-        entries = await self.bot.api.get_responded_logs(user.id)
-
-        embeds = self.format_log_embeds(entries, avatar_url=self.bot.get_guild_icon(guild=ctx.guild))
+        stream = self.bot.api.iter_responded_logs(user.id, projection=LOG_EMBED_PROJECTION)
+        total = await stream.count()
 
-        if not embeds:
+        if not total:
             embed = discord.Embed(
                 color=self.bot.error_color,
                 description=f"{getattr(user, 'mention', user.id)} has not responded to any threads.",
             )
             return await ctx.send(embed=embed)
 
-        session = EmbedPaginatorSession(ctx, *embeds)
+        source = self.log_page_source(stream, self.bot.get_guild_icon(guild=ctx.guild), total)
+        session = EmbedPaginatorSession(ctx, source=source)
         await session.run()
 
     @logs.command(name="search", aliases=["find"])
@@ -1425,25 +1432,66 @@ class Modmail(commands.Cog):
         Retrieve all logs that contain messages with your query.
 
         Provide a `limit` to specify the maximum number of logs the bot should find.
+
+        When the search index is enabled (see `{prefix}config help log_search_index`),
+        logs containing every word of your query are listed, most relevant first,
+        and a word ending with `*` matches every word it starts, e.g. `refund*`.
         """
 
         async with safe_typing(ctx):
-            pass
+            keys = await self.bot.api.rank_logs(query, limit=limit)
 
-        entries = await self.bot.api.search_by_text(query, limit)
-
-        embeds = self.format_log_embeds(entries, avatar_url=self.bot.get_guild_icon(guild=ctx.guild))
+        avatar_url = self.bot.get_guild_icon(guild=ctx.guild)
+        if keys is not None:
+            total = len(keys)
+            title = f"Total Results Found ({total})"
+            source = SequencePageSource(
+                keys,
+                lambda page_keys: self.bot.api.get_logs_by_keys(page_keys, LOG_EMBED_PROJECTION),
+                lambda entry: self.format_log_embed(entry, avatar_url, title),
+            )
+        else:
+            stream = self.bot.api.iter_search_by_text(query, projection=LOG_EMBED_PROJECTION, limit=limit)
+            total = await stream.count()
+            source = self.log_page_source(stream, avatar_url, total)
 
-        if not embeds:
+        if not total:
             embed = discord.Embed(
                 color=self.bot.error_color,
                 description="No log entries have been found for that query.",
             )
             return await ctx.send(embed=embed)
 
-        session = EmbedPaginatorSession(ctx, *embeds)
+        session = EmbedPaginatorSession(ctx, source=source)
         await session.run()
 
+    @logs.command(name="reindex")
+    @checks.has_permissions(PermissionLevel.OWNER)
+    async def logs_reindex(self, ctx):
+        """
+        Rebuild the search index used by `{prefix}logs search`.
+
+        Only available when `LOG_SEARCH_INDEX` is enabled, or with the SQLite backend.
+        Searches may miss logs until the rebuild has completed.
+        """
+        if not self.bot.api.search_indexed:
+            embed = discord.Embed(
+                title="Error",
+                description="Enable `LOG_SEARCH_INDEX` before building the search index.",
+                color=self.bot.error_color,
+            )
+            return await ctx.send(embed=embed)
+
+        async with safe_typing(ctx):
+            indexed = await self.bot.api.rebuild_search_index()
+
+        embed = discord.Embed(
+            title="Success",
+            description=f"Indexed {indexed} log entr{'y' if indexed == 1 else 'ies'}.",
+            color=self.bot.main_color,
+        )
+        await ctx.send(embed=embed)
+
     @commands.command()
     @checks.has_permissions(PermissionLevel.SUPPORTER)
     @checks.thread_only()
@@ -1900,40 +1948,11 @@ class Modmail(commands.Cog):
 
         roles = []
         users = []
-        now = ctx.message.created_at
-
-        blocked_users = list(self.bot.blocked_users.items())
-        for id_, reason in blocked_users:
-            # parse "reason" and check if block is expired
-            try:
-                end_time, after = extract_block_timestamp(reason, id_)
-            except ValueError:
-                continue
 
-            if end_time is not None:
-                if after <= 0:
-                    # No longer blocked
-                    self.bot.blocked_users.pop(str(id_))
-                    logger.debug("No longer blocked, user %s.", id_)
-                    continue
+        for id_, reason in self.bot.blocked_users.items():
             users.append((f"<@{id_}>", reason))
 
-        blocked_roles = list(self.bot.blocked_roles.items())
-        for id_, reason in blocked_roles:
-            # parse "reason" and check if block is expired
-            # etc "blah blah blah... until 2019-10-14T21:12:45.559948."
-            try:
-                end_time, after = extract_block_timestamp(reason, id_)
-            except ValueError:
-                continue
-
-            if end_time is not None:
-                if after <= 0:
-                    # No longer blocked
-                    self.bot.blocked_roles.pop(str(id_))
-                    logger.debug("No longer blocked, role %s.", id_)
-                    continue
-
+        for id_, reason in self.bot.blocked_roles.items():
             role = self.bot.guild.get_role(int(id_))
             if role:
                 roles.append((role.mention, reason))
@@ -2015,13 +2034,14 @@ class Modmail(commands.Cog):
                 color=self.bot.main_color,
             )
             self.bot.blocked_whitelisted_users.remove(str(user.id))
+            await self.bot.config.update()
             return await ctx.send(embed=embed)
 
         self.bot.blocked_whitelisted_users.append(str(user.id))
 
-        if str(user.id) in self.bot.blocked_users:
-            msg = self.bot.blocked_users.get(str(user.id)) or ""
-            self.bot.blocked_users.pop(str(user.id))
+        block = await self.bot.blocks.remove("user", user.id)
+        if block is not None:
+            msg = block["reason"] or ""
 
         await self.bot.config.update()
 
@@ -2102,13 +2122,9 @@ class Modmail(commands.Cog):
 
         reason += "."
 
-        if isinstance(user_or_role, discord.Role):
-            msg = self.bot.blocked_roles.get(str(user_or_role.id))
-        else:
-            msg = self.bot.blocked_users.get(str(user_or_role.id))
-
-        if msg is None:
-            msg = ""
+        kind = "role" if isinstance(user_or_role, discord.Role) else "user"
+        block = self.bot.blocks.get(kind, user_or_role.id)
+        msg = block["reason"] if block is not None else ""
 
         if msg:
             old_reason = msg.strip().rstrip(".")
@@ -2125,11 +2141,13 @@ class Modmail(commands.Cog):
                 description=f"{mention} is now blocked {reason}",
             )
 
-        if isinstance(user_or_role, discord.Role):
-            self.bot.blocked_roles[str(user_or_role.id)] = reason
-        else:
-            self.bot.blocked_users[str(user_or_role.id)] = reason
-        await self.bot.config.update()
+        await self.bot.blocks.add(
+            kind,
+            user_or_role.id,
+            reason,
+            expires_at=after.dt if after is not None and after.dt > after.now else None,
+            created_by=ctx.author.id,
+        )
 
         return await ctx.send(embed=embed)
 
@@ -2155,9 +2173,11 @@ class Modmail(commands.Cog):
         mention = getattr(user_or_role, "mention", f"`{user_or_role.id}`")
         name = getattr(user_or_role, "name", f"`{user_or_role.id}`")
 
-        if not isinstance(user_or_role, discord.Role) and str(user_or_role.id) in self.bot.blocked_users:
-            msg = self.bot.blocked_users.pop(str(user_or_role.id)) or ""
-            await self.bot.config.update()
+        kind = "role" if isinstance(user_or_role, discord.Role) else "user"
+        block = await self.bot.blocks.remove(kind, user_or_role.id)
+
+        if kind == "user" and block is not None:
+            msg = block["reason"] or ""
 
             if msg.startswith("System Message: "):
                 # If the user is blocked internally (for example: below minimum account age)
@@ -2180,10 +2200,7 @@ class Modmail(commands.Cog):
                     color=self.bot.main_color,
                     description=f"{mention} is no longer blocked.",
                 )
-        elif isinstance(user_or_role, discord.Role) and str(user_or_role.id) in self.bot.blocked_roles:
-            msg = self.bot.blocked_roles.pop(str(user_or_role.id)) or ""
-            await self.bot.config.update()
-
+        elif block is not None:
             embed = discord.Embed(
                 title="Success",
                 color=self.bot.main_color,
@@ -2583,6 +2600,7 @@ class Modmail(commands.Cog):
                 f"[SNOOZE] Thread for {getattr(thread.recipient, 'id', None)} snoozed for {snooze_for}s."
             )
             self.bot.threads.cache[thread.id] = thread
+            self.bot.threads.snoozes.schedule(thread.id, snooze_until)
         else:
             await ctx.send("Failed to snooze this thread.")
             logging.error(f"[SNOOZE] Failed to snooze thread for {getattr(thread.recipient, 'id', None)}.")
@@ -2693,32 +2711,6 @@ class Modmail(commands.Cog):
 
         await ctx.send("Snoozed threads:\n" + "\n".join(lines))
 
-    async def cog_load(self):
-        self.snooze_auto_unsnooze.start()
-
-    @tasks.loop(seconds=10)
-    async def snooze_auto_unsnooze(self):
-        now = datetime.now(timezone.utc)
-        snoozed = await self.bot.api.logs.find({"snoozed": True}).to_list(None)
-        for entry in snoozed:
-            snooze_until = entry.get("snooze_until")
-            if snooze_until:
-                try:
-                    until_dt = datetime.fromisoformat(snooze_until)
-                    if now >= until_dt:
-                        thread = await self.bot.threads.find(recipient_id=int(entry["recipient"]["id"]))
-                        if thread and thread.snoozed:
-                            await thread.restore_from_snooze()
-                except (ValueError, TypeError) as e:
-                    logger.debug(
-                        "Failed parsing snooze_until timestamp for auto-unsnooze loop: %s",
-                        e,
-                    )
-
-    @snooze_auto_unsnooze.before_loop
-    async def _snooze_auto_unsnooze_before(self):
-        await self.bot.wait_until_ready()
-
     async def process_dm_modmail(self, message: discord.Message) -> None:
         # ... existing code ...
         # Before processing, check if thread is snoozed and auto-unsnooze
@@ -123,7 +123,8 @@ class Plugins(commands.Cog):
         self._ready_event = asyncio.Event()
 
     async def cog_load(self):
-        await self.populate_registry()
+        with self.bot.startup_profiler.phase("plugin registry"):
+            await self.populate_registry()
         if self.bot.config.get("enable_plugins"):
             await self.initial_load_plugins()
         else:
@@ -154,8 +155,10 @@ class Plugins(commands.Cog):
                 self.bot.config["plugins"].append(str(plugin))
 
             try:
-                await self.download_plugin(plugin)
-                await self.load_plugin(plugin)
+                with self.bot.startup_profiler.phase(f"plugin {plugin}"):
+                    with self.bot.startup_profiler.phase("download"):
+                        await self.download_plugin(plugin)
+                    await self.load_plugin(plugin)
             except Exception:
                 self.bot.config["plugins"].remove(plugin_name)
                 logger.error(
@@ -236,15 +239,16 @@ class Plugins(commands.Cog):
 
             venv = hasattr(sys, "real_prefix") or hasattr(sys, "base_prefix")  # in a virtual env
             user_install = " --user" if not venv else ""
-            proc = await asyncio.create_subprocess_shell(
-                f'"{sys.executable}" -m pip install --upgrade{user_install} -r {req_txt} -q -q',
-                stderr=PIPE,
-                stdout=PIPE,
-            )
+            with self.bot.startup_profiler.phase("pip install"):
+                proc = await asyncio.create_subprocess_shell(
+                    f'"{sys.executable}" -m pip install --upgrade{user_install} -r {req_txt} -q -q',
+                    stderr=PIPE,
+                    stdout=PIPE,
+                )
 
-            logger.debug("Downloading requirements for %s.", plugin.ext_string)
+                logger.debug("Downloading requirements for %s.", plugin.ext_string)
 
-            stdout, stderr = await proc.communicate()
+                stdout, stderr = await proc.communicate()
 
             if stdout:
                 logger.debug("[stdout]\n%s.", stdout.decode())
@@ -262,7 +266,8 @@ class Plugins(commands.Cog):
                 sys.path.insert(0, USER_SITE)
 
         try:
-            await self.bot.load_extension(plugin.ext_string)
+            with self.bot.startup_profiler.phase("load extension"):
+                await self.bot.load_extension(plugin.ext_string)
             logger.info("Loaded plugin: %s", plugin.ext_string.split(".")[-1])
             self.loaded_plugins.add(plugin)
 
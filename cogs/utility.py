@@ -3,9 +3,9 @@ import asyncio
 import inspect
 import os
 import random
-import re
 import traceback
 from contextlib import redirect_stdout
+from datetime import timezone
 from difflib import get_close_matches
 from io import BytesIO, StringIO
 from itertools import takewhile, zip_longest
@@ -33,7 +33,8 @@ from core.models import (
     getLogger,
 )
 from core.utils import DummyParam
-from core.paginator import EmbedPaginatorSession, MessagePaginatorSession
+from core.paginator import EmbedPaginatorSession, FilePageSource, MessagePaginatorSession
+from core.profiler import format_report
 
 
 logger = getLogger(__name__)
@@ -57,9 +58,16 @@ class ModmailHelpCommand(commands.HelpCommand):
         bot = self.context.bot
         prefix = self.context.clean_prefix
 
+        cmds = cog.get_commands() if not no_cog else cog
+        if self.verify_checks:
+            # decides every permission at once, the checks of filter_commands then read them back
+            await checks.check_permissions_many(
+                self.context, [c.qualified_name for c in cmds if hasattr(c, "qualified_name")]
+            )
+
         formats = [""]
         for cmd in await self.filter_commands(
-            cog.get_commands() if not no_cog else cog,
+            cmds,
             sort=True,
             key=lambda c: (bot.command_perm(c.qualified_name), c.qualified_name),
         ):
@@ -214,7 +222,7 @@ class ModmailHelpCommand(commands.HelpCommand):
 
         val = self.context.bot.aliases.get(command)
         if val is not None:
-            values = utils.parse_alias(val)
+            values = utils.compile_alias(val)
 
             if not values:
                 embed = discord.Embed(
@@ -414,10 +422,12 @@ class Utility(commands.Cog):
     async def debug(self, ctx):
         """Shows the recent application logs of the bot."""
 
-        with open(self.bot.log_file_path, "r+", encoding="utf-8") as f:
-            logs = f.read().strip()
+        # Using Haskell formatting because it's similar to Python for exceptions
+        # and it does a fine job formatting the logs.
+        source = FilePageSource(self.bot.log_file_path, prefix="```Haskell\n", suffix="```")
+        count = await source.get_page_count()
 
-        if not logs:
+        if not count:
             embed = discord.Embed(
                 color=self.bot.main_color,
                 title="Debug Logs:",
@@ -426,33 +436,11 @@ class Utility(commands.Cog):
             embed.set_footer(text="Go to your console to see your logs.")
             return await ctx.send(embed=embed)
 
-        messages = []
-
-        # Using Haskell formatting because it's similar to Python for exceptions
-        # and it does a fine job formatting the logs.
-        msg = "```Haskell\n"
-
-        for line in logs.splitlines(keepends=True):
-            if msg != "```Haskell\n":
-                if len(line) + len(msg) + 3 > 2000:
-                    msg += "```"
-                    messages.append(msg)
-                    msg = "```Haskell\n"
-            msg += line
-            if len(msg) + 3 > 2000:
-                msg = msg[:1992] + "[...]```"
-                messages.append(msg)
-                msg = "```Haskell\n"
-
-        if msg != "```Haskell\n":
-            msg += "```"
-            messages.append(msg)
-
         embed = discord.Embed(color=self.bot.main_color)
         embed.set_footer(text="Debug logs - Navigate using the reactions below.")
 
-        session = MessagePaginatorSession(ctx, *messages, embed=embed)
-        session.current = len(messages) - 1
+        session = MessagePaginatorSession(ctx, source=source, embed=embed)
+        session.current = count - 1
         return await session.run()
 
     @debug.command(name="hastebin", aliases=["haste"])
@@ -488,6 +476,73 @@ class Utility(commands.Cog):
             embed.set_footer(text="Go to your console to see your logs.")
         await ctx.send(embed=embed)
 
+    @debug.command(name="startup")
+    @checks.has_permissions(PermissionLevel.OWNER)
+    @utils.trigger_typing
+    async def debug_startup(self, ctx, count: int = 5):
+        """
+        Shows how long the last startups took.
+
+        Each report lists the startup phases with when they started, how long
+        they took, the time spent waiting on the database and HTTP requests,
+        and the number of database commands, Discord API and other HTTP
+        requests made while they ran.
+        """
+        reports = await self.bot.api.get_startup_reports(max(count, 1))
+        if not reports and self.bot.startup_profiler.report is not None:
+            reports = [self.bot.startup_profiler.report]
+
+        if not reports:
+            embed = discord.Embed(
+                color=self.bot.main_color,
+                title="Startup Reports:",
+                description="No startup was recorded yet.",
+            )
+            return await ctx.send(embed=embed)
+
+        embeds = []
+        for report in reports:
+            started_at = report["started_at"]
+            if started_at.tzinfo is None:
+                # MongoDB returns naive UTC dates
+                started_at = started_at.replace(tzinfo=timezone.utc)
+            embed = discord.Embed(
+                color=self.bot.main_color,
+                title=f"Startup of v{report['version']} took {report['total']:.2f}s",
+                description="```\n" + truncate(format_report(report), 4096 - 8) + "```",
+                timestamp=started_at,
+            )
+            embed.set_footer(text="Started")
+            embeds.append(embed)
+
+        session = EmbedPaginatorSession(ctx, *embeds)
+        return await session.run()
+
+    @debug.command(name="triage")
+    @checks.has_permissions(PermissionLevel.OWNER)
+    async def debug_triage(self, ctx):
+        """
+        Shows how many guild messages were triaged since the bot started.
+
+        Messages outside thread channels that don't start with a prefix are
+        dropped early, without looking up threads or invocation contexts.
+        """
+        triaged = self.bot.messages_triaged
+        dropped = self.bot.messages_dropped
+        embed = discord.Embed(color=self.bot.main_color, title="Message Triage")
+        embed.add_field(name="Triaged", value=f"{triaged:,}")
+        embed.add_field(
+            name="Dropped early",
+            value=f"{dropped:,} ({dropped / triaged:.1%})" if triaged else "0",
+        )
+        embed.add_field(
+            name="Time per message",
+            value=f"{self.bot.triage_time / triaged * 1e6:.1f}µs" if triaged else "-",
+        )
+        embed.set_footer(text="Since")
+        embed.timestamp = self.bot.start_time
+        await ctx.send(embed=embed)
+
     @debug.command(name="clear", aliases=["wipe"])
     @checks.has_permissions(PermissionLevel.OWNER)
     @utils.trigger_typing
@@ -1046,10 +1101,10 @@ class Utility(commands.Cog):
         if name is not None:
             val = self.bot.aliases.get(name)
             if val is None:
-                embed = utils.create_not_found_embed(name, self.bot.aliases.keys(), "Alias")
+                embed = utils.create_not_found_embed(name, self.bot.name_index("aliases"), "Alias")
                 return await ctx.send(embed=embed)
 
-            values = utils.parse_alias(val)
+            values = utils.compile_alias(val)
 
             if not values:
                 embed = discord.Embed(
@@ -1117,7 +1172,7 @@ class Utility(commands.Cog):
         """
         val = self.bot.aliases.get(name)
         if val is None:
-            embed = utils.create_not_found_embed(name, self.bot.aliases.keys(), "Alias")
+            embed = utils.create_not_found_embed(name, self.bot.name_index("aliases"), "Alias")
             return await ctx.send(embed=embed)
 
         val = utils.truncate(utils.escape_code_block(val), 2048 - 7)
@@ -1191,6 +1246,7 @@ class Utility(commands.Cog):
                 embed.add_field(name=f"Step {i}:", value=utils.truncate(val, 1024))
 
         self.bot.aliases[name] = " && ".join(f'"{a}"' for a in save_aliases)
+        utils.compile_alias(self.bot.aliases[name])
         await self.bot.config.update()
         return embed
 
@@ -1258,7 +1314,7 @@ class Utility(commands.Cog):
                 description=f"Successfully deleted `{name}`.",
             )
         else:
-            embed = utils.create_not_found_embed(name, self.bot.aliases.keys(), "Alias")
+            embed = utils.create_not_found_embed(name, self.bot.name_index("aliases"), "Alias")
 
         return await ctx.send(embed=embed)
 
@@ -1269,7 +1325,7 @@ class Utility(commands.Cog):
         Edit an alias.
         """
         if name not in self.bot.aliases:
-            embed = utils.create_not_found_embed(name, self.bot.aliases.keys(), "Alias")
+            embed = utils.create_not_found_embed(name, self.bot.name_index("aliases"), "Alias")
             return await ctx.send(embed=embed)
 
         embed = await self.make_alias(name, value, "Edited")
@@ -1905,6 +1961,7 @@ class Utility(commands.Cog):
 
             if valid:
                 self.bot.auto_triggers[keyword] = command
+                self.bot.rebuild_auto_triggers()
                 await self.bot.config.update()
 
                 embed = discord.Embed(
@@ -1926,7 +1983,7 @@ class Utility(commands.Cog):
     async def autotrigger_edit(self, ctx, keyword, *, command):
         """Edits a pre-existing trigger to automatically trigger an alias-like command"""
         if keyword not in self.bot.auto_triggers:
-            embed = utils.create_not_found_embed(keyword, self.bot.auto_triggers.keys(), "Autotrigger")
+            embed = utils.create_not_found_embed(keyword, self.bot.name_index("auto_triggers"), "Autotrigger")
         else:
             # command validation
             valid = False
@@ -1944,6 +2001,7 @@ class Utility(commands.Cog):
 
             if valid:
                 self.bot.auto_triggers[keyword] = command
+                self.bot.rebuild_auto_triggers()
                 await self.bot.config.update()
 
                 embed = discord.Embed(
@@ -1974,6 +2032,7 @@ class Utility(commands.Cog):
             )
             await ctx.send(embed=embed)
         else:
+            self.bot.rebuild_auto_triggers()
             await self.bot.config.update()
 
             embed = discord.Embed(
@@ -1987,22 +2046,17 @@ class Utility(commands.Cog):
     @checks.has_permissions(PermissionLevel.OWNER)
     async def autotrigger_test(self, ctx, *, text):
         """Tests a string against the current autotrigger setup"""
-        for keyword in self.bot.auto_triggers:
-            if self.bot.config.get("use_regex_autotrigger"):
-                check = re.search(keyword, text)
-                regex = True
-            else:
-                check = keyword.lower() in text.lower()
-                regex = False
-
-            if check:
-                alias = self.bot.auto_triggers[keyword]
-                embed = discord.Embed(
-                    title=f"{'Regex ' if regex else ''}Keyword Found",
-                    color=self.bot.main_color,
-                    description=f"autotrigger keyword `{keyword}` found. Command executed: `{alias}`",
-                )
-                return await ctx.send(embed=embed)
+        matcher = self.bot.auto_trigger_matcher
+        found = matcher.match(text)
+        if found is not None:
+            keyword, _ = found
+            alias = self.bot.auto_triggers[keyword]
+            embed = discord.Embed(
+                title=f"{'Regex ' if matcher.regex else ''}Keyword Found",
+                color=self.bot.main_color,
+                description=f"autotrigger keyword `{keyword}` found. Command executed: `{alias}`",
+            )
+            return await ctx.send(embed=embed)
 
         embed = discord.Embed(
             title="Keyword Not Found",
@@ -0,0 +1,248 @@
+"""
+Matching of auto-triggers against messages.
+
+Triggers are compiled once, when they change, into an `AutoTriggerMatcher`.
+Keywords go into an Aho-Corasick automaton, so a message is scanned once
+instead of once per trigger. Regular expressions are compiled, and the
+literal text each of them requires goes into the same kind of automaton:
+only the expressions whose literal is in the message are searched.
+"""
+
+import re
+from typing import Dict, List, Optional, Set, Tuple
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_constants
+    import sre_parse
+
+from core.models import getLogger
+
+logger = getLogger(__name__)
+
+
+class KeywordAutomaton:
+    """
+    An Aho-Corasick automaton finding which keywords a text contains.
+
+    Parameters
+    ----------
+    keywords : List[str]
+        The keywords, matched case-sensitively.
+    """
+
+    def __init__(self, keywords: List[str]):
+        # node -> character -> node, node 0 is the root
+        self._goto: List[Dict[str, int]] = [{}]
+        # node -> the indexes of the keywords ending there
+        self._ends: List[List[int]] = [[]]
+        fail = [0]
+
+        for index, keyword in enumerate(keywords):
+            node = 0
+            for char in keyword:
+                child = self._goto[node].get(char)
+                if child is None:
+                    child = len(self._goto)
+                    self._goto[node][char] = child
+                    self._goto.append({})
+                    self._ends.append([])
+                    fail.append(0)
+                node = child
+            self._ends[node].append(index)
+
+        # node -> the lowest index of a keyword ending there, or at a suffix of it
+        self._first: List[Optional[int]] = [min(ends, default=None) for ends in self._ends]
+        # node -> whether a keyword ends there, or at a suffix of it
+        self._output: List[bool] = [bool(ends) for ends in self._ends]
+
+        # breadth first from the depth 1 nodes, which fail to the root, so the
+        # failure link of a node is known before its children's
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for char, child in self._goto[node].items():
+                state = fail[node]
+                while state and char not in self._goto[state]:
+                    state = fail[state]
+                fail[child] = self._goto[state].get(char, 0)
+                suffix = self._first[fail[child]]
+                if suffix is not None and (self._first[child] is None or suffix < self._first[child]):
+                    self._first[child] = suffix
+                self._output[child] = self._output[child] or self._output[fail[child]]
+                queue.append(child)
+        self._fail = fail
+
+    def first(self, text: str) -> Optional[int]:
+        """The lowest index of the keywords contained in `text`."""
+        goto, fail, first = self._goto, self._fail, self._first
+        best = first[0]  # an empty keyword is in every text
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            found = first[node]
+            if found is not None and (best is None or found < best):
+                best = found
+                if best == 0:
+                    break
+        return best
+
+    def all(self, text: str) -> Set[int]:
+        """The indexes of all the keywords contained in `text`."""
+        goto, fail, output = self._goto, self._fail, self._output
+        reached = {0}
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if output[node]:
+                reached.add(node)
+
+        found = set()
+        done = set()
+        for node in reached:
+            while node not in done:
+                done.add(node)
+                found.update(self._ends[node])
+                node = fail[node]
+        return found
+
+
+def required_literal(pattern: str) -> str:
+    """
+    Finds text that every match of a regular expression contains.
+
+    Parameters
+    ----------
+    pattern : str
+        The regular expression.
+
+    Returns
+    -------
+    str
+        The longest run of literal characters outside of alternations and
+        repetitions, an empty string if there's none.
+    """
+    parsed = sre_parse.parse(pattern)
+    if parsed.state.flags & (sre_constants.SRE_FLAG_IGNORECASE | sre_constants.SRE_FLAG_VERBOSE):
+        return ""
+
+    best = ""
+
+    def walk(items) -> None:
+        nonlocal best
+        run = []
+        for op, av in items:
+            if op is sre_constants.LITERAL:
+                run.append(chr(av))
+                continue
+            if len(run) > len(best):
+                best = "".join(run)
+            run = []
+            if op is sre_constants.SUBPATTERN:
+                _, add_flags, del_flags, group = av
+                if not add_flags and not del_flags:
+                    walk(group)
+        if len(run) > len(best):
+            best = "".join(run)
+
+    walk(parsed)
+    return best
+
+
+class AutoTriggerMatcher:
+    """
+    Finds the auto-trigger a message activates.
+
+    Like checking every trigger in order, the first trigger matching
+    anywhere in the message wins.
+
+    Parameters
+    ----------
+    triggers : Dict[str, str]
+        The auto-triggers, keyword to command.
+    regex : bool
+        Whether the keywords are regular expressions, otherwise they're
+        matched case-insensitively as plain text.
+    """
+
+    # below this many triggers per character of the message, checking them
+    # one by one (in C) is faster than walking the automaton (in Python)
+    SCAN_RATIO = 0.1
+
+    def __init__(self, triggers: Dict[str, str], *, regex: bool = False):
+        self.triggers = dict(triggers)
+        self.regex = regex
+        self._keywords = list(self.triggers)
+        self._lowered: List[str] = []
+        self._patterns: List[Optional[re.Pattern]] = []
+        # the indexes of the regexes without a required literal, always searched
+        self._unfiltered: Set[int] = set()
+        # the regex index of each literal of the automaton
+        self._literal_of: List[int] = []
+
+        if not regex:
+            self._lowered = [keyword.lower() for keyword in self._keywords]
+            self._automaton = KeywordAutomaton(self._lowered)
+            return
+
+        literals = []
+        for index, keyword in enumerate(self._keywords):
+            try:
+                self._patterns.append(re.compile(keyword))
+            except re.error:
+                logger.warning("Invalid autotrigger regex %s.", keyword)
+                self._patterns.append(None)
+                continue
+            literal = required_literal(keyword)
+            if literal:
+                literals.append(literal)
+                self._literal_of.append(index)
+            else:
+                self._unfiltered.add(index)
+        self._automaton = KeywordAutomaton(literals)
+
+    def match(self, content: str) -> Optional[Tuple[str, str]]:
+        """
+        Finds the trigger activated by a message.
+
+        Parameters
+        ----------
+        content : str
+            The content of the message.
+
+        Returns
+        -------
+        Optional[Tuple[str, str]]
+            The trigger and the text it matched, `None` if no trigger matches.
+        """
+        if not self._keywords:
+            return None
+
+        if not self.regex:
+            content = content.lower()
+            if len(self._keywords) < len(content) * self.SCAN_RATIO:
+                index = next((i for i, keyword in enumerate(self._lowered) if keyword in content), None)
+            else:
+                index = self._automaton.first(content)
+            if index is None:
+                return None
+            return self._keywords[index], self._lowered[index]
+
+        if len(self._keywords) < len(content) * self.SCAN_RATIO:
+            candidates = range(len(self._keywords))
+        else:
+            found = self._automaton.all(content)
+            candidates = sorted(self._unfiltered.union(self._literal_of[i] for i in found))
+
+        for index in candidates:
+            pattern = self._patterns[index]
+            if pattern is None:
+                continue
+            matched = pattern.search(content)
+            if matched is not None:
+                return self._keywords[index], matched.group(0)
+        return None
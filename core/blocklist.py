@@ -0,0 +1,239 @@
+"""
+Blocked users and roles.
+
+Every block is a record in its own collection: the ID and kind of what's
+blocked, the reason, who blocked it and when it expires. All records are
+kept in memory, so checking whether a message is blocked needs no database
+round trip, and blocks are lifted by a timer once they expire.
+
+Users found not blocked are remembered until a block, their roles or the
+configurations change, so most checks are a single dict lookup.
+"""
+
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Tuple, Union
+
+import discord
+
+from core.models import getLogger
+from core.scheduler import TimerHeap
+from core.utils import extract_block_timestamp
+
+logger = getLogger(__name__)
+
+KINDS = ("user", "role")
+
+# the config keys blocks were stored in, by kind
+LEGACY_KEYS = {"user": "blocked", "role": "blocked_roles"}
+
+
+class BlockList:
+    """
+    The blocks of a bot, loaded from `ApiClient.get_blocks`.
+
+    Every record is a dict with `id`, `kind` (`"user"` or `"role"`),
+    `reason`, `expires_at`, `created_by` and `created_at`. Blocks without
+    `expires_at` last until they're removed.
+
+    Parameters
+    ----------
+    bot : ModmailBot
+        The Modmail bot.
+    """
+
+    # number of users remembered as not blocked
+    MAX_DECISIONS = 10000
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._blocks: Dict[str, Dict[str, dict]] = {kind: {} for kind in KINDS}
+        # ID -> reason, kept alongside `_blocks` for `reasons`
+        self._reasons: Dict[str, Dict[str, str]] = {kind: {} for kind in KINDS}
+        self._reason_views = {kind: MappingProxyType(reasons) for kind, reasons in self._reasons.items()}
+        self.expiry = TimerHeap(self._expire, name="block expiry")
+        # user ID -> config generation they were found not blocked with, least recently used first
+        self._allowed: "OrderedDict[int, int]" = OrderedDict()
+        self._invalidations = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return sum(len(blocks) for blocks in self._blocks.values())
+
+    def get(self, kind: str, id_: Union[int, str]) -> Optional[dict]:
+        """The block of a user or role, `None` if it isn't blocked."""
+        block = self._blocks[kind].get(str(id_))
+        if block is None:
+            return None
+        expires_at = block.get("expires_at")
+        if expires_at is not None and expires_at <= discord.utils.utcnow():
+            # expired, the timer just hasn't run yet
+            return None
+        return block
+
+    def all(self, kind: str) -> Dict[str, dict]:
+        """The blocks of a kind, by ID."""
+        return dict(self._blocks[kind])
+
+    def reasons(self, kind: str) -> Mapping[str, str]:
+        """A read-only view of the reasons of the blocks of a kind, by ID, that follows changes."""
+        return self._reason_views[kind]
+
+    def is_allowed(self, user_id: int) -> bool:
+        """Whether a user is known not to be blocked."""
+        if self._allowed.get(user_id) == self.bot.config.generation:
+            self.hits += 1
+            self._allowed.move_to_end(user_id)
+            return True
+        self.misses += 1
+        return False
+
+    def decision_token(self) -> Tuple[int, int]:
+        """Taken before checking a user, so `allow` can tell whether anything changed since."""
+        return self._invalidations, self.bot.config.generation
+
+    def allow(self, user_id: int, token: Tuple[int, int]) -> None:
+        """Remembers a user was found not blocked, unless a block or the config changed meanwhile."""
+        if token != self.decision_token():
+            return
+        self._allowed[user_id] = token[1]
+        self._allowed.move_to_end(user_id)
+        while len(self._allowed) > self.MAX_DECISIONS:
+            self._allowed.popitem(last=False)
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        """Forgets that a user, or every user, was found not blocked."""
+        self._invalidations += 1
+        if user_id is None:
+            self._allowed.clear()
+        else:
+            self._allowed.pop(int(user_id), None)
+
+    async def add(
+        self,
+        kind: str,
+        id_: Union[int, str],
+        reason: str,
+        *,
+        expires_at: Optional[datetime] = None,
+        created_by: Union[int, str, None] = None,
+    ) -> Optional[dict]:
+        """
+        Blocks a user or role, replacing its current block.
+
+        Parameters
+        ----------
+        kind : str
+            `"user"` or `"role"`.
+        id_ : Union[int, str]
+            The ID of the user or role.
+        reason : str
+            Why it's blocked.
+        expires_at : Optional[datetime]
+            When the block is lifted, `None` to never lift it.
+        created_by : Union[int, str, None]
+            The ID of the moderator who blocked it, `None` for the bot itself.
+
+        Returns
+        -------
+        Optional[dict]
+            The block it replaced.
+        """
+        block = {
+            "id": str(id_),
+            "kind": kind,
+            "reason": reason,
+            "expires_at": expires_at,
+            "created_by": str(created_by) if created_by is not None else None,
+            "created_at": discord.utils.utcnow(),
+        }
+        previous = self.get(kind, id_)
+        self._store(block)
+        await self.bot.api.set_block(kind, id_, block)
+        return previous
+
+    async def remove(self, kind: str, id_: Union[int, str]) -> Optional[dict]:
+        """Unblocks a user or role, returns the block it had."""
+        previous = self.get(kind, id_)
+        block = self._blocks[kind].pop(str(id_), None)
+        if block is None:
+            return None
+        self._reasons[kind].pop(str(id_), None)
+        # lifting a block can't make anyone blocked, remembered users stay valid
+        self.expiry.cancel((kind, str(id_)))
+        await self.bot.api.delete_block(kind, id_)
+        return previous
+
+    def _store(self, block: dict) -> None:
+        key = (block["kind"], block["id"])
+        self._invalidate_for(block["kind"], block["id"])
+        self._blocks[block["kind"]][block["id"]] = block
+        self._reasons[block["kind"]][block["id"]] = block["reason"]
+        if block.get("expires_at") is not None:
+            self.expiry.schedule(key, block["expires_at"])
+        else:
+            self.expiry.cancel(key)
+
+    def _invalidate_for(self, kind: str, id_: Union[int, str]) -> None:
+        # any member may have a role
+        self.invalidate(id_ if kind == "user" else None)
+
+    async def _expire(self, key, _) -> None:
+        kind, id_ = key
+        await self.remove(kind, id_)
+        logger.debug("No longer blocked, %s %s.", kind, id_)
+
+    async def load(self) -> None:
+        """Loads the stored blocks, migrating the ones in the config first."""
+        await self._migrate()
+
+        for kind in KINDS:
+            self._blocks[kind].clear()
+            self._reasons[kind].clear()
+        self.invalidate()
+        for block in await self.bot.api.get_blocks():
+            if block["kind"] in self._blocks:
+                self._store(block)
+        self.expiry.start()
+        logger.debug("Loaded %d blocks.", len(self))
+
+    async def _migrate(self) -> None:
+        # blocks used to be stored in the config, their expiry as a timestamp in the reason
+        legacy = {kind: self.bot.config[key] for kind, key in LEGACY_KEYS.items() if self.bot.config[key]}
+        if not legacy:
+            return
+
+        now = discord.utils.utcnow()
+        migrated = 0
+        for kind, blocks in legacy.items():
+            for id_, reason in blocks.items():
+                reason = reason or ""
+                expires_at = None
+                try:
+                    end_time, after = extract_block_timestamp(reason, id_)
+                except ValueError:
+                    # unreadable timestamps never expired
+                    end_time = None
+                if end_time is not None:
+                    if after <= 0:
+                        continue
+                    expires_at = now + timedelta(seconds=after)
+                await self.bot.api.set_block(
+                    kind,
+                    id_,
+                    {
+                        "id": str(id_),
+                        "kind": kind,
+                        "reason": reason,
+                        "expires_at": expires_at,
+                        "created_by": None,
+                        "created_at": now,
+                    },
+                )
+                migrated += 1
+            self.bot.config.remove(LEGACY_KEYS[kind])
+
+        await self.bot.config.update(flush=True)
+        logger.info("Moved %d blocks from the config to the blocks collection.", migrated)
@@ -1,3 +1,6 @@
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, Optional, Tuple
+
 from discord.ext import commands
 
 from core.models import HostingMethod, PermissionLevel, getLogger
@@ -5,6 +8,73 @@ from core.models import HostingMethod, PermissionLevel, getLogger
 logger = getLogger(__name__)
 
 
+class PermissionCache:
+    """
+    Remembers the outcome of `check_permissions`, least recently used first out.
+
+    Decisions are keyed by user, guild, the user's roles and command. All of
+    them are dropped once the configurations they depend on change, and the
+    decisions of a user once their roles change.
+
+    Parameters
+    ----------
+    maxsize : int
+        Number of decisions kept.
+    """
+
+    # the configurations decisions depend on
+    CONFIG_KEYS = (
+        "level_permissions",
+        "command_permissions",
+        "override_command_level",
+        "owners",
+        "guild_id",
+        "modmail_guild_id",
+    )
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._decisions: "OrderedDict[Tuple[Hashable, ...], bool]" = OrderedDict()
+        self._generation: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._decisions)
+
+    @staticmethod
+    def key(ctx, command_name: str) -> Tuple[Hashable, ...]:
+        roles = frozenset(role.id for role in getattr(ctx.author, "roles", ()))
+        return ctx.author.id, getattr(ctx.guild, "id", None), hash(roles), command_name
+
+    def get(self, ctx, key: Tuple[Hashable, ...]) -> Optional[bool]:
+        generation = ctx.bot.config.generation_of(*self.CONFIG_KEYS)
+        if generation != self._generation:
+            self._decisions.clear()
+            self._generation = generation
+        decision = self._decisions.get(key)
+        if decision is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._decisions.move_to_end(key)
+        return decision
+
+    def set(self, key: Tuple[Hashable, ...], decision: bool) -> None:
+        self._decisions[key] = decision
+        self._decisions.move_to_end(key)
+        while len(self._decisions) > self.maxsize:
+            self._decisions.popitem(last=False)
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        """Forgets the decisions of a user, or of everyone."""
+        if user_id is None:
+            self._decisions.clear()
+            return
+        for key in [key for key in self._decisions if key[0] == user_id]:
+            del self._decisions[key]
+
+
 def has_permissions_predicate(
     permission_level: PermissionLevel = PermissionLevel.REGULAR,
 ):
@@ -39,9 +109,58 @@ def has_permissions(permission_level: PermissionLevel = PermissionLevel.REGULAR)
 
 async def check_permissions(ctx, command_name) -> bool:
     """Logic for checking permissions for a command for a user"""
-    if await ctx.bot.is_owner(ctx.author) or ctx.author.id == ctx.bot.user.id:
-        # Bot owner(s) (and creator) has absolute power over the bot
-        return True
+    cache = ctx.bot.permission_cache
+    key = cache.key(ctx, command_name)
+    decision = cache.get(ctx, key)
+    if decision is None:
+        decision = await _check_permissions(ctx, command_name)
+        cache.set(key, decision)
+    return decision
+
+
+async def check_permissions_many(ctx, command_names: Iterable[str]) -> Dict[str, bool]:
+    """
+    Checks the permissions of the author for several commands at once.
+
+    Parameters
+    ----------
+    ctx : Context
+        The context of the author.
+    command_names : Iterable[str]
+        The qualified names of the commands.
+
+    Returns
+    -------
+    Dict[str, bool]
+        Whether the author may use each command.
+    """
+    cache = ctx.bot.permission_cache
+    decisions = {}
+    pending = []
+    for command_name in command_names:
+        decision = cache.get(ctx, cache.key(ctx, command_name))
+        if decision is None:
+            pending.append(command_name)
+        else:
+            decisions[command_name] = decision
+
+    if pending:
+        # resolved once for every command
+        owner = await ctx.bot.is_owner(ctx.author) or ctx.author.id == ctx.bot.user.id
+        checkables = {*getattr(ctx.author, "roles", ()), ctx.author}
+        for command_name in pending:
+            decision = owner or await _check_permissions(ctx, command_name, checkables=checkables)
+            cache.set(cache.key(ctx, command_name), decision)
+            decisions[command_name] = decision
+    return decisions
+
+
+async def _check_permissions(ctx, command_name, *, checkables=None) -> bool:
+    if checkables is None:
+        if await ctx.bot.is_owner(ctx.author) or ctx.author.id == ctx.bot.user.id:
+            # Bot owner(s) (and creator) has absolute power over the bot
+            return True
+        checkables = {*ctx.author.roles, ctx.author}
 
     permission_level = ctx.bot.command_perm(command_name)
 
@@ -59,7 +178,6 @@ async def check_permissions(ctx, command_name) -> bool:
         return True
 
     command_permissions = ctx.bot.config["command_permissions"]
-    checkables = {*ctx.author.roles, ctx.author}
 
     if command_name in command_permissions:
         # -1 is for @everyone
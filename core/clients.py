@@ -1,17 +1,25 @@
+import asyncio
 import secrets
 import sys
+import time
+from datetime import datetime, timezone
 from json import JSONDecodeError
-from typing import Any, Dict, Union, Optional
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
 
 import discord
+import isodate
 from discord import Member, DMChannel, TextChannel, Message
 from discord.ext import commands
 
 from aiohttp import ClientResponseError, ClientResponse
 from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo.errors import ConfigurationError
+from pymongo import UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, ConfigurationError, OperationFailure
 
-from core.models import InvalidConfigError, getLogger
+from core.models import ConfigConflictError, InvalidConfigError, LogWriteError, getLogger
+from core.relay import RelayMap
+from core.search import FTSSearchIndex, SearchIndex, rank
+from core.sqlite import SQLiteDatabase, dumps, loads, transaction
 
 logger = getLogger(__name__)
 
@@ -282,6 +290,534 @@ class GitHub:
             raise InvalidConfigError("Invalid github token")
 
 
+class LogWriteBuffer:
+    """
+    Write-behind buffer for messages appended to thread logs.
+
+    Messages are queued per channel and written with a single `bulk_write`
+    once `max_delay` seconds have passed since the first queued message, or
+    as soon as `max_size` messages are pending, whichever comes first.
+    Messages of the same channel are always written in the order they were
+    queued.
+
+    Parameters
+    ----------
+    client : ApiClient
+        The database client, its `write_log_messages` does the actual write.
+    max_delay : float
+        Maximum number of seconds a message may stay in the buffer.
+    max_size : int
+        Number of pending messages that triggers an immediate flush.
+
+    Attributes
+    ----------
+    depth : int
+        Number of messages currently waiting to be written.
+    flush_count : int
+        Number of successful flushes.
+    written_count : int
+        Number of messages written to the database.
+    last_flush_latency : float
+        Duration of the last flush in seconds.
+    max_flush_latency : float
+        Longest flush duration in seconds.
+    """
+
+    def __init__(self, client: "ApiClient", *, max_delay: float = 1.0, max_size: int = 100):
+        self.client = client
+        self.max_delay = max_delay
+        self.max_size = max_size
+        self.depth = 0
+        self.flush_count = 0
+        self.written_count = 0
+        self.last_flush_latency = 0.0
+        self.max_flush_latency = 0.0
+        self._total_flush_latency = 0.0
+        self._pending: Dict[str, List[dict]] = {}
+        self._message_ids: Set[str] = set()
+        self._lock = asyncio.Lock()
+        self._full = asyncio.Event()
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def __len__(self):
+        return self.depth
+
+    def __contains__(self, message_id: Union[int, str]) -> bool:
+        """Whether a message is still pending or currently being written."""
+        return str(message_id) in self._message_ids
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "depth": self.depth,
+            "flushes": self.flush_count,
+            "written": self.written_count,
+            "last_flush_latency": self.last_flush_latency,
+            "max_flush_latency": self.max_flush_latency,
+            "avg_flush_latency": self._total_flush_latency / self.flush_count if self.flush_count else 0.0,
+        }
+
+    def push(self, channel_id: str, data: dict) -> None:
+        """Queues a message to be pushed to the log of `channel_id`."""
+        self._pending.setdefault(channel_id, []).append(data)
+        self._message_ids.add(data["message_id"])
+        self.depth += 1
+        if self.depth >= self.max_size:
+            self._full.set()
+        self._schedule()
+
+    def _schedule(self) -> None:
+        if self._flush_task is None:
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        try:
+            await asyncio.wait_for(self._full.wait(), timeout=self.max_delay)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._full.clear()
+            self._flush_task = None
+        await self.flush()
+
+    async def flush(self, channel_id: Union[int, str, None] = None) -> None:
+        """
+        Writes pending messages to the database.
+
+        Parameters
+        ----------
+        channel_id : Union[int, str, None]
+            Only flush the messages of this channel. Flushes every channel if `None`.
+        """
+        async with self._lock:
+            if channel_id is None:
+                batch, self._pending = self._pending, {}
+            else:
+                entries = self._pending.pop(str(channel_id), None)
+                batch = {str(channel_id): entries} if entries else {}
+            if not batch:
+                return
+
+            count = sum(len(entries) for entries in batch.values())
+            start = time.perf_counter()
+            error = None
+            unwritten = {}
+            try:
+                await self.client.write_log_messages(batch)
+            except LogWriteError as e:
+                # the rest of the batch was written, retrying it would log those messages twice
+                error, unwritten = e, e.unwritten
+            except Exception as e:
+                error, unwritten = e, batch
+
+            if unwritten:
+                failed = sum(len(entries) for entries in unwritten.values())
+                logger.error(
+                    "Failed to write %d of %d buffered log message(s), retrying later.",
+                    failed,
+                    count,
+                    exc_info=error,
+                )
+                for cid, entries in unwritten.items():
+                    # keep per-channel ordering: failed entries go before anything queued meanwhile
+                    self._pending[cid] = entries + self._pending.get(cid, [])
+                self._schedule()
+                if failed == count:
+                    return
+                retried = {m["message_id"] for entries in unwritten.values() for m in entries}
+                batch = {
+                    cid: [m for m in entries if m["message_id"] not in retried]
+                    for cid, entries in batch.items()
+                }
+                count -= failed
+
+            latency = time.perf_counter() - start
+            self.depth -= count
+            for entries in batch.values():
+                self._message_ids.difference_update(e["message_id"] for e in entries)
+            self.flush_count += 1
+            self.written_count += count
+            self.last_flush_latency = latency
+            self.max_flush_latency = max(self.max_flush_latency, latency)
+            self._total_flush_latency += latency
+            logger.debug(
+                "Flushed %d log message(s) for %d thread(s) in %.2fms, %d still queued.",
+                count,
+                len(batch),
+                latency * 1000,
+                self.depth,
+            )
+
+
+class IndexSpec:
+    """
+    Declarative description of a database index.
+
+    Parameters
+    ----------
+    collection : str
+        Name of the collection the index belongs to.
+    keys : List[Tuple[str, Any]]
+        The index keys, as passed to `create_index`.
+    queries : List[Dict[str, Any]]
+        Query shapes this index has to serve, each a dict with a `filter`
+        and an optional `sort`. Used by `IndexManager.verify`.
+    **options
+        Extra index options such as `unique` or `sparse`.
+
+    Attributes
+    ----------
+    name : str
+        The index name, MongoDB's default name for `keys`.
+    """
+
+    def __init__(self, collection: str, keys: List[Tuple[str, Any]], *, queries=(), **options):
+        self.collection = collection
+        self.keys = keys
+        self.queries = list(queries)
+        self.options = options
+        self.name = "_".join(f"{field}_{direction}" for field, direction in keys)
+
+    @property
+    def is_text(self) -> bool:
+        return any(direction == "text" for _, direction in self.keys)
+
+    def matches(self, info: dict) -> bool:
+        """Whether an entry of `index_information()` is this index."""
+        # text indexes are stored under internal keys, their name is all we can compare
+        if not self.is_text and [tuple(k) for k in info["key"]] != [tuple(k) for k in self.keys]:
+            return False
+        return all(info.get(option) == value for option, value in self.options.items())
+
+
+class IndexVerificationError(Exception):
+    """Raised when a registered query would scan a whole collection."""
+
+
+class IndexManager:
+    """
+    Creates, reconciles and verifies the indexes of a database.
+
+    The names of the indexes it creates are recorded in the `index_registry`
+    collection, only those are ever dropped. Indexes added by hand or by
+    other applications sharing the database are left alone.
+
+    Parameters
+    ----------
+    db : AsyncIOMotorDatabase
+        The database to manage.
+    specs : List[IndexSpec]
+        Every index the bot relies on. Recorded indexes missing from here
+        are considered stale.
+    managed : Iterable[str]
+        Names of indexes the bot creates outside of the manager, which are
+        considered stale too when they are missing from `specs`.
+    """
+
+    def __init__(self, db, specs: List[IndexSpec], *, managed: Iterable[str] = ()):
+        self.db = db
+        self.specs = specs
+        self.managed = set(managed)
+
+    @property
+    def registry(self):
+        return self.db.index_registry
+
+    async def reconcile(self, *, drop_stale: bool = True) -> None:
+        """Creates missing indexes, rebuilds changed ones and drops stale ones."""
+        collections: Dict[str, List[IndexSpec]] = {}
+        for spec in self.specs:
+            collections.setdefault(spec.collection, []).append(spec)
+        recorded = {doc["_id"]: set(doc["indexes"]) async for doc in self.registry.find({})}
+
+        for name in collections.keys() | recorded.keys():
+            coll = self.db[name]
+            specs = collections.get(name, [])
+            index_info = await coll.index_information()
+            wanted = {spec.name for spec in specs}
+
+            if drop_stale:
+                owned = recorded.get(name, set()) | self.managed
+                for index_name in index_info:
+                    if index_name != "_id_" and index_name in owned and index_name not in wanted:
+                        logger.info("Dropping stale index %s of the %s collection.", index_name, name)
+                        await coll.drop_index(index_name)
+
+            for spec in specs:
+                info = index_info.get(spec.name)
+                if info is not None and spec.matches(info):
+                    continue
+                if info is not None:
+                    logger.info("Rebuilding index %s of the %s collection.", spec.name, name)
+                    await coll.drop_index(spec.name)
+                else:
+                    logger.info("Creating index %s for the %s collection.", spec.name, name)
+                await coll.create_index(spec.keys, name=spec.name, **spec.options)
+
+            if not drop_stale:
+                # stale indexes are still there, keep them recorded to drop them later
+                wanted |= recorded.get(name, set()) & set(index_info)
+            if wanted:
+                await self.registry.update_one(
+                    {"_id": name}, {"$set": {"indexes": sorted(wanted)}}, upsert=True
+                )
+            else:
+                await self.registry.delete_one({"_id": name})
+
+    async def verify(self) -> None:
+        """
+        Explains every registered query and fails if any of them would
+        scan a whole collection.
+
+        Raises
+        ------
+        IndexVerificationError
+            Some queries are not served by an index.
+        """
+        failures = []
+        for spec in self.specs:
+            for query in spec.queries:
+                cursor = self.db[spec.collection].find(query["filter"])
+                if query.get("sort"):
+                    cursor = cursor.sort(query["sort"])
+                plan = await cursor.explain()
+                stages = set(self._stages(plan["queryPlanner"]["winningPlan"]))
+                logger.debug("Query %s on %s uses %s.", query, spec.collection, ", ".join(sorted(stages)))
+                if "COLLSCAN" in stages:
+                    failures.append(f"{spec.collection}: {query}")
+
+        if failures:
+            for failure in failures:
+                logger.critical("Query is not covered by an index: %s", failure)
+            raise IndexVerificationError(f"{len(failures)} registered queries scan a whole collection.")
+        logger.info("Verified the query plans of all registered indexes.")
+
+    @classmethod
+    def _stages(cls, plan):
+        if isinstance(plan, dict):
+            if "stage" in plan:
+                yield plan["stage"]
+            for value in plan.values():
+                yield from cls._stages(value)
+        elif isinstance(plan, list):
+            for value in plan:
+                yield from cls._stages(value)
+
+
+DATABASE_INDEXES = [
+    IndexSpec(
+        "logs",
+        [("messages.content", "text"), ("messages.author.name", "text"), ("key", "text")],
+        queries=[{"filter": {"guild_id": "0", "open": False, "$text": {"$search": '"x"'}}}],
+    ),
+    IndexSpec("logs", [("key", 1)], queries=[{"filter": {"key": "0"}}]),
+    IndexSpec("logs", [("channel_id", 1)], queries=[{"filter": {"channel_id": "0"}}]),
+    IndexSpec(
+        "logs",
+        [("recipient.id", 1), ("guild_id", 1), ("closed_at", -1)],
+        queries=[
+            {"filter": {"recipient.id": "0", "guild_id": "0"}},
+            {"filter": {"recipient.id": "0", "guild_id": "0", "open": False}, "sort": [("closed_at", -1)]},
+            {"filter": {"recipient.id": "0", "snoozed": True}},
+        ],
+    ),
+    IndexSpec(
+        "logs",
+        [("closer.id", 1), ("guild_id", 1), ("closed_at", -1)],
+        queries=[
+            {"filter": {"closer.id": "0", "guild_id": "0", "open": False}, "sort": [("closed_at", -1)]},
+        ],
+    ),
+    IndexSpec("logs", [("open", 1)], queries=[{"filter": {"open": True}}]),
+    IndexSpec("logs", [("messages.message_id", 1)], queries=[{"filter": {"messages.message_id": "0"}}]),
+    IndexSpec("logs", [("snoozed", 1)], sparse=True, queries=[{"filter": {"snoozed": True}}]),
+    IndexSpec(
+        "log_messages",
+        [("log_key", 1), ("bucket", 1)],
+        unique=True,
+        queries=[{"filter": {"log_key": "0"}, "sort": [("bucket", 1)]}],
+    ),
+    IndexSpec(
+        "log_messages", [("messages.message_id", 1)], queries=[{"filter": {"messages.message_id": "0"}}]
+    ),
+    IndexSpec(
+        "search_index",
+        [("token", 1), ("key", 1)],
+        queries=[
+            {"filter": {"token": "x"}},
+            {"filter": {"token": {"$regex": "^x"}}},
+            {"filter": {"token": "x", "key": {"$in": ["0"]}}},
+        ],
+    ),
+    IndexSpec("search_index", [("key", 1)], queries=[{"filter": {"key": {"$in": ["0"]}}}]),
+    IndexSpec(
+        "log_messages",
+        [("messages.content", "text"), ("messages.author.name", "text")],
+        queries=[{"filter": {"$text": {"$search": '"x"'}}}],
+    ),
+    IndexSpec(
+        "closures",
+        [("bot_id", 1), ("due", 1)],
+        queries=[{"filter": {"bot_id": "0"}, "sort": [("due", 1)]}],
+    ),
+    IndexSpec("blocks", [("bot_id", 1)], queries=[{"filter": {"bot_id": "0"}}]),
+    # expired blocks are lifted by the bot, this only cleans up after instances that were offline
+    IndexSpec("blocks", [("expires_at", 1)], expireAfterSeconds=0),
+    IndexSpec(
+        "startup_reports",
+        [("bot_id", 1), ("started_at", -1)],
+        queries=[{"filter": {"bot_id": "0"}, "sort": [("started_at", -1)]}],
+    ),
+    IndexSpec("relay_messages", [("channel_id", 1)], queries=[{"filter": {"channel_id": "0"}}]),
+    IndexSpec("notes", [("recipient", 1)], queries=[{"filter": {"recipient": "0"}}]),
+    IndexSpec("notes", [("message_id", 1)], queries=[{"filter": {"message_id": "0"}}]),
+]
+
+
+class LogStream:
+    """
+    Streams the log entries matching a query, newest first.
+
+    Entries are fetched `page_size` at a time with keyset pagination on
+    (`sort_field`, `_id`), so memory use doesn't grow with the number of
+    matches and no entry is skipped or repeated while logs are added.
+
+    Parameters
+    ----------
+    collection
+        The logs collection.
+    query : Union[dict, Callable[[], Awaitable[dict]]]
+        The filter, or a coroutine function building it on first use.
+    page_size : int
+        Number of entries fetched per round trip.
+    projection : dict, optional
+        The fields to fetch. Defaults to everything but the first five messages.
+    sort_field : str
+        The field entries are ordered by, descending.
+    limit : int, optional
+        Maximum number of entries to return.
+    after : Tuple[Any, Any], optional
+        Resume after this (`sort_field`, `_id`) position.
+    prepare : Callable[[List[dict]], Awaitable[List[dict]]], optional
+        Called with every page before it is returned.
+
+    Attributes
+    ----------
+    after : Tuple[Any, Any], optional
+        Position of the last entry returned, pass it back to resume later.
+    exhausted : bool
+        Whether every matching entry has been returned.
+    """
+
+    def __init__(
+        self,
+        collection,
+        query: Union[dict, Callable[[], Awaitable[dict]]],
+        *,
+        page_size: int = 25,
+        projection: Optional[dict] = None,
+        sort_field: str = "closed_at",
+        limit: Optional[int] = None,
+        after: Optional[Tuple[Any, Any]] = None,
+        prepare: Optional[Callable[[List[dict]], Awaitable[List[dict]]]] = None,
+    ):
+        self.collection = collection
+        self._query = query
+        self.page_size = page_size
+        self.projection = projection if projection is not None else {"messages": {"$slice": 5}}
+        if any(value is True or value == 1 for value in self.projection.values()):
+            # keyset pagination needs the sort field of the last entry
+            self.projection = {**self.projection, sort_field: 1}
+        self.sort_field = sort_field
+        self.limit = limit
+        self.after = after
+        self.prepare = prepare
+        self.exhausted = False
+        self._returned = 0
+
+    async def _resolve_query(self) -> dict:
+        if callable(self._query):
+            self._query = await self._query()
+        return self._query
+
+    async def count(self) -> int:
+        """Number of matching entries, counted by the database without fetching them."""
+        count = await self.collection.count_documents(await self._resolve_query())
+        return count if self.limit is None else min(count, self.limit)
+
+    def seek(self, after: Optional[Tuple[Any, Any]], returned: int = 0) -> None:
+        """
+        Moves the stream to a position returned earlier.
+
+        Parameters
+        ----------
+        after : Tuple[Any, Any], optional
+            The (`sort_field`, `_id`) position to resume after, `None` for the start.
+        returned : int
+            Number of entries before that position, counted against `limit`.
+        """
+        self.after = after
+        self._returned = returned
+        self.exhausted = False
+
+    async def next_page(
+        self, size: Optional[int] = None, *, projection: Optional[dict] = None, prepare: bool = True
+    ) -> List[dict]:
+        """
+        Fetches the next page of entries, empty once the stream is exhausted.
+
+        Parameters
+        ----------
+        size : int, optional
+            Number of entries to fetch, defaults to `page_size`.
+        projection : dict, optional
+            Overrides the stream's projection for this page.
+        prepare : bool
+            Whether to pass the page through `prepare`.
+        """
+        size = size or self.page_size
+        if self.limit is not None:
+            size = min(size, self.limit - self._returned)
+        if self.exhausted or size <= 0:
+            self.exhausted = True
+            return []
+
+        query = await self._resolve_query()
+        if self.after is not None:
+            value, last_id = self.after
+            query = {
+                "$and": [
+                    query,
+                    {
+                        "$or": [
+                            {self.sort_field: {"$lt": value}},
+                            {self.sort_field: value, "_id": {"$lt": last_id}},
+                        ]
+                    },
+                ]
+            }
+        docs = await self.collection.find(
+            query,
+            projection if projection is not None else self.projection,
+            sort=[(self.sort_field, -1), ("_id", -1)],
+            limit=size,
+        ).to_list(size)
+
+        if len(docs) < size:
+            self.exhausted = True
+        if docs:
+            self.after = (docs[-1].get(self.sort_field), docs[-1]["_id"])
+            self._returned += len(docs)
+        if prepare and self.prepare is not None:
+            docs = await self.prepare(docs)
+        return docs
+
+    async def __aiter__(self):
+        while not self.exhausted:
+            for doc in await self.next_page():
+                yield doc
+
+
 class ApiClient:
     """
     This class represents the general request class for all type of clients.
@@ -364,10 +900,13 @@ class ApiClient:
     async def get_latest_user_logs(self, user_id: Union[str, int]):
         return NotImplemented
 
+    async def get_user_stats(self, user_id: Union[str, int]) -> Optional[dict]:
+        return NotImplemented
+
     async def get_responded_logs(self, user_id: Union[str, int]) -> list:
         return NotImplemented
 
-    async def get_open_logs(self) -> list:
+    async def get_open_logs(self, projection: Optional[dict] = None) -> list:
         return NotImplemented
 
     async def get_log(self, channel_id: Union[str, int]) -> dict:
@@ -385,7 +924,15 @@ class ApiClient:
     async def get_config(self) -> dict:
         return NotImplemented
 
-    async def update_config(self, data: dict):
+    async def update_config(
+        self, data: dict, *, unset: Optional[List[str]] = None, version: Optional[int] = None
+    ):
+        return NotImplemented
+
+    async def get_config_version(self) -> int:
+        return NotImplemented
+
+    async def watch_config(self, callback: Callable[[dict], None]) -> bool:
         return NotImplemented
 
     async def edit_message(self, message_id: Union[int, str], new_content: str):
@@ -404,12 +951,92 @@ class ApiClient:
     async def post_log(self, channel_id: Union[int, str], data: dict) -> dict:
         return NotImplemented
 
+    async def close_logs(self, logs: List[dict], data: dict) -> int:
+        return NotImplemented
+
+    async def flush_logs(self, channel_id: Union[int, str, None] = None) -> None:
+        return NotImplemented
+
+    async def record_relay(self, joint_id: Union[int, str], channel_id: Union[int, str], **kwargs) -> None:
+        return NotImplemented
+
+    async def get_relay(self, joint_id: Union[int, str]) -> Optional[dict]:
+        return NotImplemented
+
+    async def get_closures(self) -> List[dict]:
+        return NotImplemented
+
+    async def set_closure(self, recipient_id: Union[int, str], closure: dict) -> None:
+        return NotImplemented
+
+    async def delete_closure(self, recipient_id: Union[int, str], auto_close: bool = False) -> None:
+        return NotImplemented
+
+    async def get_blocks(self) -> List[dict]:
+        return NotImplemented
+
+    async def set_block(self, kind: str, id_: Union[int, str], block: dict) -> None:
+        return NotImplemented
+
+    async def delete_block(self, kind: str, id_: Union[int, str]) -> None:
+        return NotImplemented
+
+    async def get_snoozes(self) -> List[Tuple[int, Optional[datetime]]]:
+        return NotImplemented
+
+    async def watch_snoozes(self, callback: Callable[[int, Optional[datetime]], None]) -> bool:
+        return NotImplemented
+
+    async def write_log_messages(self, batch: Dict[str, List[dict]]) -> None:
+        return NotImplemented
+
+    def iter_log_messages(self, key: str) -> AsyncIterator[dict]:
+        return NotImplemented
+
+    async def migrate_log_messages(self, *, batch_size: int = 50) -> int:
+        return NotImplemented
+
+    async def set_log_expiration(self, expire_after: Optional[int]) -> bool:
+        return NotImplemented
+
+    async def delete_expired_logs(
+        self, before: datetime, *, batch_size: int = 500, max_batches: int = 10
+    ) -> Tuple[int, bool]:
+        return NotImplemented
+
+    async def backfill_log_dates(self, *, batch_size: int = 500) -> int:
+        return NotImplemented
+
     async def search_closed_by(self, user_id: Union[int, str]):
         return NotImplemented
 
     async def search_by_text(self, text: str, limit: Optional[int]):
         return NotImplemented
 
+    def iter_user_logs(self, user_id: Union[int, str], **kwargs) -> LogStream:
+        return NotImplemented
+
+    def iter_closed_by(self, user_id: Union[int, str], **kwargs) -> LogStream:
+        return NotImplemented
+
+    def iter_responded_logs(self, user_id: Union[int, str], **kwargs) -> LogStream:
+        return NotImplemented
+
+    def iter_open_logs(self, **kwargs) -> LogStream:
+        return NotImplemented
+
+    def iter_search_by_text(self, text: str, **kwargs) -> LogStream:
+        return NotImplemented
+
+    async def rank_logs(self, text: str, *, limit: Optional[int] = None) -> Optional[List[str]]:
+        return NotImplemented
+
+    async def get_logs_by_keys(self, keys: List[str], projection: Optional[dict] = None) -> List[dict]:
+        return NotImplemented
+
+    async def rebuild_search_index(self) -> int:
+        return NotImplemented
+
     async def create_note(self, recipient: Member, message: Message, message_id: Union[int, str]):
         return NotImplemented
 
@@ -425,6 +1052,12 @@ class ApiClient:
     async def edit_note(self, message_id: Union[int, str], message: str):
         return NotImplemented
 
+    async def save_startup_report(self, report: dict) -> None:
+        return NotImplemented
+
+    async def get_startup_reports(self, limit: int = 5) -> list:
+        return NotImplemented
+
     def get_plugin_partition(self, cog):
         return NotImplemented
 
@@ -434,8 +1067,21 @@ class ApiClient:
     async def get_user_info(self) -> Optional[dict]:
         return NotImplemented
 
+    async def close(self) -> None:
+        return NotImplemented
+
 
 class MongoDBClient(ApiClient):
+    # number of messages stored per document of the `log_messages` collection
+    BUCKET_SIZE = 100
+    # the string date fields of log entries and their BSON datetime counterparts
+    LOG_DATE_FIELDS = {"created_at": "created_at_date", "closed_at": "closed_at_date"}
+    LOG_TTL_INDEX = "closed_at_date_1"
+    # collections whose documents expire with their log
+    TTL_COLLECTIONS = ("logs", "log_messages", "search_index")
+    # number of startup reports kept per bot
+    STARTUP_REPORTS_KEPT = 50
+
     def __init__(self, bot):
         mongo_uri = bot.config["connection_uri"]
         if mongo_uri is None:
@@ -450,7 +1096,9 @@ class MongoDBClient(ApiClient):
                 raise RuntimeError
 
         try:
-            db = AsyncIOMotorClient(mongo_uri).modmail_bot
+            db = AsyncIOMotorClient(
+                mongo_uri, event_listeners=[bot.startup_profiler.command_listener()]
+            ).modmail_bot
         except ConfigurationError as e:
             logger.critical(
                 "Your MongoDB CONNECTION_URI might be copied wrong, try re-copying from the source again. "
@@ -460,30 +1108,75 @@ class MongoDBClient(ApiClient):
             sys.exit(0)
 
         super().__init__(bot, db)
+        self.log_buffer = LogWriteBuffer(self)
+        self._log_keys: Dict[str, str] = {}  # channel ID -> log key
+        self._bucket_fill: Dict[str, Tuple[int, int]] = {}  # log key -> (last bucket, message count)
+        self._ttl_expire_after: Optional[int] = None  # expireAfterSeconds of the TTL indexes, if any
+        self._untyped_logs: Optional[bool] = None  # whether closed logs without typed dates may remain
+        self.search_index = SearchIndex(db.search_index)
+        self.relay_map = RelayMap(db.relay_messages)
 
-    async def setup_indexes(self):
-        """Setup text indexes so we can use the $search operator"""
-        coll = self.db.logs
-        index_name = "messages.content_text_messages.author.name_text_key_text"
-
-        index_info = await coll.index_information()
-
-        # Backwards compatibility
-        old_index = "messages.content_text_messages.author.name_text"
-        if old_index in index_info:
-            logger.info("Dropping old index: %s", old_index)
-            await coll.drop_index(old_index)
-
-        if index_name not in index_info:
-            logger.info('Creating "text" index for logs collection.')
-            logger.info("Name: %s", index_name)
-            await coll.create_index(
-                [
-                    ("messages.content", "text"),
-                    ("messages.author.name", "text"),
-                    ("key", "text"),
-                ]
+    @property
+    def log_messages(self):
+        return self.db.log_messages
+
+    @property
+    def user_stats(self):
+        return self.db.user_stats
+
+    @property
+    def closures(self):
+        return self.db.closures
+
+    @property
+    def blocks(self):
+        return self.db.blocks
+
+    @property
+    def message_buckets(self) -> bool:
+        """Whether new log messages are stored in the `log_messages` collection."""
+        return self.bot.config.get("log_message_buckets")
+
+    @property
+    def search_indexed(self) -> bool:
+        """Whether log messages are added to the search index."""
+        return self.bot.config.get("log_search_index")
+
+    @property
+    def log_expire_after(self) -> Optional[int]:
+        """Number of seconds closed logs are kept for, `None` if they are never deleted."""
+        duration = self.bot.config.get("log_expiration")
+        if duration == isodate.Duration():
+            return None
+        now = discord.utils.utcnow()
+        return max(int((now - (now - duration)).total_seconds()), 0)
+
+    def _ttl_specs(self, expire_after: int) -> List[IndexSpec]:
+        return [
+            IndexSpec(
+                collection,
+                [("closed_at_date", 1)],
+                expireAfterSeconds=expire_after,
+                queries=[{"filter": {"closed_at_date": {"$lte": datetime(1970, 1, 1, tzinfo=timezone.utc)}}}],
             )
+            for collection in self.TTL_COLLECTIONS
+        ]
+
+    async def setup_indexes(self):
+        """
+        Creates the indexes of `DATABASE_INDEXES` and drops stale ones.
+
+        When `log_expiration` is set, closed logs are expired by TTL indexes as well.
+        """
+        expire_after = self.log_expire_after
+        specs = list(DATABASE_INDEXES)
+        if expire_after is not None:
+            specs += self._ttl_specs(expire_after)
+        manager = IndexManager(self.db, specs, managed=[self.LOG_TTL_INDEX])
+        await manager.reconcile()
+        self._ttl_expire_after = expire_after
+        if self.bot.config["verify_db_indexes"]:
+            await manager.verify()
         logger.debug("Successfully configured and verified database indexes.")
 
     async def validate_database_connection(self, *, ssl_retry=True):
@@ -506,7 +1199,11 @@ class MongoDBClient(ApiClient):
                     'run "Certificate.command" on MacOS, '
                     'and check certifi is up to date "pip3 install --upgrade certifi".'
                 )
-                self.db = AsyncIOMotorClient(mongo_uri, tlsAllowInvalidCertificates=True).modmail_bot
+                self.db = AsyncIOMotorClient(
+                    mongo_uri,
+                    tlsAllowInvalidCertificates=True,
+                    event_listeners=[self.bot.startup_profiler.command_listener()],
+                ).modmail_bot
                 return await self.validate_database_connection(ssl_retry=False)
             if "ServerSelectionTimeoutError" in message:
                 logger.critical(
@@ -531,19 +1228,64 @@ class MongoDBClient(ApiClient):
             logger.debug("Successfully connected to the database.")
         logger.line("debug")
 
+    async def _fill_previews(self, docs: List[dict], limit: int = 5) -> List[dict]:
+        """
+        Fills the `messages` of log entries whose messages live in the
+        `log_messages` collection with the first `limit` messages,
+        using a single query for all entries.
+        """
+        missing = {
+            doc["key"]: doc for doc in docs if doc and not doc.get("messages") and doc.get("message_count")
+        }
+        if not missing:
+            return docs
+
+        pipeline = [
+            {"$match": {"log_key": {"$in": list(missing)}}},
+            {"$sort": {"log_key": 1, "bucket": 1}},
+            {"$group": {"_id": "$log_key", "messages": {"$first": "$messages"}}},
+            {"$project": {"messages": {"$slice": ["$messages", limit]}}},
+        ]
+        async for bucket in self.log_messages.aggregate(pipeline):
+            missing[bucket["_id"]]["messages"] = bucket["messages"]
+        return docs
+
+    async def _fill_messages(self, doc: Optional[dict]) -> Optional[dict]:
+        """
+        Fills the `messages` of a log entry whose messages live in the
+        `log_messages` collection with every message of the thread.
+        """
+        if doc is not None and not doc.get("messages"):
+            doc["messages"] = [message async for message in self.iter_log_messages(doc["key"])]
+        return doc
+
+    async def _bucketed_log_keys(self, bucket_query: dict) -> List[str]:
+        """Keys of the log entries that have a message bucket matching `bucket_query`."""
+        pipeline = [{"$match": bucket_query}, {"$group": {"_id": "$log_key"}}]
+        return [doc["_id"] async for doc in self.log_messages.aggregate(pipeline)]
+
+    async def _find_bucketed_logs(self, bucket_query: dict, query: dict, limit: Optional[int] = None) -> list:
+        """Finds log entries, by `query`, that have a message bucket matching `bucket_query`."""
+        keys = await self._bucketed_log_keys(bucket_query)
+        if not keys:
+            return []
+        return await self.logs.find({**query, "key": {"$in": keys}}, {"messages": {"$slice": 5}}).to_list(
+            limit
+        )
+
     async def get_user_logs(self, user_id: Union[str, int]) -> list:
         query = {"recipient.id": str(user_id), "guild_id": str(self.bot.guild_id)}
         projection = {"messages": {"$slice": 5}}
         logger.debug("Retrieving user %s logs.", user_id)
 
-        return await self.logs.find(query, projection).to_list(None)
+        return await self._fill_previews(await self.logs.find(query, projection).to_list(None))
 
     async def find_log_entry(self, key: str) -> list:
         query = {"key": key}
         projection = {"messages": {"$slice": 5}}
         logger.debug(f"Retrieving log ID {key}.")
 
-        return await self.logs.find(query, projection).to_list(None)
+        return await self._fill_previews(await self.logs.find(query, projection).to_list(None))
 
     async def get_latest_user_logs(self, user_id: Union[str, int]):
         query = {
@@ -556,26 +1298,86 @@ class MongoDBClient(ApiClient):
 
         return await self.logs.find_one(query, projection, limit=1, sort=[("closed_at", -1)])
 
-    async def get_responded_logs(self, user_id: Union[str, int]) -> list:
-        query = {
-            "open": False,
-            "messages": {
-                "$elemMatch": {
-                    "author.id": str(user_id),
-                    "author.mod": True,
-                    "type": {"$in": ["anonymous", "thread_message"]},
-                }
-            },
+    def _user_stats_id(self, user_id: Union[str, int], guild_id: Union[str, int, None] = None) -> str:
+        return f"{guild_id or self.bot.guild_id}-{user_id}"
+
+    async def get_user_stats(self, user_id: Union[str, int]) -> Optional[dict]:
+        """
+        Retrieves the thread statistics of a recipient.
+
+        The statistics are kept up to date when logs are created and closed,
+        so this is a single read. Recipients without statistics yet, whose
+        threads predate them, have theirs computed from their logs once.
+
+        Parameters
+        ----------
+        user_id : Union[str, int]
+            The recipient's ID.
+
+        Returns
+        -------
+        dict
+            `thread_count`, `closed_count`, `open`, `last_key` and `last_closed_at`.
+            Deleted and expired logs are still counted.
+        """
+        stats_id = self._user_stats_id(user_id)
+        stats = await self.user_stats.find_one({"_id": stats_id})
+        if stats is not None and not stats.get("incomplete"):
+            return stats
+
+        query = {"recipient.id": str(user_id), "guild_id": str(self.bot.guild_id)}
+        thread_count = await self.logs.count_documents(query)
+        if stats is not None and stats["thread_count"] == thread_count:
+            # created by `create_log_entry`, every thread of the recipient was counted
+            await self.user_stats.update_one({"_id": stats_id}, {"$unset": {"incomplete": ""}})
+            stats.pop("incomplete")
+            return stats
+
+        logger.debug("Computing the thread statistics of user %s.", user_id)
+        last = await self.logs.find_one(query, {"key": 1, "open": 1}, sort=[("created_at", -1)])
+        last_closed = await self.logs.find_one(
+            {**query, "open": False}, {"closed_at": 1}, sort=[("closed_at", -1)]
+        )
+        computed = {
+            "thread_count": thread_count,
+            "closed_count": await self.logs.count_documents({**query, "open": False}),
+            "open": bool(last and last.get("open")),
+            "last_key": last and last["key"],
+            "last_closed_at": last_closed and last_closed.get("closed_at"),
         }
-        return await self.logs.find(query).to_list(None)
+        if stats is None:
+            # never overwrite statistics that were created in the meantime
+            await self.user_stats.update_one({"_id": stats_id}, {"$setOnInsert": computed}, upsert=True)
+        else:
+            await self.user_stats.update_one(
+                {"_id": stats_id, "incomplete": True}, {"$set": computed, "$unset": {"incomplete": ""}}
+            )
+        return await self.user_stats.find_one({"_id": stats_id})
 
-    async def get_open_logs(self) -> list:
+    async def get_responded_logs(self, user_id: Union[str, int]) -> list:
+        match = {
+            "$elemMatch": {
+                "author.id": str(user_id),
+                "author.mod": True,
+                "type": {"$in": ["anonymous", "thread_message"]},
+            }
+        }
+        logs = await self.logs.find({"open": False, "messages": match}).to_list(None)
+        seen = {log["key"] for log in logs}
+        for log in await self._find_bucketed_logs({"messages": match}, {"open": False}):
+            if log["key"] not in seen:
+                logs.append(log)
+        return await self._fill_previews(logs)
+
+    async def get_open_logs(self, projection: Optional[dict] = None) -> list:
         query = {"open": True}
-        return await self.logs.find(query).to_list(None)
+        return await self.logs.find(query, projection).to_list(None)
 
     async def get_log(self, channel_id: Union[str, int]) -> dict:
         logger.debug("Retrieving channel %s logs.", channel_id)
-        return await self.logs.find_one({"channel_id": str(channel_id)})
+        await self.log_buffer.flush(channel_id)
+        doc = await self.logs.find_one({"channel_id": str(channel_id)})
+        return await self._fill_messages(doc)
 
     async def get_log_link(self, channel_id: Union[str, int]) -> str:
         doc = await self.get_log(channel_id)
@@ -587,14 +1389,17 @@ class MongoDBClient(ApiClient):
 
     async def create_log_entry(self, recipient: Member, channel: TextChannel, creator: Member) -> str:
         key = secrets.token_hex(6)
+        now = discord.utils.utcnow()
 
         await self.logs.insert_one(
             {
                 "_id": key,
                 "key": key,
                 "open": True,
-                "created_at": str(discord.utils.utcnow()),
+                "created_at": str(now),
+                "created_at_date": now,
                 "closed_at": None,
+                "closed_at_date": None,
                 "channel_id": str(channel.id),
                 "guild_id": str(self.bot.guild_id),
                 "bot_id": str(self.bot.user.id),
@@ -616,6 +1421,18 @@ class MongoDBClient(ApiClient):
                 "messages": [],
             }
         )
+        self._log_keys[str(channel.id)] = key
+        self._bucket_fill[key] = (0, 0)
+        # statistics created here may miss earlier threads, `get_user_stats` completes them on first read
+        await self.user_stats.update_one(
+            {"_id": self._user_stats_id(recipient.id)},
+            {
+                "$inc": {"thread_count": 1},
+                "$set": {"open": True, "last_key": key},
+                "$setOnInsert": {"closed_count": 0, "last_closed_at": None, "incomplete": True},
+            },
+            upsert=True,
+        )
         logger.debug("Created a log entry, key %s.", key)
         prefix = self.bot.config["log_url_prefix"].strip("/")
         if prefix == "NONE":
@@ -624,6 +1441,9 @@ class MongoDBClient(ApiClient):
 
     async def delete_log_entry(self, key: str) -> bool:
         result = await self.logs.delete_one({"key": key})
+        await self.log_messages.delete_many({"log_key": key})
+        await self.search_index.remove([key])
+        self._bucket_fill.pop(key, None)
         return result.deleted_count == 1
 
     async def get_config(self) -> dict:
@@ -634,24 +1454,99 @@ class MongoDBClient(ApiClient):
             return {"bot_id": self.bot.user.id}
         return conf
 
-    async def update_config(self, data: dict):
+    async def update_config(
+        self, data: dict, *, unset: Optional[List[str]] = None, version: Optional[int] = None
+    ):
+        """
+        Writes configurations to the database.
+
+        Parameters
+        ----------
+        data : dict
+            The configurations to set.
+        unset : List[str], optional
+            The configurations to remove. If not provided, every
+            configuration missing from `data` is removed.
+        version : int, optional
+            The version of the configurations the changes were made to.
+            The write only happens if the database still holds that
+            version, which it then increments.
+
+        Raises
+        ------
+        ConfigConflictError
+            The configurations in the database are not at `version` anymore.
+        """
         toset = self.bot.config.filter_valid(data)
-        unset = self.bot.config.filter_valid({k: 1 for k in self.bot.config.all_keys if k not in data})
+        if unset is None:
+            unset = self.bot.config.filter_valid({k: 1 for k in self.bot.config.all_keys if k not in data})
+        else:
+            unset = self.bot.config.filter_valid({k: 1 for k in unset})
 
-        if toset and unset:
-            return await self.db.config.update_one(
-                {"bot_id": self.bot.user.id}, {"$set": toset, "$unset": unset}
-            )
+        update = {}
         if toset:
-            return await self.db.config.update_one({"bot_id": self.bot.user.id}, {"$set": toset})
+            update["$set"] = toset
         if unset:
-            return await self.db.config.update_one({"bot_id": self.bot.user.id}, {"$unset": unset})
+            update["$unset"] = unset
+        if not update:
+            return None
+
+        query = {"bot_id": self.bot.user.id}
+        if version is not None:
+            # configurations written before versioning have no version
+            query["_version"] = version if version else {"$in": [None, 0]}
+            update["$inc"] = {"_version": 1}
+        result = await self.db.config.update_one(query, update)
+        if version is not None and not result.matched_count:
+            raise ConfigConflictError(f"Configurations are not at version {version} anymore.")
+        return result
+
+    async def get_config_version(self) -> int:
+        conf = await self.db.config.find_one({"bot_id": self.bot.user.id}, {"_version": 1})
+        return (conf or {}).get("_version", 0)
+
+    async def watch_config(self, callback: Callable[[dict], None]) -> bool:
+        """
+        Watches the configurations being changed, by any instance or tool, until cancelled.
+
+        Parameters
+        ----------
+        callback : Callable[[dict], None]
+            Called with the whole configuration document after every change.
+
+        Returns
+        -------
+        bool
+            `False` if change streams are unavailable, they need a replica set.
+        """
+        pipeline = [{"$match": {"operationType": {"$in": ["insert", "update", "replace"]}}}]
+        try:
+            async with self.db.config.watch(pipeline, full_document="updateLookup") as stream:
+                async for change in stream:
+                    doc = change.get("fullDocument")
+                    if doc and doc.get("bot_id") == self.bot.user.id:
+                        callback(doc)
+        except OperationFailure as e:
+            logger.debug("Cannot watch configurations: %s", e)
+            return False
+        return True
 
     async def edit_message(self, message_id: Union[int, str], new_content: str) -> None:
-        await self.logs.update_one(
-            {"messages.message_id": str(message_id)},
-            {"$set": {"messages.$.content": new_content, "messages.$.edited": True}},
-        )
+        if message_id in self.log_buffer:
+            # the message has not reached the database yet
+            await self.log_buffer.flush()
+        query = {"messages.message_id": str(message_id)}
+        update = {"$set": {"messages.$.content": new_content, "messages.$.edited": True}}
+        doc = await self.logs.find_one_and_update(query, update, {"key": 1, "messages.$": 1})
+        if doc is None:
+            doc = await self.log_messages.find_one_and_update(query, update, {"log_key": 1, "messages.$": 1})
+            if doc is not None:
+                doc["key"] = doc["log_key"]
+
+        if self.search_indexed and doc is not None and doc.get("messages"):
+            # the previous content is removed from the index and the new one added
+            message = doc["messages"][0]
+            await self.search_index.replace(doc["key"], message, {**message, "content": new_content})
 
     async def append_log(
         self,
@@ -661,6 +1556,18 @@ class MongoDBClient(ApiClient):
         channel_id: str = "",
         type_: str = "thread_message",
     ) -> dict:
+        """
+        Queues a message to be appended to the log of its thread.
+
+        The message is written by `log_buffer` within a second, call
+        `flush_logs` to wait for it to reach the database.
+
+        Returns
+        -------
+        dict
+            The message as it will be stored in the log. This used to be
+            the updated log entry, which is no longer read back.
+        """
         channel_id = str(channel_id) or str(message.channel.id)
         message_id = str(message_id) or str(message.id)
 
@@ -688,19 +1595,619 @@ class MongoDBClient(ApiClient):
             ],
         }
 
-        return await self.logs.find_one_and_update(
-            {"channel_id": channel_id},
-            {"$push": {"messages": data}},
-            return_document=True,
-        )
+        self.log_buffer.push(channel_id, data)
+        return data
+
+    @staticmethod
+    def _parse_log_date(value: Optional[str]) -> Optional[datetime]:
+        if not value:
+            return None
+        try:
+            date = datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            return None
+        # log dates have always been stored in UTC
+        return date.replace(tzinfo=timezone.utc) if date.tzinfo is None else date.astimezone(timezone.utc)
+
+    def _with_log_dates(self, data: dict) -> dict:
+        """Adds the BSON datetime counterparts of the string dates in `data`."""
+        typed = {
+            typed_field: self._parse_log_date(data[field])
+            for field, typed_field in self.LOG_DATE_FIELDS.items()
+            if field in data
+        }
+        return {**data, **typed}
 
     async def post_log(self, channel_id: Union[int, str], data: dict) -> dict:
-        return await self.logs.find_one_and_update(
-            {"channel_id": str(channel_id)}, {"$set": data}, return_document=True
+        await self.log_buffer.flush(channel_id)
+        data = self._with_log_dates(data)
+        closing = data.get("open") is False
+        doc = None
+        if closing:
+            # only the close of an open log counts in the statistics
+            doc = await self.logs.find_one_and_update(
+                {"channel_id": str(channel_id), "open": True}, {"$set": data}, return_document=True
+            )
+        counted = doc is not None
+        if doc is None:
+            doc = await self.logs.find_one_and_update(
+                {"channel_id": str(channel_id)}, {"$set": data}, return_document=True
+            )
+        if closing:
+            key = self._log_keys.pop(str(channel_id), None)
+            self._bucket_fill.pop(key, None)
+            await self.relay_map.forget(channel_id)
+        if doc is not None and "closed_at_date" in data:
+            await self._set_closed_at([(doc["key"], data["closed_at_date"])])
+        if counted:
+            await self.user_stats.update_one(
+                {"_id": self._user_stats_id(doc["recipient"]["id"], doc.get("guild_id"))},
+                {
+                    "$inc": {"closed_count": 1},
+                    "$set": {"open": False, "last_closed_at": data.get("closed_at")},
+                },
+            )
+        return await self._fill_messages(doc)
+
+    async def close_logs(self, logs: List[dict], data: dict) -> int:
+        """
+        Closes many log entries at once, such as those of deleted channels.
+
+        Unlike calling `post_log` for each of them, the logs and the
+        statistics of their recipients are each updated with a single
+        `bulk_write`.
+
+        Parameters
+        ----------
+        logs : List[dict]
+            The log entries, with at least their `_id`, `key`, `channel_id`,
+            `recipient.id` and `guild_id`.
+        data : dict
+            The fields set on every log, with `open` set to `False`.
+
+        Returns
+        -------
+        int
+            The number of logs closed, logs closed in the meantime are skipped.
+        """
+        if not logs:
+            return 0
+        # logs closed in the meantime keep their data and are not counted again in the statistics
+        open_ids = set(
+            await self.logs.distinct("_id", {"_id": {"$in": [log["_id"] for log in logs]}, "open": True})
+        )
+        logs = [log for log in logs if log["_id"] in open_ids]
+        if not logs:
+            return 0
+        data = self._with_log_dates(data)
+        result = await self.logs.bulk_write(
+            [UpdateOne({"_id": log["_id"], "open": True}, {"$set": data}) for log in logs], ordered=False
+        )
+
+        channel_ids = [str(log["channel_id"]) for log in logs if log.get("channel_id") is not None]
+        for channel_id in channel_ids:
+            self._bucket_fill.pop(self._log_keys.pop(channel_id, None), None)
+        await self.relay_map.forget_many(channel_ids)
+        if "closed_at_date" in data:
+            await self._set_closed_at([(log["key"], data["closed_at_date"]) for log in logs])
+        stats = [
+            UpdateOne(
+                {"_id": self._user_stats_id(log["recipient"]["id"], log.get("guild_id"))},
+                {
+                    "$inc": {"closed_count": 1},
+                    "$set": {"open": False, "last_closed_at": data.get("closed_at")},
+                },
+            )
+            for log in logs
+            if (log.get("recipient") or {}).get("id") is not None
+        ]
+        if stats:
+            await self.user_stats.bulk_write(stats, ordered=False)
+        return result.modified_count
+
+    async def _set_closed_at(self, closed: List[Tuple[str, Optional[datetime]]]) -> None:
+        # buckets and postings carry the closing date of their log so the TTL indexes expire them together
+        if closed and self.message_buckets:
+            await self.log_messages.bulk_write(
+                [
+                    UpdateMany({"log_key": key}, {"$set": {"closed_at_date": closed_at}})
+                    for key, closed_at in closed
+                ],
+                ordered=False,
+            )
+        if self.search_indexed:
+            for key, closed_at in closed:
+                await self.search_index.set_closed(key, closed_at)
+
+    async def flush_logs(self, channel_id: Union[int, str, None] = None) -> None:
+        await self.log_buffer.flush(channel_id)
+        if channel_id is None:
+            await self.relay_map.flush()
+
+    async def record_relay(self, joint_id: Union[int, str], channel_id: Union[int, str], **kwargs) -> None:
+        self.relay_map.record(joint_id, channel_id, **kwargs)
+
+    async def get_relay(self, joint_id: Union[int, str]) -> Optional[dict]:
+        return await self.relay_map.get(joint_id)
+
+    def _closure_id(self, recipient_id: Union[int, str], auto_close: bool) -> str:
+        return f"{self.bot.user.id}-{recipient_id}" + ("-auto" if auto_close else "")
+
+    async def get_closures(self) -> List[dict]:
+        """The scheduled closes of this bot's threads, the earliest due first."""
+        closures = []
+        async for doc in self.closures.find({"bot_id": str(self.bot.user.id)}).sort("due", 1):
+            if doc["due"].tzinfo is None:
+                doc["due"] = doc["due"].replace(tzinfo=timezone.utc)
+            closures.append(doc)
+        return closures
+
+    async def set_closure(self, recipient_id: Union[int, str], closure: dict) -> None:
+        """
+        Stores the scheduled close of a thread, replacing the previous one
+        of the same kind. A thread can have both a scheduled close and an
+        auto close.
+
+        Parameters
+        ----------
+        recipient_id : Union[int, str]
+            The recipient of the thread.
+        closure : dict
+            The `due` datetime and the arguments of `Thread.close`.
+        """
+        await self.closures.replace_one(
+            {"_id": self._closure_id(recipient_id, closure.get("auto_close", False))},
+            {"bot_id": str(self.bot.user.id), "recipient_id": str(recipient_id), **closure},
+            upsert=True,
         )
 
+    async def delete_closure(self, recipient_id: Union[int, str], auto_close: bool = False) -> None:
+        await self.closures.delete_one({"_id": self._closure_id(recipient_id, auto_close)})
+
+    def _block_id(self, kind: str, id_: Union[int, str]) -> str:
+        return f"{self.bot.user.id}-{kind}-{id_}"
+
+    async def get_blocks(self) -> List[dict]:
+        """The blocked users and roles of this bot."""
+        blocks = []
+        async for doc in self.blocks.find({"bot_id": str(self.bot.user.id)}):
+            expires_at = doc.get("expires_at")
+            if expires_at is not None and expires_at.tzinfo is None:
+                doc["expires_at"] = expires_at.replace(tzinfo=timezone.utc)
+            blocks.append(doc)
+        return blocks
+
+    async def set_block(self, kind: str, id_: Union[int, str], block: dict) -> None:
+        """
+        Stores the block of a user or role, replacing the previous one.
+
+        Parameters
+        ----------
+        kind : str
+            `"user"` or `"role"`.
+        id_ : Union[int, str]
+            The ID of the user or role.
+        block : dict
+            The block record, see `BlockList`.
+        """
+        await self.blocks.replace_one(
+            {"_id": self._block_id(kind, id_)},
+            {"bot_id": str(self.bot.user.id), **block},
+            upsert=True,
+        )
+
+    async def delete_block(self, kind: str, id_: Union[int, str]) -> None:
+        await self.blocks.delete_one({"_id": self._block_id(kind, id_)})
+
+    async def get_snoozes(self) -> List[Tuple[int, Optional[datetime]]]:
+        """The recipient ID and wake time of every snoozed log."""
+        return [
+            (int(doc["recipient"]["id"]), self._parse_log_date(doc.get("snooze_until")))
+            async for doc in self.logs.find({"snoozed": True}, {"recipient.id": 1, "snooze_until": 1})
+        ]
+
+    async def watch_snoozes(self, callback: Callable[[int, Optional[datetime]], None]) -> bool:
+        """
+        Watches logs being snoozed and unsnoozed, by any instance, until cancelled.
+
+        Parameters
+        ----------
+        callback : Callable[[int, Optional[datetime]], None]
+            Called with the recipient ID and the wake time of every snoozed
+            log, or `None` as the wake time once it's unsnoozed.
+
+        Returns
+        -------
+        bool
+            `False` if change streams are unavailable, they need a replica set.
+        """
+        pipeline = [
+            {
+                "$match": {
+                    "operationType": "update",
+                    "$or": [
+                        {"updateDescription.updatedFields.snoozed": {"$exists": True}},
+                        {"updateDescription.removedFields": "snoozed"},
+                    ],
+                }
+            }
+        ]
+        try:
+            async with self.logs.watch(pipeline, full_document="updateLookup") as stream:
+                async for change in stream:
+                    doc = change.get("fullDocument")
+                    if not doc or not doc.get("recipient"):
+                        continue
+                    wake_at = self._parse_log_date(doc.get("snooze_until")) if doc.get("snoozed") else None
+                    callback(int(doc["recipient"]["id"]), wake_at)
+        except OperationFailure as e:
+            logger.debug("Cannot watch snoozed logs: %s", e)
+            return False
+        return True
+
+    async def _get_log_key(self, channel_id: str) -> Optional[str]:
+        key = self._log_keys.get(channel_id)
+        if key is None:
+            doc = await self.logs.find_one({"channel_id": channel_id}, {"key": 1}, sort=[("created_at", -1)])
+            if doc is None:
+                return None
+            key = self._log_keys[channel_id] = doc["key"]
+        return key
+
+    async def _get_bucket_fill(self, key: str) -> Tuple[int, int]:
+        fill = self._bucket_fill.get(key)
+        if fill is None:
+            doc = await self.log_messages.find_one(
+                {"log_key": key}, {"bucket": 1, "count": 1}, sort=[("bucket", -1)]
+            )
+            fill = (doc["bucket"], doc["count"]) if doc else (0, 0)
+        return fill
+
+    async def write_log_messages(self, batch: Dict[str, List[dict]]) -> None:
+        """
+        Writes a batch of log messages to the database.
+
+        Without `log_message_buckets` the messages are pushed to the
+        `messages` array of the log entry. Otherwise they are appended to
+        fixed size documents of the `log_messages` collection, so the log
+        entry itself stays small no matter how long the thread gets.
+
+        Parameters
+        ----------
+        batch : Dict[str, List[dict]]
+            Mapping of channel ID to the messages to append, in order.
+        """
+        if not self.message_buckets:
+            channels = list(batch)
+            try:
+                await self.logs.bulk_write(
+                    [
+                        # each push is atomic, a retried push that did reach the database is skipped
+                        UpdateOne(
+                            {"channel_id": cid, "messages.message_id": {"$ne": batch[cid][0]["message_id"]}},
+                            {"$push": {"messages": {"$each": batch[cid]}}},
+                        )
+                        for cid in channels
+                    ],
+                    ordered=False,
+                )
+            except BulkWriteError as e:
+                failed = {channels[error["index"]] for error in e.details["writeErrors"]}
+                await self._index_log_messages({cid: batch[cid] for cid in channels if cid not in failed})
+                raise LogWriteError(
+                    f"Failed to write the messages of {len(failed)} log(s).",
+                    {cid: batch[cid] for cid in failed},
+                ) from e
+            await self._index_log_messages(batch)
+            return
+
+        bucket_requests = []
+        log_requests = []
+        chunks = []  # (channel ID, log key, messages) of each bucket request
+        fills = {}
+        for channel_id, entries in batch.items():
+            key = await self._get_log_key(channel_id)
+            if key is None:
+                logger.warning(
+                    "No log entry for channel %s, dropping %d message(s).", channel_id, len(entries)
+                )
+                continue
+
+            bucket, count = await self._get_bucket_fill(key)
+            while entries:
+                if count >= self.BUCKET_SIZE:
+                    bucket, count = bucket + 1, 0
+                chunk, entries = entries[: self.BUCKET_SIZE - count], entries[self.BUCKET_SIZE - count :]
+                bucket_requests.append(
+                    UpdateOne(
+                        {"_id": f"{key}-{bucket}"},
+                        {
+                            "$setOnInsert": {"log_key": key, "channel_id": channel_id, "bucket": bucket},
+                            "$push": {"messages": {"$each": chunk}},
+                            "$inc": {"count": len(chunk)},
+                        },
+                        upsert=True,
+                    )
+                )
+                count += len(chunk)
+                log_requests.append(UpdateOne({"key": key}, {"$inc": {"message_count": len(chunk)}}))
+                chunks.append((channel_id, key, chunk))
+            fills[key] = (bucket, count)
+
+        if not bucket_requests:
+            return
+        try:
+            await self.log_messages.bulk_write(bucket_requests)
+        except BulkWriteError as e:
+            # ordered, the requests before the first failure were written and none after it
+            written = e.details["nInserted"] + e.details["nUpserted"] + e.details["nMatched"]
+            unwritten = {}
+            for channel_id, key, chunk in chunks[written:]:
+                unwritten.setdefault(channel_id, []).extend(chunk)
+                # the fill of the bucket has to be read again
+                fills.pop(key, None)
+                self._bucket_fill.pop(key, None)
+            if written:
+                await self.logs.bulk_write(log_requests[:written], ordered=False)
+            self._bucket_fill.update(fills)
+            retried = {m["message_id"] for entries in unwritten.values() for m in entries}
+            await self._index_log_messages(
+                {
+                    cid: [m for m in entries if m["message_id"] not in retried]
+                    for cid, entries in batch.items()
+                }
+            )
+            raise LogWriteError(
+                f"Failed to write {len(chunks) - written} log message bucket(s).", unwritten
+            ) from e
+
+        await self.logs.bulk_write(log_requests, ordered=False)
+        self._bucket_fill.update(fills)
+        await self._index_log_messages(batch)
+
+    async def _index_log_messages(self, batch: Dict[str, List[dict]]) -> None:
+        if not self.search_indexed:
+            return
+        keyed = {}
+        for channel_id, entries in batch.items():
+            key = await self._get_log_key(channel_id)
+            if key is not None:
+                keyed[key] = entries
+        await self.search_index.add(keyed)
+
+    async def _flush_log_key(self, key: str) -> None:
+        """Writes the buffered messages of the log entry `key`, leaving other threads' queued."""
+        doc = await self.logs.find_one({"key": key}, {"channel_id": 1})
+        if doc is not None and doc.get("channel_id") is not None:
+            await self.log_buffer.flush(doc["channel_id"])
+
+    async def iter_log_messages(self, key: str) -> AsyncIterator[dict]:
+        """
+        Iterates over every message of a log entry, oldest first.
+
+        Bucketed messages are fetched lazily by the cursor instead of
+        loading the whole thread into memory at once.
+        """
+        await self._flush_log_key(key)
+        doc = await self.logs.find_one({"key": key}, {"messages": 1})
+        if doc is None:
+            return
+        for message in doc.get("messages") or []:
+            yield message
+        async for bucket in self.log_messages.find({"log_key": key}, {"messages": 1}, sort=[("bucket", 1)]):
+            for message in bucket["messages"]:
+                yield message
+
+    async def migrate_log_messages(self, *, batch_size: int = 50) -> int:
+        """
+        Moves messages embedded in log entries to the `log_messages` collection.
+
+        Entries are converted one at a time while holding the write buffer
+        lock, so this can run while the bot is in use.
+
+        Parameters
+        ----------
+        batch_size : int
+            Number of log entries fetched from the database per round trip.
+
+        Returns
+        -------
+        int
+            The number of log entries converted.
+        """
+        converted = 0
+        cursor = self.logs.find({"messages.0": {"$exists": True}}, {"key": 1}, batch_size=batch_size)
+        async for doc in cursor:
+            key = doc["key"]
+            async with self.log_buffer._lock:
+                # atomically take the embedded messages so nothing is lost or moved twice
+                old = await self.logs.find_one_and_update(
+                    {"_id": doc["_id"], "messages.0": {"$exists": True}},
+                    {"$set": {"messages": []}},
+                    projection={"messages": 1, "channel_id": 1},
+                )
+                if old is None:
+                    continue
+                messages = old["messages"]
+                chunks = [
+                    messages[i : i + self.BUCKET_SIZE] for i in range(0, len(messages), self.BUCKET_SIZE)
+                ]
+                # embedded messages are older than anything already bucketed,
+                # so they are numbered to sort before the existing buckets
+                first = await self.log_messages.find_one(
+                    {"log_key": key}, {"bucket": 1}, sort=[("bucket", 1)]
+                )
+                start = 0 if first is None else first["bucket"] - len(chunks)
+                await self.log_messages.insert_many(
+                    [
+                        {
+                            "_id": f"{key}-{start + n}",
+                            "log_key": key,
+                            "channel_id": old.get("channel_id"),
+                            "bucket": start + n,
+                            "count": len(chunk),
+                            "messages": chunk,
+                        }
+                        for n, chunk in enumerate(chunks)
+                    ]
+                )
+                await self.logs.update_one({"_id": doc["_id"]}, {"$inc": {"message_count": len(messages)}})
+                self._bucket_fill.pop(key, None)
+            converted += 1
+            if converted % 100 == 0:
+                logger.info("Moved the messages of %d log entries.", converted)
+        return converted
+
+    async def set_log_expiration(self, expire_after: Optional[int]) -> bool:
+        """
+        Creates, updates or drops the TTL indexes expiring closed logs.
+
+        Parameters
+        ----------
+        expire_after : int, optional
+            Number of seconds closed logs are kept for, `None` to keep them forever.
+
+        Returns
+        -------
+        bool
+            Whether the database now expires closed logs by itself.
+        """
+        if expire_after == self._ttl_expire_after:
+            return expire_after is not None
+
+        try:
+            for collection in self.TTL_COLLECTIONS:
+                info = (await self.db[collection].index_information()).get(self.LOG_TTL_INDEX)
+                if expire_after is None:
+                    if info is not None:
+                        await self.db[collection].drop_index(self.LOG_TTL_INDEX)
+                elif info is None:
+                    await self.db[collection].create_index(
+                        [("closed_at_date", 1)], name=self.LOG_TTL_INDEX, expireAfterSeconds=expire_after
+                    )
+                elif info.get("expireAfterSeconds") != expire_after:
+                    await self.db.command(
+                        "collMod",
+                        collection,
+                        index={"name": self.LOG_TTL_INDEX, "expireAfterSeconds": expire_after},
+                    )
+        except OperationFailure as e:
+            logger.warning("Unable to update the log expiry TTL indexes, deleting in batches instead: %s", e)
+            self._ttl_expire_after = None
+            return False
+
+        logger.info("Log expiry TTL indexes set to %s seconds.", expire_after)
+        self._ttl_expire_after = expire_after
+        return expire_after is not None
+
+    async def _delete_logs(self, docs: List[dict]) -> None:
+        keys = [doc["key"] for doc in docs]
+        await self.logs.delete_many({"_id": {"$in": [doc["_id"] for doc in docs]}})
+        await self.log_messages.delete_many({"log_key": {"$in": keys}})
+        await self.search_index.remove(keys)
+
+    async def delete_expired_logs(
+        self, before: datetime, *, batch_size: int = 500, max_batches: int = 10
+    ) -> Tuple[int, bool]:
+        """
+        Deletes logs closed before a date, a bounded number of batches at a time.
+
+        Logs with typed dates are left to the TTL indexes when they are active.
+        Logs closed before the typed dates were introduced are compared by
+        their string `closed_at`, until `backfill_log_dates` is run.
+
+        Parameters
+        ----------
+        before : datetime
+            Logs closed before this date are deleted.
+        batch_size : int
+            Number of logs deleted per round trip.
+        max_batches : int
+            Maximum number of round trips.
+
+        Returns
+        -------
+        Tuple[int, bool]
+            The number of logs deleted and whether every expired log has been deleted.
+        """
+        queries = []
+        if self._ttl_expire_after is None:
+            queries.append({"closed_at_date": {"$lte": before}})
+        if self._untyped_logs is None:
+            untyped = await self.logs.find_one(
+                {"open": False, "closed_at_date": {"$exists": False}}, {"_id": 1}
+            )
+            self._untyped_logs = untyped is not None
+        if self._untyped_logs:
+            # comparison is done lexicographically, which is fine for zero-padded ISO dates
+            queries.append(
+                {"open": False, "closed_at_date": {"$exists": False}, "closed_at": {"$lte": str(before)}}
+            )
+
+        deleted = batches = 0
+        for query in queries:
+            while True:
+                if batches == max_batches:
+                    return deleted, False
+                docs = await self.logs.find(query, {"key": 1}, limit=batch_size).to_list(batch_size)
+                batches += 1
+                if docs:
+                    await self._delete_logs(docs)
+                    deleted += len(docs)
+                if len(docs) < batch_size:
+                    break
+        return deleted, True
+
+    async def backfill_log_dates(self, *, batch_size: int = 500) -> int:
+        """
+        Adds the typed date fields to log entries created before they existed.
+
+        Parameters
+        ----------
+        batch_size : int
+            Number of log entries updated per round trip.
+
+        Returns
+        -------
+        int
+            The number of log entries updated.
+        """
+        updated = 0
+        projection = {"key": 1, **{field: 1 for field in self.LOG_DATE_FIELDS}}
+        while True:
+            docs = await self.logs.find(
+                {"created_at_date": {"$exists": False}}, projection, limit=batch_size
+            ).to_list(batch_size)
+            if not docs:
+                break
+            dates = [
+                self._with_log_dates({field: doc.get(field) for field in self.LOG_DATE_FIELDS})
+                for doc in docs
+            ]
+            await self.logs.bulk_write(
+                [
+                    UpdateOne(
+                        {"_id": doc["_id"]},
+                        {"$set": {field: date[field] for field in self.LOG_DATE_FIELDS.values()}},
+                    )
+                    for doc, date in zip(docs, dates)
+                ],
+                ordered=False,
+            )
+            await self._set_closed_at(
+                [
+                    (doc["key"], date["closed_at_date"])
+                    for doc, date in zip(docs, dates)
+                    if date["closed_at_date"]
+                ]
+            )
+            updated += len(docs)
+            logger.info("Added typed dates to %d log entries.", updated)
+        self._untyped_logs = False
+        return updated
+
     async def search_closed_by(self, user_id: Union[int, str]):
-        return await self.logs.find(
+        logs = await self.logs.find(
             {
                 "guild_id": str(self.bot.guild_id),
                 "open": False,
@@ -708,16 +2215,134 @@ class MongoDBClient(ApiClient):
             },
             {"messages": {"$slice": 5}},
         ).to_list(None)
+        return await self._fill_previews(logs)
 
     async def search_by_text(self, text: str, limit: Optional[int]):
-        return await self.bot.db.logs.find(
-            {
-                "guild_id": str(self.bot.guild_id),
-                "open": False,
-                "$text": {"$search": f'"{text}"'},
-            },
-            {"messages": {"$slice": 5}},
-        ).to_list(limit)
+        query = {"guild_id": str(self.bot.guild_id), "open": False}
+        search = {"$text": {"$search": f'"{text}"'}}
+        logs = await self.bot.db.logs.find({**query, **search}, {"messages": {"$slice": 5}}).to_list(limit)
+        if limit is None or len(logs) < limit:
+            seen = {log["key"] for log in logs}
+            for log in await self._find_bucketed_logs(search, query, limit):
+                if log["key"] not in seen:
+                    logs.append(log)
+            if limit is not None:
+                logs = logs[:limit]
+        return await self._fill_previews(logs)
+
+    async def rank_logs(self, text: str, *, limit: Optional[int] = None) -> Optional[List[str]]:
+        """
+        Searches closed logs through the search index, most relevant first.
+
+        Parameters
+        ----------
+        text : str
+            The search terms, every one of them has to be found in a log.
+            A term ending with `*` matches every word it starts.
+        limit : int, optional
+            Maximum number of log keys to return.
+
+        Returns
+        -------
+        List[str]
+            The keys of the matching logs, `None` if the search index is disabled.
+        """
+        if not self.search_indexed:
+            return None
+        ranked = await rank(self.search_index, text, await self.logs.estimated_document_count())
+        keys = [key for key, _ in ranked]
+
+        # postings of open logs, logs of other guilds and expired logs are skipped here
+        closed = set()
+        for start in range(0, len(keys), 1000):
+            closed.update(
+                await self.logs.distinct(
+                    "key",
+                    {
+                        "key": {"$in": keys[start : start + 1000]},
+                        "guild_id": str(self.bot.guild_id),
+                        "open": False,
+                    },
+                )
+            )
+        keys = [key for key in keys if key in closed]
+        return keys if limit is None else keys[:limit]
+
+    async def get_logs_by_keys(self, keys: List[str], projection: Optional[dict] = None) -> List[dict]:
+        """Fetches log entries in the order of `keys`, with their message previews."""
+        projection = projection if projection is not None else {"messages": {"$slice": 5}}
+        docs = {doc["key"]: doc async for doc in self.logs.find({"key": {"$in": keys}}, projection)}
+        return await self._fill_previews([docs[key] for key in keys if key in docs])
+
+    async def rebuild_search_index(self) -> int:
+        """
+        Rebuilds the search index from every log entry.
+
+        Returns
+        -------
+        int
+            The number of log entries indexed.
+        """
+        await self.search_index.clear()
+        indexed = 0
+        async for doc in self.logs.find({}, {"key": 1, "open": 1, "closed_at_date": 1}):
+            key = doc["key"]
+            await self.search_index.add({key: [message async for message in self.iter_log_messages(key)]})
+            if not doc.get("open") and doc.get("closed_at_date"):
+                await self.search_index.set_closed(key, doc["closed_at_date"])
+            indexed += 1
+            if indexed % 100 == 0:
+                logger.info("Indexed %d log entries.", indexed)
+        return indexed
+
+    def _log_stream(self, query, **kwargs) -> LogStream:
+        return LogStream(self.logs, query, prepare=self._fill_previews, **kwargs)
+
+    def iter_user_logs(self, user_id: Union[int, str], **kwargs) -> LogStream:
+        """Streams the closed logs of a user, see `LogStream` for the options."""
+        query = {"recipient.id": str(user_id), "guild_id": str(self.bot.guild_id), "open": False}
+        return self._log_stream(query, **kwargs)
+
+    def iter_closed_by(self, user_id: Union[int, str], **kwargs) -> LogStream:
+        """Streams the logs closed by a user, see `LogStream` for the options."""
+        query = {"guild_id": str(self.bot.guild_id), "open": False, "closer.id": str(user_id)}
+        return self._log_stream(query, **kwargs)
+
+    def iter_responded_logs(self, user_id: Union[int, str], **kwargs) -> LogStream:
+        """Streams the closed logs a user has replied in, see `LogStream` for the options."""
+        match = {
+            "$elemMatch": {
+                "author.id": str(user_id),
+                "author.mod": True,
+                "type": {"$in": ["anonymous", "thread_message"]},
+            }
+        }
+
+        async def query():
+            keys = await self._bucketed_log_keys({"messages": match})
+            if keys:
+                return {"open": False, "$or": [{"messages": match}, {"key": {"$in": keys}}]}
+            return {"open": False, "messages": match}
+
+        return self._log_stream(query, **kwargs)
+
+    def iter_open_logs(self, **kwargs) -> LogStream:
+        """Streams the open logs, newest first, see `LogStream` for the options."""
+        kwargs.setdefault("sort_field", "created_at")
+        return self._log_stream({"open": True}, **kwargs)
+
+    def iter_search_by_text(self, text: str, **kwargs) -> LogStream:
+        """Streams the closed logs containing `text`, see `LogStream` for the options."""
+        search = {"$text": {"$search": f'"{text}"'}}
+
+        async def query():
+            base = {"guild_id": str(self.bot.guild_id), "open": False}
+            keys = await self._bucketed_log_keys(search)
+            if keys:
+                return {**base, "$or": [search, {"key": {"$in": keys}}]}
+            return {**base, **search}
+
+        return self._log_stream(query, **kwargs)
 
     async def create_note(self, recipient: Member, message: Message, message_id: Union[int, str]):
         await self.db.notes.insert_one(
@@ -749,6 +2374,34 @@ class MongoDBClient(ApiClient):
     async def edit_note(self, message_id: Union[int, str], message: str):
         await self.db.notes.update_one({"message_id": str(message_id)}, {"$set": {"message": message}})
 
+    async def save_startup_report(self, report: dict) -> None:
+        """
+        Stores a startup report, keeping the `STARTUP_REPORTS_KEPT` latest of the bot.
+
+        Parameters
+        ----------
+        report : dict
+            A report made by `StartupProfiler.finish`.
+        """
+        bot_id = str(self.bot.user.id)
+        await self.db.startup_reports.insert_one({**report, "bot_id": bot_id})
+        stale = (
+            await self.db.startup_reports.find({"bot_id": bot_id}, {"_id": 1})
+            .sort("started_at", -1)
+            .skip(self.STARTUP_REPORTS_KEPT)
+            .to_list(None)
+        )
+        if stale:
+            await self.db.startup_reports.delete_many({"_id": {"$in": [doc["_id"] for doc in stale]}})
+
+    async def get_startup_reports(self, limit: int = 5) -> list:
+        """The latest startup reports of the bot, newest first."""
+        return (
+            await self.db.startup_reports.find({"bot_id": str(self.bot.user.id)}, {"_id": 0, "bot_id": 0})
+            .sort("started_at", -1)
+            .to_list(limit)
+        )
+
     def get_plugin_partition(self, cog):
         cls_name = cog.__class__.__name__
         return self.db.plugins[cls_name]
@@ -780,6 +2433,315 @@ class MongoDBClient(ApiClient):
             }
 
 
+class SQLiteClient(MongoDBClient):
+    """
+    Client for a local SQLite database, selected with a
+    `CONNECTION_URI` of the form `sqlite:///path/to/modmail.db`.
+
+    Logs, notes, config and plugin partitions are stored as documents
+    through `SQLiteDatabase`, which understands the subset of the MongoDB
+    API used by the bot, so everything not overridden here is shared with
+    `MongoDBClient`. Log messages get their own table with an FTS5 index
+    for `search_by_text`. All queries run on a dedicated database thread.
+    """
+
+    def __init__(self, bot):
+        uri = bot.config["connection_uri"]
+        path = uri[len("sqlite:///") :]
+        if not path:
+            logger.critical("A path to the database file is necessary, e.g. sqlite:///modmail.db.")
+            raise RuntimeError
+
+        db = SQLiteDatabase(path, on_call=lambda duration: bot.startup_profiler.record("db", duration))
+        ApiClient.__init__(self, bot, db)
+        self.log_buffer = LogWriteBuffer(self)
+        self._log_keys: Dict[str, str] = {}
+        self._bucket_fill: Dict[str, Tuple[int, int]] = {}
+        self._ttl_expire_after: Optional[int] = None
+        self._untyped_logs: Optional[bool] = None
+        self.search_index = FTSSearchIndex(self.db)
+        self.relay_map = RelayMap(self.db.relay_messages)
+
+    @property
+    def message_buckets(self) -> bool:
+        return False
+
+    @property
+    def search_indexed(self) -> bool:
+        # the FTS5 table is always kept up to date
+        return True
+
+    async def watch_snoozes(self, callback: Callable[[int, Optional[datetime]], None]) -> bool:
+        return False
+
+    async def watch_config(self, callback: Callable[[dict], None]) -> bool:
+        return False
+
+    @staticmethod
+    def _create_tables(conn) -> None:
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY,
+                log_key TEXT NOT NULL,
+                message_id TEXT,
+                author_id TEXT,
+                mod INTEGER,
+                type TEXT,
+                doc TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS messages_log_key ON messages (log_key, id);
+            CREATE INDEX IF NOT EXISTS messages_message_id ON messages (message_id);
+            CREATE INDEX IF NOT EXISTS messages_author_id ON messages (author_id);
+            CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(content, author, key);
+            """
+        )
+
+    async def setup_indexes(self):
+        """Creates the tables and indexes used by the SQLite backend."""
+        await self.db.run(self._create_tables)
+
+        specs = [
+            spec for spec in DATABASE_INDEXES if spec.collection in ("logs", "notes") and not spec.is_text
+        ]
+        for spec in specs:
+            await self.db[spec.collection].create_index(
+                spec.keys, name=spec.name, unique=spec.options.get("unique", False)
+            )
+
+        def delete_orphans(conn):
+            # messages of logs removed directly through the logs collection, e.g. by log expiry
+            with transaction(conn):
+                orphans = "SELECT id FROM messages WHERE log_key NOT IN (SELECT json_extract(doc, '$.key') FROM logs)"
+                conn.execute(f"DELETE FROM messages_fts WHERE rowid IN ({orphans})")
+                return conn.execute(f"DELETE FROM messages WHERE id IN ({orphans})").rowcount
+
+        orphans = await self.db.run(delete_orphans)
+        if orphans:
+            logger.info("Deleted %d messages of removed log entries.", orphans)
+
+        if self.bot.config["verify_db_indexes"]:
+            failures = []
+            for spec in specs:
+                for query in spec.queries:
+                    plan = await self.db[spec.collection].find(query["filter"]).explain()
+                    if any(step.startswith("SCAN") and "USING" not in step for step in plan):
+                        failures.append(f"{spec.collection}: {query}")
+            if failures:
+                for failure in failures:
+                    logger.critical("Query is not covered by an index: %s", failure)
+                raise IndexVerificationError(f"{len(failures)} registered queries scan a whole table.")
+            logger.info("Verified the query plans of all registered indexes.")
+        logger.debug("Successfully configured and verified database indexes.")
+
+    async def validate_database_connection(self):
+        try:
+            version = await self.db.run(lambda conn: conn.execute("SELECT sqlite_version()").fetchone()[0])
+        except Exception as exc:
+            logger.critical("Something went wrong while opening the database %s.", self.db.path)
+            logger.critical(f"{type(exc).__name__}: {str(exc)}")
+            raise
+        else:
+            logger.debug("Successfully opened the database (SQLite %s).", version)
+        logger.line("debug")
+
+    async def _fill_previews(self, docs: List[dict], limit: int = 5) -> List[dict]:
+        missing = {doc["key"]: doc for doc in docs if doc and not doc.get("messages")}
+        if not missing:
+            return docs
+
+        def previews(conn, keys):
+            return conn.execute(
+                f"""
+                SELECT log_key, doc FROM (
+                    SELECT log_key, doc, ROW_NUMBER() OVER (PARTITION BY log_key ORDER BY id) AS n
+                    FROM messages WHERE log_key IN ({", ".join("?" * len(keys))})
+                ) WHERE n <= ?
+                """,
+                (*keys, limit),
+            ).fetchall()
+
+        keys = list(missing)
+        for i in range(0, len(keys), 500):
+            for key, doc in await self.db.run(previews, keys[i : i + 500]):
+                missing[key].setdefault("messages", []).append(loads(doc))
+        return docs
+
+    async def _responded_log_keys(self, user_id: Union[int, str]) -> List[str]:
+        def responded(conn):
+            rows = conn.execute(
+                "SELECT DISTINCT log_key FROM messages "
+                "WHERE author_id = ? AND mod = 1 AND type IN ('anonymous', 'thread_message')",
+                (str(user_id),),
+            )
+            return [row[0] for row in rows]
+
+        return await self.db.run(responded)
+
+    async def _search_log_keys(self, text: str) -> List[str]:
+        phrase = '"' + text.replace('"', '""') + '"'
+
+        def search(conn):
+            rows = conn.execute("SELECT DISTINCT key FROM messages_fts WHERE messages_fts MATCH ?", (phrase,))
+            return [row[0] for row in rows]
+
+        return await self.db.run(search)
+
+    async def get_responded_logs(self, user_id: Union[str, int]) -> list:
+        keys = await self._responded_log_keys(user_id)
+        if not keys:
+            return []
+        logs = await self.logs.find(
+            {"open": False, "key": {"$in": keys}}, {"messages": {"$slice": 5}}
+        ).to_list(None)
+        return await self._fill_previews(logs)
+
+    async def set_log_expiration(self, expire_after: Optional[int]) -> bool:
+        # SQLite has no TTL indexes, expired logs are always deleted in batches
+        return False
+
+    async def _set_closed_at(self, closed: List[Tuple[str, Optional[datetime]]]) -> None:
+        # messages and their FTS5 rows are deleted along with their log
+        return
+
+    async def _delete_logs(self, docs: List[dict]) -> None:
+        keys = [doc["key"] for doc in docs]
+        await self.logs.delete_many({"_id": {"$in": [doc["_id"] for doc in docs]}})
+
+        def delete(conn):
+            placeholders = ", ".join("?" * len(keys))
+            with transaction(conn):
+                conn.execute(f"DELETE FROM messages_fts WHERE key IN ({placeholders})", keys)
+                conn.execute(f"DELETE FROM messages WHERE log_key IN ({placeholders})", keys)
+
+        await self.db.run(delete)
+
+    async def delete_log_entry(self, key: str) -> bool:
+        result = await self.logs.delete_one({"key": key})
+
+        def delete(conn):
+            with transaction(conn):
+                conn.execute("DELETE FROM messages_fts WHERE key = ?", (key,))
+                conn.execute("DELETE FROM messages WHERE log_key = ?", (key,))
+
+        await self.db.run(delete)
+        return result.deleted_count == 1
+
+    async def edit_message(self, message_id: Union[int, str], new_content: str) -> None:
+        if message_id in self.log_buffer:
+            # the message has not reached the database yet
+            await self.log_buffer.flush()
+
+        def edit(conn):
+            with transaction(conn):
+                row = conn.execute(
+                    "SELECT id, doc FROM messages WHERE message_id = ? ORDER BY id LIMIT 1",
+                    (str(message_id),),
+                ).fetchone()
+                if row is None:
+                    return
+                data = loads(row[1])
+                data["content"] = new_content
+                data["edited"] = True
+                conn.execute("UPDATE messages SET doc = ? WHERE id = ?", (dumps(data), row[0]))
+                conn.execute("UPDATE messages_fts SET content = ? WHERE rowid = ?", (new_content, row[0]))
+
+        await self.db.run(edit)
+
+    async def write_log_messages(self, batch: Dict[str, List[dict]]) -> None:
+        rows = []
+        for channel_id, entries in batch.items():
+            key = await self._get_log_key(channel_id)
+            if key is None:
+                logger.warning(
+                    "No log entry for channel %s, dropping %d message(s).", channel_id, len(entries)
+                )
+                continue
+            rows.extend((key, entry) for entry in entries)
+
+        def insert(conn):
+            with transaction(conn):
+                for key, entry in rows:
+                    cursor = conn.execute(
+                        "INSERT INTO messages (log_key, message_id, author_id, mod, type, doc) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (
+                            key,
+                            entry["message_id"],
+                            entry["author"]["id"],
+                            entry["author"]["mod"],
+                            entry["type"],
+                            dumps(entry),
+                        ),
+                    )
+                    conn.execute(
+                        "INSERT INTO messages_fts (rowid, content, author, key) VALUES (?, ?, ?, ?)",
+                        (cursor.lastrowid, entry["content"], entry["author"]["name"], key),
+                    )
+
+        if rows:
+            await self.db.run(insert)
+
+    async def iter_log_messages(self, key: str) -> AsyncIterator[dict]:
+        await self._flush_log_key(key)
+        last = 0
+        while True:
+            rows = await self.db.run(
+                lambda conn: conn.execute(
+                    "SELECT id, doc FROM messages WHERE log_key = ? AND id > ? ORDER BY id LIMIT 500",
+                    (key, last),
+                ).fetchall()
+            )
+            if not rows:
+                return
+            for _, doc in rows:
+                yield loads(doc)
+            last = rows[-1][0]
+
+    async def migrate_log_messages(self, *, batch_size: int = 50) -> int:
+        # messages are never embedded in log entries here
+        return 0
+
+    async def rebuild_search_index(self) -> int:
+        def rebuild(conn):
+            with transaction(conn):
+                conn.execute("DELETE FROM messages_fts")
+                conn.execute(
+                    "INSERT INTO messages_fts (rowid, content, author, key) "
+                    "SELECT id, json_extract(doc, '$.content'), json_extract(doc, '$.author.name'), log_key "
+                    "FROM messages"
+                )
+                return conn.execute("SELECT count(DISTINCT log_key) FROM messages").fetchone()[0]
+
+        return await self.db.run(rebuild)
+
+    async def search_by_text(self, text: str, limit: Optional[int]):
+        keys = await self._search_log_keys(text)
+        if not keys:
+            return []
+        logs = await self.logs.find(
+            {"guild_id": str(self.bot.guild_id), "open": False, "key": {"$in": keys}},
+            {"messages": {"$slice": 5}},
+        ).to_list(limit)
+        return await self._fill_previews(logs)
+
+    def iter_responded_logs(self, user_id: Union[int, str], **kwargs) -> LogStream:
+        async def query():
+            return {"open": False, "key": {"$in": await self._responded_log_keys(user_id)}}
+
+        return self._log_stream(query, **kwargs)
+
+    def iter_search_by_text(self, text: str, **kwargs) -> LogStream:
+        async def query():
+            keys = await self._search_log_keys(text)
+            return {"guild_id": str(self.bot.guild_id), "open": False, "key": {"$in": keys}}
+
+        return self._log_stream(query, **kwargs)
+
+    async def close(self) -> None:
+        await self.db.close()
+
+
 class PluginDatabaseClient:
     def __init__(self, bot):
         self.bot = bot
@@ -12,7 +12,7 @@ import discord
 from discord.ext.commands import BadArgument
 
 from core._color_data import ALL_COLORS
-from core.models import DMDisabled, InvalidConfigError, Default, getLogger
+from core.models import ConfigConflictError, DMDisabled, InvalidConfigError, Default, getLogger
 from core.time import UserFriendlyTime
 from core.utils import strtobool
 
@@ -220,6 +220,11 @@ class ConfigManager:
         "stream_log_format": "plain",
         "file_log_format": "plain",
         "discord_log_level": "INFO",
+        # database
+        "log_message_buckets": False,
+        "verify_db_indexes": False,
+        "log_search_index": False,
+        "config_sync_interval": 30,
         # data collection
         "data_collection": True,
     }
@@ -240,7 +245,7 @@ class ConfigManager:
         "log_expiration",
     }
 
-    duration_seconds = {"snooze_default_duration"}
+    duration_seconds = {"snooze_default_duration", "config_sync_interval"}
 
     booleans = {
         "use_user_id_channel_name",
@@ -281,6 +286,9 @@ class ConfigManager:
         "use_hoisted_top_role",
         "enable_presence_intent",
         "registry_plugins_only",
+        "log_message_buckets",
+        "verify_db_indexes",
+        "log_search_index",
         # snooze
         "snooze_store_attachments",
         # thread creation menu booleans
@@ -304,11 +312,29 @@ class ConfigManager:
     defaults = {**public_keys, **private_keys, **protected_keys}
     all_keys = set(defaults.keys())
 
+    # seconds to wait for more changes before writing them to the database
+    update_delay = 0.5
+
     def __init__(self, bot):
         self.bot = bot
         self._cache = {}
+        self._persisted = {}  # what the database currently holds
+        self._flush_task = None
+        self._flush_lock = asyncio.Lock()
         self.ready_event = asyncio.Event()
         self.config_help = {}
+        self.write_count = 0
+        self.writes_avoided = 0
+        # bumped whenever configurations changed, for caches derived from them
+        self.generation = 0
+        self._converted = {}  # key -> (cached value it was converted from, value returned by get)
+        self._announced = {}  # key -> value when generation was last bumped for it
+        self._key_generations = {}  # key -> generation it last changed at
+        self.conversion_hits = 0
+        self.conversion_misses = 0
+        self.version = 0  # version of the configurations in the database, see `flush`
+        self.write_conflicts = 0
+        self._watch_task = None
 
     def __repr__(self):
         return repr(self._cache)
@@ -329,6 +355,8 @@ class ConfigManager:
                     logger.critical("Failed to load config.json env values.", exc_info=True)
 
         self._cache = data
+        self._announced = deepcopy(data)
+        self._converted.clear()
 
         config_help_json = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config_help.json")
         with open(config_help_json, "r", encoding="utf-8") as f:
@@ -336,9 +364,91 @@ class ConfigManager:
 
         return self._cache
 
-    async def update(self):
-        """Updates the config with data from the cache"""
-        await self.bot.api.update_config(self.filter_default(self._cache))
+    async def update(self, *, flush: bool = False) -> None:
+        """
+        Schedules the changes in the cache to be written to the database.
+
+        Updates made within `update_delay` seconds of each other are
+        coalesced into a single write of only the changed keys.
+
+        Parameters
+        ----------
+        flush : bool
+            Write right away and wait for the write to finish.
+        """
+        # in-place changes to lists and dicts are only noticed here
+        self._announce(k for k, v in self._cache.items() if self._announced.get(k, Default) != v)
+        if flush:
+            return await self.flush()
+        if self._flush_task is not None:
+            self.writes_avoided += 1
+            return
+        self._flush_task = asyncio.get_running_loop().create_task(self._flush_later())
+
+    def _announce(self, keys: typing.Iterable[str]) -> None:
+        """Bumps `generation` and drops the converted values of keys that changed, if any."""
+        keys = list(keys)
+        if not keys:
+            return
+        self.generation += 1
+        for k in keys:
+            self._converted.pop(k, None)
+            self._announced[k] = deepcopy(self._cache[k])
+            self._key_generations[k] = self.generation
+
+    def generation_of(self, *keys: str) -> int:
+        """
+        The `generation` at which any of `keys` last changed, for caches
+        derived from only some configurations.
+        """
+        return max(self._key_generations.get(k, 0) for k in keys)
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.update_delay)
+        # changes made from now on need a new write
+        self._flush_task = None
+        try:
+            await self.flush()
+        except Exception:
+            logger.error("Failed to write the configurations to the database.", exc_info=True)
+
+    async def flush(self) -> None:
+        """
+        Writes the configurations that changed since the last write to the database.
+
+        Writes only succeed if nobody else changed the configurations since
+        they were last read. Otherwise, the changes of others are merged
+        in first and the write is retried.
+        """
+        async with self._flush_lock:
+            while True:
+                data = self.filter_valid(self.filter_default(self._cache))
+                toset = {k: deepcopy(v) for k, v in data.items() if self._persisted.get(k, Default) != v}
+                unset = [k for k in self._persisted if k not in data]
+                if not toset and not unset:
+                    self.writes_avoided += 1
+                    return
+
+                logger.debug("Writing configurations %s.", ", ".join(sorted({*toset, *unset})))
+                version = self.version
+                try:
+                    await self.bot.api.update_config(toset, unset=unset, version=version)
+                except ConfigConflictError:
+                    self.write_conflicts += 1
+                    logger.debug("Configurations were changed elsewhere, merging before writing again.")
+                    doc = await self.bot.api.get_config()
+                    self.apply_remote(doc)
+                    # the stored version is the one to write against, even if it went back
+                    self.version = doc.get("_version", 0)
+                    continue
+
+                for k in unset:
+                    self._persisted.pop(k, None)
+                self._persisted.update(toset)
+                # the watcher may already have seen this write
+                self.version = max(self.version, version + 1)
+                self.write_count += 1
+                return
 
     async def refresh(self) -> dict:
         """Refreshes internal cache with data from database"""
@@ -346,11 +456,96 @@ class ConfigManager:
             k = k.lower()
             if k in self.all_keys:
                 self._cache[k] = v
+                if k in self.public_keys or k in self.private_keys:
+                    self._persisted[k] = deepcopy(v)
+            elif k == "_version":
+                self.version = v
+        self._announce(k for k, v in self._cache.items() if self._announced.get(k, Default) != v)
         if not self.ready_event.is_set():
             self.ready_event.set()
             logger.debug("Successfully fetched configurations from database.")
         return self._cache
 
+    def apply_remote(self, doc: dict) -> typing.List[str]:
+        """
+        Applies the configurations changed in the database by others.
+
+        Configurations changed by this instance but not written yet are kept.
+
+        Parameters
+        ----------
+        doc : dict
+            The configuration document, as stored in the database.
+
+        Returns
+        -------
+        List[str]
+            The configurations that changed.
+        """
+        remote = self.filter_valid(doc)
+        changed = []
+        for k in {*remote, *self._persisted}:
+            new = remote.get(k, Default)
+            old = self._persisted.get(k, Default)
+            if new == old:
+                continue
+            default = self.defaults[k]
+            if self._cache.get(k, default) == (default if old is Default else old):
+                self._cache[k] = deepcopy(default if new is Default else new)
+                changed.append(k)
+            if new is Default:
+                del self._persisted[k]
+            else:
+                self._persisted[k] = deepcopy(new)
+
+        self.version = max(self.version, doc.get("_version", 0))
+        self._announce(changed)
+        if changed:
+            logger.info("Configurations changed elsewhere: %s.", ", ".join(sorted(changed)))
+        return changed
+
+    async def close(self) -> None:
+        """
+        Stops watching for changes made elsewhere and writes pending changes
+        right away, instead of after `update_delay`. Nothing is written if
+        the configurations were never loaded from the database.
+        """
+        for task in (self._watch_task, self._flush_task):
+            if task is not None:
+                task.cancel()
+        self._watch_task = self._flush_task = None
+        if self.ready_event.is_set():
+            await self.flush()
+
+    def start_watching(self) -> None:
+        """Starts following the configurations changed by other instances or tools."""
+        if self._watch_task is None or self._watch_task.done():
+            self._watch_task = asyncio.get_running_loop().create_task(self._watch())
+
+    def _remote_changed(self, doc: dict) -> None:
+        # writes of this instance come back through the change stream too
+        if doc.get("_version", 0) > self.version:
+            self.apply_remote(doc)
+
+    async def _watch(self) -> None:
+        try:
+            if await self.bot.api.watch_config(self._remote_changed):
+                return
+        except Exception:
+            logger.error("Stopped watching configurations, polling instead.", exc_info=True)
+
+        interval = self.get("config_sync_interval")
+        if not interval:
+            return
+        logger.debug("Checking for configuration changes every %d seconds.", interval)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if await self.bot.api.get_config_version() > self.version:
+                    self.apply_remote(await self.bot.api.get_config())
+            except Exception:
+                logger.warning("Failed to check for configuration changes.", exc_info=True)
+
     async def wait_until_ready(self) -> None:
         await self.ready_event.wait()
 
@@ -360,6 +555,7 @@ class ConfigManager:
         if key not in self.all_keys:
             raise InvalidConfigError(f'Configuration "{key}" is invalid.')
         self._cache[key] = item
+        self._announce([key])
 
     def __getitem__(self, key: str) -> typing.Any:
         # make use of the custom methods in func:get:
@@ -369,6 +565,14 @@ class ConfigManager:
         return self.remove(key)
 
     def get(self, key: str, *, convert: bool = True) -> typing.Any:
+        if convert:
+            # converted values are kept until the configuration changes or is replaced,
+            # by `refresh` for instance, so in-place changes go to the cache as before
+            source, value = self._converted.get(key, (Default, Default))
+            if source is not Default and self._cache.get(key, Default) is source:
+                self.conversion_hits += 1
+                return self._copy_converted(key, value)
+
         key = key.lower()
         if key not in self.all_keys:
             raise InvalidConfigError(f'Configuration "{key}" is invalid.')
@@ -379,6 +583,20 @@ class ConfigManager:
         if not convert:
             return value
 
+        self.conversion_misses += 1
+        value = self._convert(key, value)
+        # converting may have reset the configuration
+        self._converted[key] = (self._cache[key], value)
+        return self._copy_converted(key, value)
+
+    def _copy_converted(self, key: str, value: typing.Any) -> typing.Any:
+        # permissions are converted into new dicts, changes to them wouldn't reach the cache,
+        # so every caller gets its own copy as before
+        if key in self.force_str:
+            return {k: list(v) if isinstance(v, list) else v for k, v in value.items()}
+        return value
+
+    def _convert(self, key: str, value: typing.Any) -> typing.Any:
         if key in self.colors:
             try:
                 return int(value.lstrip("#"), base=16)
@@ -539,6 +757,7 @@ class ConfigManager:
         if key in self._cache:
             del self._cache[key]
         self._cache[key] = deepcopy(self.defaults[key])
+        self._announce([key])
         return self._cache[key]
 
     def items(self) -> typing.Iterable:
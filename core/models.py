@@ -351,6 +351,25 @@ class InvalidConfigError(commands.BadArgument):
         return discord.Embed(title="Error", description=self.msg, color=discord.Color.red())
 
 
+class ConfigConflictError(Exception):
+    """Raised when the configurations changed in the database since they were last read."""
+
+
+class LogWriteError(Exception):
+    """
+    Raised when only some messages of a batch were written to the logs.
+
+    Attributes
+    ----------
+    unwritten : Dict[str, List[dict]]
+        Mapping of channel ID to the messages that were not written, in order.
+    """
+
+    def __init__(self, msg, unwritten):
+        super().__init__(msg)
+        self.unwritten = unwritten
+
+
 class _Default:
     pass
 
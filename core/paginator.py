@@ -1,4 +1,6 @@
+import asyncio
 import typing
+from collections import OrderedDict
 
 import discord
 from discord import Message, Embed, ButtonStyle, Interaction
@@ -6,6 +8,241 @@ from discord.ui import View, Button, Select
 from discord.ext import commands
 
 
+class PageSource:
+    """
+    Produces the pages of a `PaginatorSession` on demand.
+
+    When a page is requested that isn't cached, a window of pages in the
+    direction the user is moving is fetched at once. The most recently
+    used pages are kept in a bounded cache.
+
+    Parameters
+    ----------
+    window : int
+        Number of pages fetched at once.
+    cache_size : int
+        Maximum number of pages kept in memory.
+    """
+
+    def __init__(self, *, window: int = 5, cache_size: int = 25):
+        self.window = max(window, 1)
+        self.cache_size = max(cache_size, self.window)
+        self._cache: typing.OrderedDict[int, typing.Any] = OrderedDict()
+        self._lock = asyncio.Lock()
+
+    async def get_page_count(self) -> int:
+        """Returns the total number of pages."""
+        raise NotImplementedError
+
+    async def fetch_pages(self, start: int, stop: int) -> typing.List[typing.Any]:
+        """Builds the pages from `start` up to, but excluding, `stop`."""
+        raise NotImplementedError
+
+    async def get_page(self, index: int, direction: int = 1) -> typing.Any:
+        """
+        Returns a page by index.
+
+        Parameters
+        ----------
+        index : int
+            The index of the page.
+        direction : int
+            `1` when moving forward, `-1` when moving backward,
+            decides which neighbouring pages are fetched ahead.
+        """
+        async with self._lock:
+            if index in self._cache:
+                self._cache.move_to_end(index)
+                return self._cache[index]
+
+            count = await self.get_page_count()
+            if direction < 0:
+                start, stop = max(index - self.window + 1, 0), index + 1
+            else:
+                start, stop = index, min(index + self.window, count)
+
+            for i, page in enumerate(await self.fetch_pages(start, stop), start=start):
+                self._cache[i] = page
+                self._cache.move_to_end(i)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return self._cache.get(index)
+
+
+class ListPageSource(PageSource):
+    """
+    A `PageSource` over pages that are already built.
+
+    Parameters
+    ----------
+    pages : List[Any]
+        The pages, the list is used as is so pages added later are picked up.
+    """
+
+    def __init__(self, pages: typing.List[typing.Any]):
+        super().__init__()
+        self.pages = pages
+
+    async def get_page_count(self) -> int:
+        return len(self.pages)
+
+    async def fetch_pages(self, start: int, stop: int) -> typing.List[typing.Any]:
+        return self.pages[start:stop]
+
+    async def get_page(self, index: int, direction: int = 1) -> typing.Any:
+        return self.pages[index]
+
+
+class LogStreamPageSource(PageSource):
+    """
+    A `PageSource` over a `LogStream`, one page per log entry.
+
+    The keyset position of every entry seen is remembered, so going back
+    or jumping to a known page is a single query. Jumping further ahead
+    only reads the sort keys of the entries skipped.
+
+    Parameters
+    ----------
+    stream : LogStream
+        The log entries to paginate.
+    render : Callable[[dict], Any]
+        Builds the page of a log entry.
+    total : int, optional
+        The number of entries, counted from `stream` if not provided.
+    """
+
+    def __init__(self, stream, render: typing.Callable[[dict], typing.Any], *, total: int = None, **options):
+        super().__init__(**options)
+        self.stream = stream
+        self.render = render
+        self.total = total
+        # keyset position right before each entry
+        self._positions: typing.List[typing.Optional[tuple]] = [None]
+
+    async def get_page_count(self) -> int:
+        if self.total is None:
+            self.total = await self.stream.count()
+        return self.total
+
+    def _remember(self, index: int, entries: typing.List[dict]) -> None:
+        for i, entry in enumerate(entries, start=index + 1):
+            if i == len(self._positions):
+                self._positions.append((entry.get(self.stream.sort_field), entry["_id"]))
+
+    async def fetch_pages(self, start: int, stop: int) -> typing.List[typing.Any]:
+        while len(self._positions) <= start:
+            known = len(self._positions) - 1
+            self.stream.seek(self._positions[known], known)
+            entries = await self.stream.next_page(
+                min(start - known, 100), projection={self.stream.sort_field: 1}, prepare=False
+            )
+            if not entries:
+                return []
+            self._remember(known, entries)
+
+        self.stream.seek(self._positions[start], start)
+        entries = await self.stream.next_page(stop - start)
+        self._remember(start, entries)
+        return [self.render(entry) for entry in entries]
+
+
+class SequencePageSource(PageSource):
+    """
+    A `PageSource` over a known sequence of items, such as database keys,
+    whose entries are only fetched when their page is shown.
+
+    Parameters
+    ----------
+    items : List[Any]
+        One item per page.
+    fetch : Callable[[List[Any]], Awaitable[List[Any]]]
+        Fetches the entries of some items, in the same order.
+    render : Callable[[Any], Any]
+        Builds the page of an entry.
+    """
+
+    def __init__(
+        self,
+        items: typing.List[typing.Any],
+        fetch: typing.Callable[[typing.List[typing.Any]], typing.Awaitable[typing.List[typing.Any]]],
+        render: typing.Callable[[typing.Any], typing.Any],
+        **options,
+    ):
+        super().__init__(**options)
+        self.items = items
+        self.fetch = fetch
+        self.render = render
+
+    async def get_page_count(self) -> int:
+        return len(self.items)
+
+    async def fetch_pages(self, start: int, stop: int) -> typing.List[typing.Any]:
+        return [self.render(entry) for entry in await self.fetch(self.items[start:stop])]
+
+
+class FilePageSource(PageSource):
+    """
+    A `PageSource` over the lines of a text file, wrapped in a code block.
+
+    The file is scanned once for page boundaries, pages are only read
+    from the file and built when shown.
+
+    Parameters
+    ----------
+    path : str
+        The file to paginate.
+    prefix : str
+        Text added before the content of every page.
+    suffix : str
+        Text added after the content of every page.
+    max_length : int
+        Maximum length of a page, including `prefix` and `suffix`.
+        Lines that don't fit on a page of their own are truncated.
+    """
+
+    def __init__(self, path: str, *, prefix: str = "", suffix: str = "", max_length: int = 2000, **options):
+        super().__init__(**options)
+        self.path = path
+        self.prefix = prefix
+        self.suffix = suffix
+        self.max_length = max_length
+        self._bounds: typing.Optional[typing.List[typing.Tuple[int, int]]] = None
+
+    def _scan(self) -> typing.List[typing.Tuple[int, int]]:
+        bounds = []
+        start = end = length = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                size = len(line.decode("utf-8", errors="replace"))
+                if end != start and len(self.prefix) + length + size + len(self.suffix) > self.max_length:
+                    bounds.append((start, end))
+                    start, length = end, 0
+                end += len(line)
+                length += size
+                if len(self.prefix) + length + len(self.suffix) > self.max_length:
+                    bounds.append((start, end))
+                    start, length = end, 0
+        if end != start:
+            bounds.append((start, end))
+        return bounds
+
+    async def get_page_count(self) -> int:
+        if self._bounds is None:
+            self._bounds = await asyncio.get_running_loop().run_in_executor(None, self._scan)
+        return len(self._bounds)
+
+    async def fetch_pages(self, start: int, stop: int) -> typing.List[str]:
+        pages = []
+        with open(self.path, "rb") as f:
+            for begin, end in self._bounds[start:stop]:
+                f.seek(begin)
+                text = self.prefix + f.read(end - begin).decode("utf-8", errors="replace")
+                if len(text) + len(self.suffix) > self.max_length:
+                    text = text[: self.max_length - len(self.suffix) - 5] + "[...]"
+                pages.append(text + self.suffix)
+        return pages
+
+
 class PaginatorSession:
     """
     Class that interactively paginates something.
@@ -18,6 +255,8 @@ class PaginatorSession:
         How long to wait for before the session closes.
     pages : List[Any]
         A list of entries to paginate.
+    source : PageSource, optional
+        Produces the pages on demand, used instead of `pages`.
 
     Attributes
     ----------
@@ -26,7 +265,11 @@ class PaginatorSession:
     timeout : float
         How long to wait for before the session closes.
     pages : List[Any]
-        A list of entries to paginate.
+        A list of entries to paginate, empty when a `source` is used.
+    source : PageSource
+        Where the pages come from.
+    page_count : int
+        The total number of pages.
     running : bool
         Whether the paginate session is running.
     base : Message
@@ -41,13 +284,15 @@ class PaginatorSession:
         A select menu that will be added to the View.
     """
 
-    def __init__(self, ctx: commands.Context, *pages, **options):
+    def __init__(self, ctx: commands.Context, *pages, source: PageSource = None, **options):
         self.ctx = ctx
         self.timeout: int = options.get("timeout", 210)
         self.running = False
         self.base: Message = None
         self.current = 0
         self.pages = list(pages)
+        self.source = source if source is not None else ListPageSource(self.pages)
+        self.page_count = len(self.pages)
         self.destination = options.get("destination", ctx)
         self.view = None
         self.select_menu = None
@@ -69,11 +314,17 @@ class PaginatorSession:
         index : int
             The index of the page.
         """
-        if not 0 <= index < len(self.pages):
+        if not 0 <= index < self.page_count:
             return
 
+        if index < self.current or (index == self.last_page() and index != self.first_page()):
+            direction = -1
+        else:
+            direction = 1
+        page = await self.source.get_page(index, direction)
+        if page is None:
+            return
         self.current = index
-        page = self.pages[index]
         result = None
 
         if self.running:
@@ -117,7 +368,7 @@ class PaginatorSession:
         """
         Create a base `Message`.
         """
-        if len(self.pages) == 1:
+        if self.page_count == 1:
             self.view = None
             self.running = False
         else:
@@ -147,12 +398,19 @@ class PaginatorSession:
 
     def last_page(self):
         """Returns the index of the last page"""
-        return len(self.pages) - 1
+        return self.page_count - 1
+
+    async def setup(self) -> None:
+        """
+        Called once the number of pages is known, before the first page is shown.
+        """
 
     async def run(self) -> None:
         """
         Starts the pagination session.
         """
+        self.page_count = await self.source.get_page_count()
+        await self.setup()
         if not self.running:
             await self.show_page(self.current)
 
@@ -242,7 +500,7 @@ class PaginatorView(View):
             self.add_item(self.handler.select_menu)
 
         for label, callback in self.handler.callback_map.items():
-            if len(self.handler.pages) == 2 and label in ("<<", ">>"):
+            if self.handler.page_count == 2 and label in ("<<", ">>"):
                 continue
 
             if label in ("<<", ">>"):
@@ -318,19 +576,16 @@ class EmbedPaginatorSession(PaginatorSession):
     def __init__(self, ctx: commands.Context, *embeds, **options):
         super().__init__(ctx, *embeds, **options)
 
-        if len(self.pages) > 1:
+    async def setup(self) -> None:
+        if self.page_count > 1:
             select_options = []
             create_select = True
-            for i, embed in enumerate(self.pages):
-                footer_text = f"Page {i + 1} of {len(self.pages)}"
-                if embed.footer.text:
-                    footer_text = footer_text + " • " + embed.footer.text
-
-                if embed.footer.icon:
-                    icon_url = embed.footer.icon.url if embed.footer.icon else None
-                else:
-                    icon_url = None
-                embed.set_footer(text=footer_text, icon_url=icon_url)
+            # the select menu holds at most 25 options
+            for i in range(min(self.page_count, 25)):
+                embed = await self.source.get_page(i)
+                if embed is None:
+                    create_select = False
+                    break
 
                 # select menu
                 if embed.author.name:
@@ -362,11 +617,27 @@ class EmbedPaginatorSession(PaginatorSession):
         else:
             raise TypeError("Page must be an Embed object.")
 
+    def _format_page(self, embed: Embed) -> Embed:
+        if self.page_count <= 1:
+            return embed
+        # work on a copy, cached pages may be shown again
+        embed = embed.copy()
+        footer_text = f"Page {self.current + 1} of {self.page_count}"
+        if embed.footer.text:
+            footer_text = footer_text + " • " + embed.footer.text
+
+        if embed.footer.icon:
+            icon_url = embed.footer.icon.url if embed.footer.icon else None
+        else:
+            icon_url = None
+        embed.set_footer(text=footer_text, icon_url=icon_url)
+        return embed
+
     async def _create_base(self, item: Embed, view: View) -> None:
-        self.base = await self.destination.send(embed=item, view=view)
+        self.base = await self.destination.send(embed=self._format_page(item), view=view)
 
     def _show_page(self, page):
-        return dict(embed=page)
+        return dict(embed=self._format_page(page))
 
 
 class MessagePaginatorSession(PaginatorSession):
@@ -383,7 +654,7 @@ class MessagePaginatorSession(PaginatorSession):
 
     def _set_footer(self):
         if self.embed is not None:
-            footer_text = f"Page {self.current + 1} of {len(self.pages)}"
+            footer_text = f"Page {self.current + 1} of {self.page_count}"
             if self.footer_text:
                 footer_text = footer_text + " • " + self.footer_text
 
@@ -0,0 +1,242 @@
+"""
+Timing of the startup phases.
+
+The bot opens a phase around each step of `on_connect` and `on_ready`.
+Database commands, Discord API requests and other HTTP requests made while
+a phase is open are counted towards it, with the time spent waiting on
+them. Once the bot is ready, the phases are written to the log as a
+startup report.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+from aiohttp import TraceConfig
+from pymongo import monitoring
+
+# the kinds of I/O counted, in report order
+CALL_KINDS = ("db", "rest", "http")
+
+_current_phase: ContextVar[Optional["StartupPhase"]] = ContextVar("current_phase", default=None)
+
+
+class StartupPhase:
+    """
+    A step of the startup.
+
+    Attributes
+    ----------
+    name : str
+        The name of the phase.
+    depth : int
+        How many phases it's nested in.
+    start : float
+        When it started, in seconds since the profiler was created.
+    wall : Optional[float]
+        How long it took, `None` while it runs.
+    io : float
+        The time spent in the database and HTTP calls made while it ran.
+        Calls made concurrently are all added up.
+    calls : Dict[str, int]
+        The number of calls made while it ran, per kind.
+    """
+
+    def __init__(self, name: str, depth: int, start: float):
+        self.name = name
+        self.depth = depth
+        self.start = start
+        self.wall: Optional[float] = None
+        self.io = 0.0
+        self.calls = dict.fromkeys(CALL_KINDS, 0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "depth": self.depth,
+            "start": round(self.start, 4),
+            "wall": round(self.wall or 0.0, 4),
+            "io": round(self.io, 4),
+            "calls": dict(self.calls),
+        }
+
+
+class StartupProfiler:
+    """
+    Records the startup phases and the I/O they make.
+
+    Calls are counted towards every phase open when they complete, as the
+    database driver runs them on other threads, where the phase making
+    them isn't known. Nested phases are counted in their parents too.
+    """
+
+    def __init__(self):
+        self.started_at = datetime.now(timezone.utc)
+        self.phases: List[StartupPhase] = []
+        self.report: Optional[Dict[str, Any]] = None
+        self._t0 = time.perf_counter()
+        self._open: List[StartupPhase] = []
+        self._totals = dict.fromkeys(CALL_KINDS, 0)
+        self._lock = threading.Lock()
+        self._http = None
+        self._request = None
+
+    @property
+    def finished(self) -> bool:
+        return self.report is not None
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[StartupPhase]:
+        """
+        Times a phase, nested in the phase open in the current task if any.
+
+        Parameters
+        ----------
+        name : str
+            The name of the phase.
+        """
+        parent = _current_phase.get()
+        phase = StartupPhase(name, 0 if parent is None else parent.depth + 1, time.perf_counter() - self._t0)
+        if not self.finished:
+            with self._lock:
+                self.phases.append(phase)
+                self._open.append(phase)
+        token = _current_phase.set(phase)
+        try:
+            yield phase
+        finally:
+            _current_phase.reset(token)
+            phase.wall = time.perf_counter() - self._t0 - phase.start
+            with self._lock:
+                if phase in self._open:
+                    self._open.remove(phase)
+
+    def record(self, kind: str, duration: float) -> None:
+        """
+        Counts a call towards the open phases. Can be called from any thread.
+
+        Parameters
+        ----------
+        kind : str
+            One of `db`, `rest` and `http`.
+        duration : float
+            How long the call took, in seconds.
+        """
+        if self.finished:
+            return
+        with self._lock:
+            self._totals[kind] += 1
+            for phase in self._open:
+                phase.calls[kind] += 1
+                phase.io += duration
+
+    def watch_http(self, http) -> None:
+        """Counts the requests made through discord.py's `HTTPClient`."""
+        request = http.request
+
+        async def timed_request(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await request(*args, **kwargs)
+            finally:
+                self.record("rest", time.perf_counter() - start)
+
+        self._http, self._request = http, request
+        http.request = timed_request
+
+    def trace_config(self) -> TraceConfig:
+        """A trace config counting the requests of an aiohttp `ClientSession`."""
+
+        async def on_request_start(session, ctx, params):
+            ctx.start = time.perf_counter()
+
+        async def on_request_end(session, ctx, params):
+            self.record("http", time.perf_counter() - ctx.start)
+
+        trace_config = TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_exception.append(on_request_end)
+        return trace_config
+
+    def command_listener(self) -> monitoring.CommandListener:
+        """A PyMongo listener counting database commands."""
+        return _CommandListener(self)
+
+    def finish(self, version: str) -> Dict[str, Any]:
+        """
+        Ends the profiling and builds the startup report.
+
+        Calls made from now on are no longer counted.
+
+        Parameters
+        ----------
+        version : str
+            The version of the bot, stored in the report.
+
+        Returns
+        -------
+        Dict[str, Any]
+            The report: `started_at`, `version`, `total` seconds, `calls`
+            per kind and the `phases` in the order they started.
+        """
+        if self.report is not None:
+            return self.report
+        if self._http is not None:
+            self._http.request = self._request
+        with self._lock:
+            self.report = {
+                "started_at": self.started_at,
+                "version": version,
+                "total": round(time.perf_counter() - self._t0, 4),
+                "calls": dict(self._totals),
+                "phases": [phase.to_dict() for phase in self.phases],
+            }
+        return self.report
+
+
+class _CommandListener(monitoring.CommandListener):
+    def __init__(self, profiler: StartupProfiler):
+        self.profiler = profiler
+
+    def started(self, event) -> None:
+        pass
+
+    def succeeded(self, event) -> None:
+        self.profiler.record("db", event.duration_micros / 1e6)
+
+    def failed(self, event) -> None:
+        self.profiler.record("db", event.duration_micros / 1e6)
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """
+    Formats a startup report as a table.
+
+    Parameters
+    ----------
+    report : Dict[str, Any]
+        A report made by `StartupProfiler.finish`.
+
+    Returns
+    -------
+    str
+        One line per phase with when it started, how long it took, the time
+        spent in I/O and the calls it made, followed by the totals.
+    """
+    width = max([len("  " * p["depth"] + p["name"]) for p in report["phases"]] + [len("phase")])
+    lines = [f"{'phase':<{width}}   start    wall      io" + "".join(f"{kind:>6}" for kind in CALL_KINDS)]
+    for p in report["phases"]:
+        name = "  " * p["depth"] + p["name"]
+        lines.append(
+            f"{name:<{width}} {p['start']:>6.2f}s {p['wall']:>6.2f}s {p['io']:>6.2f}s"
+            + "".join(f"{p['calls'].get(kind, 0):>6}" for kind in CALL_KINDS)
+        )
+    lines.append(
+        f"{'total':<{width}} {'':>7} {report['total']:>6.2f}s {'':>7}"
+        + "".join(f"{report['calls'].get(kind, 0):>6}" for kind in CALL_KINDS)
+    )
+    return "\n".join(lines)
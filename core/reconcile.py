@@ -0,0 +1,142 @@
+"""
+Reconciliation of the stored state with Discord once the bot is ready.
+
+Scheduled closes, snoozed threads and the open logs of deleted channels
+are independent of each other, so they're handled concurrently and in
+the background, instead of one after another in `on_ready`.
+"""
+
+import asyncio
+import time
+from typing import Awaitable, Dict
+
+import discord
+
+from core.models import getLogger
+
+logger = getLogger(__name__)
+
+
+class StartupReconciler:
+    """
+    Collects and runs the work needed to catch up after downtime.
+
+    - Scheduled closes are loaded on the thread manager's timer heap, the
+      overdue ones run there, a few at a time.
+    - Snoozed threads are scheduled to be unsnoozed.
+    - Open logs whose channel no longer exists are closed together, in
+      batches of `ORPHAN_BATCH_SIZE`.
+
+    Each job is logged as it finishes, and the orphaned logs after each batch.
+
+    Attributes
+    ----------
+    totals : Dict[str, int]
+        The number of scheduled closes (`closures`), overdue ones
+        (`overdue closures`), snoozed threads (`snoozes`) and orphaned logs
+        closed (`orphaned logs`), filled in as the jobs finish.
+    """
+
+    # fields of the open logs needed to close those of deleted channels
+    OPEN_LOG_PROJECTION = {"_id": 1, "key": 1, "channel_id": 1, "recipient.id": 1, "guild_id": 1}
+    # orphaned logs closed with each `close_logs` call
+    ORPHAN_BATCH_SIZE = 500
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.totals: Dict[str, int] = {}
+        self._pending = set()
+
+    async def run(self) -> Dict[str, int]:
+        """
+        Runs every job, a failed job doesn't stop the others.
+
+        Returns
+        -------
+        Dict[str, int]
+            `totals`.
+        """
+        start = time.perf_counter()
+        jobs = {
+            "closures": self.load_closures(),
+            "snoozes": self.load_snoozes(),
+            "orphaned logs": self.close_orphaned_logs(),
+        }
+        self._pending = set(jobs)
+        await asyncio.gather(*(self._run_job(name, job, start) for name, job in jobs.items()))
+
+        logger.info(
+            "Startup reconciliation took %.2fs: %s.",
+            time.perf_counter() - start,
+            ", ".join(f"{count} {name}" for name, count in self.totals.items()) or "nothing to do",
+        )
+        return self.totals
+
+    async def _run_job(self, name: str, job: Awaitable[None], start: float) -> None:
+        try:
+            await job
+        except Exception as error:
+            logger.error("Failed to reconcile %s at startup.", name, exc_info=error)
+        else:
+            logger.info(
+                "Startup reconciliation of %s done after %.2fs%s.",
+                name,
+                time.perf_counter() - start,
+                f", {self.totals[name]} in total" if name in self.totals else "",
+            )
+        finally:
+            self._pending.discard(name)
+            if self._pending:
+                logger.debug("Startup reconciliation still running: %s.", ", ".join(sorted(self._pending)))
+
+    async def load_closures(self) -> None:
+        with self.bot.startup_profiler.phase("load closures"):
+            closures = await self.bot.threads.load_closures()
+        now = discord.utils.utcnow()
+        self.totals["closures"] = len(closures)
+        self.totals["overdue closures"] = sum(closure["due"] <= now for closure in closures)
+
+    async def load_snoozes(self) -> None:
+        with self.bot.startup_profiler.phase("load snoozes"):
+            self.totals["snoozes"] = await self.bot.threads.load_snoozes()
+
+    async def close_orphaned_logs(self) -> None:
+        with self.bot.startup_profiler.phase("close orphaned logs"):
+            open_logs = await self.bot.api.get_open_logs(self.OPEN_LOG_PROJECTION)
+            orphaned = [
+                log
+                for log in open_logs
+                if log.get("channel_id") is None or self.bot.get_channel(int(log["channel_id"])) is None
+            ]
+            if not orphaned:
+                self.totals["orphaned logs"] = 0
+                return
+            logger.info(
+                "Closing %d of %d open log(s), their channel was deleted.", len(orphaned), len(open_logs)
+            )
+            for log in orphaned:
+                logger.debug("Unable to resolve thread with channel %s.", log.get("channel_id"))
+
+            user = self.bot.user
+            data = {
+                "open": False,
+                "title": None,
+                "closed_at": str(discord.utils.utcnow()),
+                "close_message": "Channel has been deleted, no closer found.",
+                "closer": {
+                    "id": str(user.id),
+                    "name": user.name,
+                    "discriminator": user.discriminator,
+                    "avatar_url": user.display_avatar.url,
+                    "mod": True,
+                },
+            }
+            closed = 0
+            self.totals["orphaned logs"] = 0
+            for i in range(0, len(orphaned), self.ORPHAN_BATCH_SIZE):
+                batch = orphaned[i : i + self.ORPHAN_BATCH_SIZE]
+                closed += await self.bot.api.close_logs(batch, data)
+                self.totals["orphaned logs"] = closed
+                logger.info(
+                    "Closed %d orphaned log(s), %d of %d checked.", closed, i + len(batch), len(orphaned)
+                )
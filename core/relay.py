@@ -0,0 +1,179 @@
+"""
+Links between the messages relayed for one another.
+
+Every message relayed by a thread exists once in the thread channel and once
+in the DMs of each recipient, all copies sharing a joint ID: the ID of the
+message they were relayed from. The relay map records where each copy is,
+so edits, deletions and reactions find them without scanning histories.
+"""
+
+import asyncio
+from collections import OrderedDict
+from typing import Dict, List, Optional, Union
+
+from pymongo import UpdateOne
+
+from core.models import getLogger
+
+logger = getLogger(__name__)
+
+
+class RelayMap:
+    """
+    Maps joint IDs to the relayed copies of a message, stored in their own
+    collection with the most recently used entries cached in memory.
+
+    Every document holds the joint ID as `_id`, the thread channel and
+    message IDs, and `recipients`: a mapping of recipient ID to their copy,
+    flagged as `source` when it's the message the recipient sent themselves.
+
+    Recorded copies go into the cache right away and are written to the
+    collection in batches, at most `max_delay` seconds later.
+
+    Parameters
+    ----------
+    collection
+        The collection links are stored in.
+    cache_size : int
+        Number of entries kept in memory.
+    max_delay : float
+        Maximum number of seconds a recorded copy waits to be written.
+    """
+
+    def __init__(self, collection, *, cache_size: int = 1024, max_delay: float = 1.0):
+        self.collection = collection
+        self.cache_size = cache_size
+        self.max_delay = max_delay
+        self._cache: "OrderedDict[str, dict]" = OrderedDict()
+        self._pending: Dict[str, Dict[str, object]] = {}
+        self._lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._cache)
+
+    def _remember(self, joint_id: str, entry: dict) -> None:
+        self._cache[joint_id] = entry
+        self._cache.move_to_end(joint_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def record(
+        self,
+        joint_id: Union[int, str],
+        channel_id: Union[int, str],
+        *,
+        thread_message_id: Union[int, str, None] = None,
+        recipient_id: Union[int, str, None] = None,
+        dm_message_id: Union[int, str, None] = None,
+        source: bool = False,
+    ) -> None:
+        """
+        Records a copy of a relayed message.
+
+        Parameters
+        ----------
+        joint_id : Union[int, str]
+            The ID of the message the copy was relayed from.
+        channel_id : Union[int, str]
+            The ID of the thread channel.
+        thread_message_id : Union[int, str, None]
+            The ID of the copy in the thread channel.
+        recipient_id : Union[int, str, None]
+            The recipient whose DMs hold `dm_message_id`.
+        dm_message_id : Union[int, str, None]
+            The ID of the copy in the DMs of `recipient_id`.
+        source : bool
+            Whether `dm_message_id` is the message the recipient sent.
+        """
+        joint_id = str(joint_id)
+        fields: Dict[str, object] = {"channel_id": str(channel_id)}
+        if thread_message_id is not None:
+            fields["thread_message_id"] = str(thread_message_id)
+        if recipient_id is not None:
+            fields[f"recipients.{recipient_id}"] = {"message_id": str(dm_message_id), "source": source}
+
+        # the copies of a message are recorded right after it's relayed, so an
+        # entry missing from the cache is a new one
+        entry = self._cache.get(joint_id) or {"_id": joint_id}
+        entry["channel_id"] = fields["channel_id"]
+        if thread_message_id is not None:
+            entry["thread_message_id"] = fields["thread_message_id"]
+        if recipient_id is not None:
+            entry.setdefault("recipients", {})[str(recipient_id)] = fields[f"recipients.{recipient_id}"]
+        self._remember(joint_id, entry)
+
+        self._pending.setdefault(joint_id, {}).update(fields)
+        if self._flush_task is None:
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        try:
+            await asyncio.sleep(self.max_delay)
+        finally:
+            self._flush_task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Writes the recorded copies still pending to the collection."""
+        async with self._lock:
+            batch, self._pending = self._pending, {}
+            if not batch:
+                return
+            try:
+                await self.collection.bulk_write(
+                    [
+                        UpdateOne({"_id": joint_id}, {"$set": fields}, upsert=True)
+                        for joint_id, fields in batch.items()
+                    ],
+                    ordered=False,
+                )
+            except Exception:
+                logger.warning(
+                    "Failed to record %d relayed message(s), retrying later.", len(batch), exc_info=True
+                )
+                for joint_id, fields in batch.items():
+                    # copies recorded meanwhile are newer
+                    self._pending[joint_id] = {**fields, **self._pending.get(joint_id, {})}
+                if self._flush_task is None:
+                    self._flush_task = asyncio.get_running_loop().create_task(self._flush_later())
+
+    async def get(self, joint_id: Union[int, str]) -> Optional[dict]:
+        """The copies of a relayed message, `None` if none were recorded."""
+        joint_id = str(joint_id)
+        entry = self._cache.get(joint_id)
+        if entry is not None:
+            self.hits += 1
+            self._cache.move_to_end(joint_id)
+            return entry
+
+        self.misses += 1
+        if joint_id in self._pending:
+            await self.flush()
+        entry = await self.collection.find_one({"_id": joint_id})
+        if entry is not None:
+            self._remember(joint_id, entry)
+        return entry
+
+    async def forget(self, channel_id: Union[int, str]) -> None:
+        """Removes the links of a thread channel, once it's closed."""
+        await self.forget_many([channel_id])
+
+    async def forget_many(self, channel_ids: List[Union[int, str]]) -> None:
+        """Removes the links of many thread channels with a single query."""
+        channel_ids = {str(channel_id) for channel_id in channel_ids}
+        if not channel_ids:
+            return
+        for joint_id in [key for key, entry in self._cache.items() if entry.get("channel_id") in channel_ids]:
+            del self._cache[joint_id]
+        async with self._lock:
+            for joint_id in [
+                key for key, fields in self._pending.items() if fields["channel_id"] in channel_ids
+            ]:
+                del self._pending[joint_id]
+            if len(channel_ids) == 1:
+                await self.collection.delete_many({"channel_id": next(iter(channel_ids))})
+            else:
+                await self.collection.delete_many({"channel_id": {"$in": list(channel_ids)}})
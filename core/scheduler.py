@@ -0,0 +1,137 @@
+"""
+A single task running timed jobs.
+
+Jobs are kept in a heap ordered by due time. One task sleeps until the
+earliest one is due, instead of every job holding its own sleeping task.
+"""
+
+import asyncio
+import heapq
+import itertools
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+import discord
+
+from core.models import getLogger
+
+logger = getLogger(__name__)
+
+
+class TimerHeap:
+    """
+    Runs a callback for each job once it's due.
+
+    Every job has a key, scheduling a key again replaces its job. Callbacks
+    run in their own task, so a slow job doesn't hold back the next ones.
+
+    Parameters
+    ----------
+    callback : Callable[[Hashable, Any], Awaitable[None]]
+        Called with the key and the payload of every due job.
+    name : str
+        Name of the jobs in log messages.
+    concurrency : Optional[int]
+        How many callbacks may run at once, e.g. when many jobs are overdue
+        at startup. Unbounded by default.
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[Hashable, Any], Awaitable[None]],
+        *,
+        name: str = "job",
+        concurrency: Optional[int] = None,
+    ):
+        self.callback = callback
+        self.name = name
+        self._semaphore = asyncio.Semaphore(concurrency) if concurrency else None
+        self._heap: List[Tuple[datetime, int, Hashable]] = []
+        self._jobs: Dict[Hashable, Tuple[datetime, int, Any]] = {}
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._jobs
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """The payload of a pending job."""
+        job = self._jobs.get(key)
+        return job[2] if job is not None else None
+
+    def due(self, key: Hashable) -> Optional[datetime]:
+        """When a pending job is due."""
+        job = self._jobs.get(key)
+        return job[0] if job is not None else None
+
+    def schedule(self, key: Hashable, due: datetime, payload: Any = None) -> None:
+        """Schedules a job, replacing the pending job of the same key."""
+        count = next(self._counter)
+        self._jobs[key] = (due, count, payload)
+        heapq.heappush(self._heap, (due, count, key))
+        self._wakeup.set()
+
+    def cancel(self, key: Hashable) -> bool:
+        """Cancels a pending job, returns whether there was one."""
+        # the heap entry is skipped once it reaches the top
+        return self._jobs.pop(key, None) is not None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _pop_stale(self) -> None:
+        while self._heap:
+            due, count, key = self._heap[0]
+            job = self._jobs.get(key)
+            if job is not None and job[1] == count:
+                return
+            heapq.heappop(self._heap)
+
+    async def _run(self) -> None:
+        while True:
+            self._pop_stale()
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            due, count, key = self._heap[0]
+            delay = (due - discord.utils.utcnow()).total_seconds()
+            if delay > 0:
+                # sleeps until the job is due, or an earlier one is scheduled
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._heap)
+            _, _, payload = self._jobs.pop(key)
+            task = asyncio.create_task(self._execute(key, payload))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _execute(self, key: Hashable, payload: Any) -> None:
+        if self._semaphore is None:
+            await self._execute_now(key, payload)
+            return
+        async with self._semaphore:
+            await self._execute_now(key, payload)
+
+    async def _execute_now(self, key: Hashable, payload: Any) -> None:
+        try:
+            await self.callback(key, payload)
+        except Exception:
+            logger.error("Failed to run %s %s.", self.name, key, exc_info=True)
@@ -0,0 +1,265 @@
+"""
+Ranked full text search over log messages.
+
+Logs are looked up through an inverted index, which maps every token to
+its postings: the logs containing it and how often. Queries rank the logs
+containing every term with BM25, terms ending with `*` match as prefixes.
+"""
+
+import math
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pymongo import DeleteMany, UpdateOne
+
+from core.models import getLogger
+
+logger = getLogger(__name__)
+
+TOKEN_RE = re.compile(r"(\w+)(\*?)")
+MAX_TOKEN_LENGTH = 64
+
+# BM25 term frequency saturation
+K1 = 1.2
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Splits text into lowercase word tokens."""
+    if not text:
+        return []
+    return [token for token, _ in TOKEN_RE.findall(text.lower()) if len(token) <= MAX_TOKEN_LENGTH]
+
+
+def parse_query(text: str) -> List[Tuple[str, bool]]:
+    """Returns the distinct terms of a query and whether each is a prefix."""
+    terms = []
+    for token, star in TOKEN_RE.findall(text.lower()):
+        term = (token[:MAX_TOKEN_LENGTH], bool(star))
+        if term not in terms:
+            terms.append(term)
+    return terms
+
+
+def message_tokens(message: dict) -> List[str]:
+    """The tokens a log message is found by, from its content and author name."""
+    return tokenize(message.get("content")) + tokenize((message.get("author") or {}).get("name"))
+
+
+class SearchIndex:
+    """
+    An inverted index of log messages, stored in its own collection.
+
+    Every document is a posting: a token, the key of a log containing it,
+    the number of occurrences and the IDs of the first messages it occurs in.
+
+    Parameters
+    ----------
+    collection
+        The collection postings are stored in.
+    """
+
+    # number of message IDs kept per posting
+    MAX_MESSAGE_IDS = 5
+    # above this many candidates, postings are fetched without filtering by key
+    MAX_KEY_FILTER = 5000
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def add(self, batch: Dict[str, List[dict]]) -> None:
+        """
+        Indexes messages appended to logs.
+
+        Parameters
+        ----------
+        batch : Dict[str, List[dict]]
+            Mapping of log key to the new messages.
+        """
+        requests = []
+        for key, messages in batch.items():
+            counts: Dict[str, int] = {}
+            message_ids: Dict[str, List[str]] = {}
+            for message in messages:
+                for token in message_tokens(message):
+                    counts[token] = counts.get(token, 0) + 1
+                    ids = message_ids.setdefault(token, [])
+                    if len(ids) < self.MAX_MESSAGE_IDS and message.get("message_id") not in ids:
+                        ids.append(message.get("message_id"))
+            requests.extend(
+                UpdateOne(
+                    {"_id": f"{token}:{key}"},
+                    {
+                        "$setOnInsert": {"token": token, "key": key},
+                        "$inc": {"count": count},
+                        "$push": {
+                            "message_ids": {"$each": message_ids[token], "$slice": self.MAX_MESSAGE_IDS}
+                        },
+                    },
+                    upsert=True,
+                )
+                for token, count in counts.items()
+            )
+        if requests:
+            await self.collection.bulk_write(requests, ordered=False)
+
+    async def replace(self, key: str, old: dict, new: dict) -> None:
+        """
+        Reindexes an edited message.
+
+        Parameters
+        ----------
+        key : str
+            The key of the log containing the message.
+        old : dict
+            The message as it was indexed.
+        new : dict
+            The message as edited.
+        """
+        new_tokens = message_tokens(new)
+        counts: Dict[str, int] = {}
+        for token in new_tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for token in message_tokens(old):
+            counts[token] = counts.get(token, 0) - 1
+
+        message_id = new.get("message_id")
+        requests = []
+        removed = []
+        for token, count in counts.items():
+            if count > 0:
+                requests.append(
+                    UpdateOne(
+                        {"_id": f"{token}:{key}"},
+                        {
+                            "$setOnInsert": {"token": token, "key": key},
+                            "$inc": {"count": count},
+                            "$push": {"message_ids": {"$each": [message_id], "$slice": self.MAX_MESSAGE_IDS}},
+                        },
+                        upsert=True,
+                    )
+                )
+            elif count < 0:
+                update = {"$inc": {"count": count}}
+                if token not in new_tokens:
+                    update["$pull"] = {"message_ids": message_id}
+                requests.append(UpdateOne({"_id": f"{token}:{key}"}, update))
+                removed.append(f"{token}:{key}")
+        if removed:
+            # postings of tokens no longer in the log
+            requests.append(DeleteMany({"_id": {"$in": removed}, "count": {"$lte": 0}}))
+        if requests:
+            await self.collection.bulk_write(requests)
+
+    async def set_closed(self, key: str, closed_at) -> None:
+        """Stores the closing date of a log on its postings, so they expire with it."""
+        await self.collection.update_many({"key": key}, {"$set": {"closed_at_date": closed_at}})
+
+    async def remove(self, keys: List[str]) -> None:
+        await self.collection.delete_many({"key": {"$in": keys}})
+
+    async def clear(self) -> None:
+        await self.collection.delete_many({})
+
+    @staticmethod
+    def _term_filter(term: str, prefix: bool) -> dict:
+        return {"token": {"$regex": "^" + re.escape(term)}} if prefix else {"token": term}
+
+    async def document_frequency(self, term: str, prefix: bool) -> int:
+        """Number of postings of a term, an upper bound of the logs containing it for prefixes."""
+        return await self.collection.count_documents(self._term_filter(term, prefix))
+
+    async def postings(self, term: str, prefix: bool, keys: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        """Number of occurrences of a term per log, optionally only for some logs."""
+        query = self._term_filter(term, prefix)
+        if keys is not None:
+            query["key"] = {"$in": list(keys)}
+        found: Dict[str, int] = {}
+        async for doc in self.collection.find(query, {"key": 1, "count": 1}):
+            found[doc["key"]] = found.get(doc["key"], 0) + doc["count"]
+        return found
+
+
+class FTSSearchIndex:
+    """
+    Exposes the FTS5 table of `SQLiteClient` the way `rank` expects.
+
+    The table is kept up to date by the client itself, with one row per message.
+
+    Parameters
+    ----------
+    database : SQLiteDatabase
+        The database of the FTS5 table.
+    table : str
+        Name of the FTS5 table, which has a `key` column.
+    """
+
+    MAX_KEY_FILTER = SearchIndex.MAX_KEY_FILTER
+
+    def __init__(self, database, table: str = "messages_fts"):
+        self.database = database
+        self.table = table
+
+    @staticmethod
+    def _match(term: str, prefix: bool) -> str:
+        return f'"{term}"' + ("*" if prefix else "")
+
+    async def document_frequency(self, term: str, prefix: bool) -> int:
+        sql = f"SELECT count(DISTINCT key) FROM {self.table} WHERE {self.table} MATCH ?"
+        return await self.database.run(
+            lambda conn: conn.execute(sql, (self._match(term, prefix),)).fetchone()[0]
+        )
+
+    async def postings(self, term: str, prefix: bool, keys: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        sql = f"SELECT key, count(*) FROM {self.table} WHERE {self.table} MATCH ? GROUP BY key"
+        rows = await self.database.run(
+            lambda conn: conn.execute(sql, (self._match(term, prefix),)).fetchall()
+        )
+        if keys is not None:
+            keys = set(keys)
+            return {key: count for key, count in rows if key in keys}
+        return dict(rows)
+
+
+async def rank(index, query: str, total: int) -> List[Tuple[str, float]]:
+    """
+    Ranks the logs containing every term of a query, most relevant first.
+
+    Terms are looked up from the rarest to the most common, later terms
+    only fetching the postings of the logs still matching.
+
+    Parameters
+    ----------
+    index : Union[SearchIndex, FTSSearchIndex]
+        Where postings are looked up.
+    query : str
+        The search terms, a term ending with `*` matches every token it prefixes.
+    total : int
+        Number of indexed logs, used to weigh rare terms higher.
+
+    Returns
+    -------
+    List[Tuple[str, float]]
+        The matching log keys and their scores.
+    """
+    terms = parse_query(query)
+    if not terms:
+        return []
+
+    frequencies = [await index.document_frequency(term, prefix) for term, prefix in terms]
+    scores: Optional[Dict[str, float]] = None
+    for (term, prefix), frequency in sorted(zip(terms, frequencies), key=lambda item: item[1]):
+        if not frequency:
+            return []
+        keys = None if scores is None or len(scores) > index.MAX_KEY_FILTER else scores.keys()
+        postings = await index.postings(term, prefix, keys)
+        idf = math.log(1 + (max(total, frequency) - frequency + 0.5) / (frequency + 0.5))
+        term_scores = {key: idf * count * (K1 + 1) / (count + K1) for key, count in postings.items()}
+        if scores is None:
+            scores = term_scores
+        else:
+            scores = {key: score + term_scores[key] for key, score in scores.items() if key in term_scores}
+        if not scores:
+            return []
+
+    logger.debug("Search for %r matched %d logs.", query, len(scores))
+    return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
@@ -0,0 +1,787 @@
+"""
+A small document store on top of SQLite, used by `SQLiteClient`.
+
+Every collection is a table of JSON documents. Only the part of the
+MongoDB query, update and projection language that Modmail and its plugins
+use is supported, so the rest of the bot can keep talking to collections
+the way it does with Motor.
+"""
+
+import asyncio
+import re
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from copy import deepcopy
+from datetime import timezone
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from bson import ObjectId, json_util
+
+from core.models import getLogger
+
+logger = getLogger(__name__)
+
+# datetimes come back timezone aware, so they compare with the ones the bot builds
+_JSON_OPTIONS = json_util.JSONOptions(tz_aware=True, tzinfo=timezone.utc)
+
+_COMPARISONS = {
+    "$gt": lambda a, b: a > b,
+    "$gte": lambda a, b: a >= b,
+    "$lt": lambda a, b: a < b,
+    "$lte": lambda a, b: a <= b,
+}
+
+
+@contextmanager
+def transaction(conn: sqlite3.Connection) -> Iterator[None]:
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def dumps(value: Any) -> str:
+    return json_util.dumps(value)
+
+
+def loads(value: str) -> Any:
+    return json_util.loads(value, json_options=_JSON_OPTIONS)
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _path(field: str) -> str:
+    return "$." + ".".join(f'"{part}"' for part in field.split("."))
+
+
+def _values(value: Any, parts: List[str]) -> List[Any]:
+    """Resolves a dotted path, traversing arrays the way MongoDB does."""
+    if not parts:
+        return [value]
+    if isinstance(value, dict):
+        if parts[0] not in value:
+            return []
+        return _values(value[parts[0]], parts[1:])
+    if isinstance(value, list):
+        if parts[0].isdigit():
+            index = int(parts[0])
+            return _values(value[index], parts[1:]) if index < len(value) else []
+        found = []
+        for item in value:
+            found.extend(_values(item, parts))
+        return found
+    return []
+
+
+def _candidates(values: List[Any]) -> List[Any]:
+    # a query on an array field matches the array itself or any of its elements
+    found = list(values)
+    for value in values:
+        if isinstance(value, list):
+            found.extend(value)
+    return found
+
+
+def _comparable(a: Any, b: Any) -> bool:
+    numbers = (int, float)
+    if isinstance(a, bool) or isinstance(b, bool):
+        return isinstance(a, bool) and isinstance(b, bool)
+    if isinstance(a, numbers) and isinstance(b, numbers):
+        return True
+    return type(a) is type(b)
+
+
+def _equal(a: Any, b: Any) -> bool:
+    # unlike in Python, booleans are not numbers
+    if isinstance(a, bool) or isinstance(b, bool):
+        return isinstance(a, bool) and isinstance(b, bool) and a == b
+    return a == b
+
+
+def _match_condition(values: List[Any], condition: Any) -> bool:
+    if not (isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition)):
+        if condition is None:
+            return not values or None in values
+        return any(_equal(v, condition) for v in _candidates(values))
+
+    for op, arg in condition.items():
+        candidates = _candidates(values)
+        if op == "$eq":
+            matched = _match_condition(values, arg)
+        elif op == "$ne":
+            matched = not _match_condition(values, arg)
+        elif op == "$in":
+            matched = any(_match_condition(values, a) for a in arg)
+        elif op == "$nin":
+            matched = not any(_match_condition(values, a) for a in arg)
+        elif op == "$exists":
+            matched = bool(values) == bool(arg)
+        elif op in _COMPARISONS:
+            matched = any(_comparable(v, arg) and _COMPARISONS[op](v, arg) for v in candidates)
+        elif op == "$size":
+            matched = any(isinstance(v, list) and len(v) == arg for v in values)
+        elif op == "$regex":
+            flags = re.IGNORECASE if "i" in condition.get("$options", "") else 0
+            matched = any(isinstance(v, str) and re.search(arg, v, flags) for v in candidates)
+        elif op == "$options":
+            continue
+        elif op == "$elemMatch":
+            matched = any(
+                isinstance(v, list)
+                and any(match(e, arg) if isinstance(e, dict) else _match_condition([e], arg) for e in v)
+                for v in values
+            )
+        elif op == "$not":
+            matched = not _match_condition(values, arg)
+        else:
+            raise ValueError(f"Unsupported query operator {op}.")
+        if not matched:
+            return False
+    return True
+
+
+def match(doc: dict, query: Optional[dict]) -> bool:
+    """Whether `doc` matches the MongoDB style `query`."""
+    for field, condition in (query or {}).items():
+        if field == "$and":
+            matched = all(match(doc, q) for q in condition)
+        elif field == "$or":
+            matched = any(match(doc, q) for q in condition)
+        elif field == "$nor":
+            matched = not any(match(doc, q) for q in condition)
+        elif field.startswith("$"):
+            raise ValueError(f"Unsupported query operator {field}.")
+        else:
+            matched = _match_condition(_values(doc, field.split(".")), condition)
+        if not matched:
+            return False
+    return True
+
+
+def _parent(doc: dict, field: str, create: bool = True) -> Tuple[Optional[Any], str]:
+    *parts, last = field.split(".")
+    for part in parts:
+        if isinstance(doc, list) and part.isdigit():
+            doc = doc[int(part)]
+        elif part not in doc:
+            if not create:
+                return None, last
+            doc = doc.setdefault(part, {})
+        else:
+            doc = doc[part]
+    return doc, last
+
+
+def apply_update(doc: dict, update: dict, *, inserting: bool = False) -> None:
+    """Applies a MongoDB style `update` to `doc` in place."""
+    for op, fields in update.items():
+        if op == "$setOnInsert" and not inserting:
+            continue
+        for field, value in fields.items():
+            if op in ("$set", "$setOnInsert"):
+                parent, key = _parent(doc, field)
+                parent[key] = deepcopy(value)
+            elif op == "$unset":
+                parent, key = _parent(doc, field, create=False)
+                if isinstance(parent, dict):
+                    parent.pop(key, None)
+            elif op == "$inc":
+                parent, key = _parent(doc, field)
+                parent[key] = parent.get(key, 0) + value
+            elif op in ("$push", "$addToSet"):
+                parent, key = _parent(doc, field)
+                items = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+                array = parent.setdefault(key, [])
+                for item in items:
+                    if op == "$push" or item not in array:
+                        array.append(deepcopy(item))
+            elif op == "$pull":
+                parent, key = _parent(doc, field, create=False)
+                if isinstance(parent, dict) and isinstance(parent.get(key), list):
+                    parent[key] = [
+                        item
+                        for item in parent[key]
+                        if not (match(item, value) if isinstance(value, dict) else item == value)
+                    ]
+            else:
+                raise ValueError(f"Unsupported update operator {op}.")
+
+
+def apply_projection(doc: dict, projection: Optional[dict]) -> dict:
+    if not projection:
+        return doc
+    slices = {k: v["$slice"] for k, v in projection.items() if isinstance(v, dict) and "$slice" in v}
+    flags = {k: bool(v) for k, v in projection.items() if k not in slices}
+    included = [k for k, v in flags.items() if v and k != "_id"]
+
+    if included:
+        result = {"_id": doc["_id"]} if flags.get("_id", True) and "_id" in doc else {}
+        for field in included + list(slices):
+            parts = field.split(".")
+            source, target = doc, result
+            for part in parts[:-1]:
+                if not isinstance(source, dict) or part not in source:
+                    break
+                source = source[part]
+                target = target.setdefault(part, {})
+            else:
+                if isinstance(source, dict) and parts[-1] in source:
+                    target[parts[-1]] = source[parts[-1]]
+    else:
+        result = dict(doc)
+        for field, flag in flags.items():
+            if not flag:
+                parent, key = _parent(result, field, create=False)
+                if isinstance(parent, dict):
+                    parent.pop(key, None)
+
+    for field, count in slices.items():
+        if isinstance(result.get(field), list):
+            result[field] = result[field][count:] if count < 0 else result[field][:count]
+    return result
+
+
+def _order_by(sort: Optional[List[Tuple[str, int]]]) -> str:
+    # like `match`, SQLite orders null first, then numbers, then strings
+    if not sort:
+        return ""
+    return " ORDER BY " + ", ".join(
+        f"json_extract(doc, '{_path(field)}'){' DESC' if direction < 0 else ''}" for field, direction in sort
+    )
+
+
+def _json_types(value: Any) -> Optional[str]:
+    """The `json_type`s a field must have to equal `value`, `None` if SQLite can't compare it."""
+    if isinstance(value, bool):
+        return "'true'" if value else "'false'"
+    if isinstance(value, str):
+        return "'text'"
+    if isinstance(value, (int, float)):
+        return "'integer', 'real'"
+    return None
+
+
+class SQLiteCursor:
+    def __init__(
+        self, collection: "SQLiteCollection", query=None, projection=None, *, sort=None, limit=0, skip=0
+    ):
+        self.collection = collection
+        self.query = query or {}
+        self.projection = projection
+        self._sort = list(sort or [])
+        self._limit = limit
+        self._skip = skip
+
+    def sort(self, key, direction=None) -> "SQLiteCursor":
+        self._sort = [(key, direction or 1)] if isinstance(key, str) else list(key)
+        return self
+
+    def limit(self, limit: int) -> "SQLiteCursor":
+        self._limit = limit
+        return self
+
+    def skip(self, skip: int) -> "SQLiteCursor":
+        self._skip = skip
+        return self
+
+    def _find(self, conn) -> List[dict]:
+        docs = self.collection._matching(
+            conn, self.query, sort=self._sort, skip=self._skip, limit=self._limit
+        )
+        return [apply_projection(doc, self.projection) for doc in docs]
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        docs = await self.collection.database.run(self._find)
+        return docs if length is None else docs[:length]
+
+    async def __aiter__(self):
+        for doc in await self.to_list(None):
+            yield doc
+
+    async def explain(self) -> List[str]:
+        """The `EXPLAIN QUERY PLAN` details of the SQL this cursor runs."""
+        return await self.collection.database.run(self.collection._explain, self.query, self._sort)
+
+
+class SQLiteCollection:
+    """
+    A collection of JSON documents, stored in a table of its own.
+
+    Equality conditions, range, `$in` and `$exists` conditions on indexed
+    fields, and the `$and` and `$or` of those are evaluated by SQLite,
+    everything else is matched in Python. Sorting is done by SQLite, and
+    rows are only read until the limit is reached. Queries SQLite evaluates
+    entirely are counted and limited without reading the documents.
+    """
+
+    def __init__(self, database: "SQLiteDatabase", name: str):
+        self.database = database
+        self.name = name
+        self.table = _quote(name)
+        self._indexed: set = set()
+        self._created = False
+
+    def __getattr__(self, name: str) -> "SQLiteCollection":
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self.database[f"{self.name}.{name}"]
+
+    def __getitem__(self, name: str) -> "SQLiteCollection":
+        return self.database[f"{self.name}.{name}"]
+
+    def _ensure(self, conn) -> None:
+        if not self._created:
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {self.table} (_id TEXT PRIMARY KEY, doc TEXT NOT NULL)")
+            self._created = True
+
+    def _where(self, query: dict) -> Tuple[str, list, bool]:
+        """
+        Translates the conditions of `query` that SQLite can evaluate to a WHERE clause.
+
+        Returns
+        -------
+        Tuple[str, list, bool]
+            The clause, its parameters, and whether the clause alone selects
+            exactly the documents matching `query`. Otherwise it selects a
+            superset, left to `match`.
+        """
+        clause, params, exact = self._clause(query)
+        return (f" WHERE {clause}" if clause else ""), params, exact
+
+    def _clause(self, query: dict) -> Tuple[Optional[str], list, bool]:
+        clauses, params = [], []
+        exact = True
+        for field, condition in query.items():
+            if field in ("$and", "$or"):
+                parts = [self._clause(q) for q in condition]
+                exact = exact and all(e for _, _, e in parts)
+                if field == "$or" and any(c is None for c, _, _ in parts):
+                    # a branch SQLite can't narrow down may match any row
+                    continue
+                parts = [(c, p) for c, p, _ in parts if c is not None]
+                if parts:
+                    joiner = " AND " if field == "$and" else " OR "
+                    clauses.append("(" + joiner.join(f"({c})" for c, _ in parts) + ")")
+                    for _, p in parts:
+                        params.extend(p)
+                continue
+            if field.startswith("$"):
+                exact = False
+                continue
+
+            clause, field_params, field_exact = self._field_clause(field, condition)
+            exact = exact and field_exact
+            if clause is not None:
+                clauses.append(clause)
+                params.extend(field_params)
+        return (" AND ".join(clauses) if clauses else None), params, exact
+
+    def _field_clause(self, field: str, condition: Any) -> Tuple[Optional[str], list, bool]:
+        """
+        The clause of a single field condition.
+
+        Indexed fields are expected to hold scalars, other fields may hold
+        arrays, whose rows are selected as well and left to `match`.
+        """
+        if isinstance(condition, dict) and list(condition) == ["$eq"]:
+            condition = condition["$eq"]
+        if field == "_id":
+            if not isinstance(condition, dict):
+                return "_id = ?", [dumps(condition)], True
+            if list(condition) == ["$in"]:
+                return (
+                    f"_id IN ({', '.join('?' * len(condition['$in']))})",
+                    [dumps(v) for v in condition["$in"]],
+                    True,
+                )
+            return None, [], False
+
+        path = _path(field)
+        column = f"json_extract(doc, '{path}')"
+        types = _json_types(condition)
+        if types is not None:
+            clause = f"{column} = ? AND json_type(doc, '{path}') IN ({types})"
+            if field in self._indexed:
+                return clause, [condition], True
+            # a field inside of an array is out of json_extract's reach
+            parts = field.split(".")
+            arrays = " OR ".join(
+                f"json_type(doc, '{_path('.'.join(parts[:i]))}') = 'array'" for i in range(1, len(parts) + 1)
+            )
+            return f"({clause} OR {arrays})", [condition], False
+
+        if field not in self._indexed or not isinstance(condition, dict) or not condition:
+            return None, [], False
+        clauses, params = [], []
+        exact = True
+        for op, value in condition.items():
+            types = _json_types(value)
+            if op in _COMPARISONS and types is not None and not isinstance(value, bool):
+                symbol = {"$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}[op]
+                # SQLite orders numbers before strings, MongoDB only compares values of the same type
+                clauses.append(f"{column} {symbol} ? AND json_type(doc, '{path}') IN ({types})")
+                params.append(value)
+            elif op == "$in" and value and all(_json_types(v) is not None for v in value):
+                # booleans are stored as 0 and 1
+                scalars = [v for v in value if not isinstance(v, bool)]
+                booleans = {"'true'" if v else "'false'" for v in value if isinstance(v, bool)}
+                ins = []
+                if scalars:
+                    ins.append(
+                        f"{column} IN ({', '.join('?' * len(scalars))}) "
+                        f"AND json_type(doc, '{path}') NOT IN ('true', 'false')"
+                    )
+                    params.extend(scalars)
+                if booleans:
+                    ins.append(f"json_type(doc, '{path}') IN ({', '.join(sorted(booleans))})")
+                clauses.append(" OR ".join(f"({c})" for c in ins))
+            elif op == "$exists":
+                clauses.append(f"json_type(doc, '{path}') IS {'NOT ' if value else ''}NULL")
+            else:
+                exact = False
+        if not clauses:
+            return None, [], False
+        return " AND ".join(f"({c})" for c in clauses), params, exact
+
+    def _matching(self, conn, query: dict, *, sort=None, skip: int = 0, limit: int = 0) -> Iterator[dict]:
+        """Yields the documents matching `query` in `sort` order, reading only the rows needed."""
+        self._ensure(conn)
+        where, params, exact = self._where(query)
+        sql = f"SELECT doc FROM {self.table}{where}{_order_by(sort)}"
+        if exact:
+            if limit or skip:
+                sql += " LIMIT ? OFFSET ?"
+                params = [*params, limit or -1, skip]
+            for (doc,) in conn.execute(sql, params):
+                yield loads(doc)
+            return
+
+        found = 0
+        for (doc,) in conn.execute(sql, params):
+            doc = loads(doc)
+            if not match(doc, query):
+                continue
+            found += 1
+            if found <= skip:
+                continue
+            yield doc
+            if limit and found - skip >= limit:
+                return
+
+    def _count(self, conn, query: dict) -> int:
+        self._ensure(conn)
+        where, params, exact = self._where(query)
+        if exact:
+            return conn.execute(f"SELECT count(*) FROM {self.table}{where}", params).fetchone()[0]
+        return sum(1 for _ in self._matching(conn, query))
+
+    def _explain(self, conn, query: dict, sort=None) -> List[str]:
+        self._ensure(conn)
+        where, params, _ = self._where(query)
+        sql = f"EXPLAIN QUERY PLAN SELECT doc FROM {self.table}{where}{_order_by(sort)}"
+        return [row[3] for row in conn.execute(sql, params)]
+
+    def _write(self, conn, doc: dict) -> None:
+        conn.execute(
+            f"INSERT OR REPLACE INTO {self.table} (_id, doc) VALUES (?, ?)", (dumps(doc["_id"]), dumps(doc))
+        )
+
+    def _insert(self, conn, doc: dict) -> Any:
+        doc.setdefault("_id", ObjectId())
+        try:
+            conn.execute(
+                f"INSERT INTO {self.table} (_id, doc) VALUES (?, ?)", (dumps(doc["_id"]), dumps(doc))
+            )
+        except sqlite3.IntegrityError:
+            raise ValueError(f"Duplicate _id {doc['_id']} in {self.name}.") from None
+        return doc["_id"]
+
+    def _update(
+        self, conn, query: dict, update: dict, *, many: bool = False, upsert: bool = False, sort=None
+    ):
+        """Returns the result and the (before, after) documents of the first match."""
+        self._ensure(conn)
+        with transaction(conn):
+            docs = list(self._matching(conn, query, sort=sort, limit=0 if many else 1))
+
+            if not docs and upsert:
+                doc = {
+                    k: deepcopy(v)
+                    for k, v in query.items()
+                    if not k.startswith("$") and not isinstance(v, dict)
+                }
+                for field in [k for k in doc if "." in k]:
+                    parent, key = _parent(doc, field)
+                    parent[key] = doc.pop(field)
+                apply_update(doc, update, inserting=True)
+                upserted_id = self._insert(conn, doc)
+                return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=upserted_id), (
+                    None,
+                    doc,
+                )
+
+            first = (None, None)
+            modified = 0
+            for doc in docs:
+                before = deepcopy(doc)
+                apply_update(doc, update)
+                if doc != before:
+                    self._write(conn, doc)
+                    modified += 1
+                if first == (None, None):
+                    first = (before, doc)
+            return SimpleNamespace(matched_count=len(docs), modified_count=modified, upserted_id=None), first
+
+    def _delete(self, conn, query: dict, *, many: bool = False) -> List[dict]:
+        self._ensure(conn)
+        with transaction(conn):
+            docs = list(self._matching(conn, query, limit=0 if many else 1))
+            conn.executemany(
+                f"DELETE FROM {self.table} WHERE _id = ?", [(dumps(doc["_id"]),) for doc in docs]
+            )
+            return docs
+
+    def find(self, filter: dict = None, projection: dict = None, **kwargs) -> SQLiteCursor:
+        return SQLiteCursor(
+            self,
+            filter,
+            projection,
+            sort=kwargs.get("sort"),
+            limit=kwargs.get("limit", 0),
+            skip=kwargs.get("skip", 0),
+        )
+
+    async def find_one(self, filter: dict = None, projection: dict = None, **kwargs) -> Optional[dict]:
+        kwargs["limit"] = 1
+        docs = await self.find(filter, projection, **kwargs).to_list(1)
+        return docs[0] if docs else None
+
+    async def count_documents(self, filter: dict) -> int:
+        return await self.database.run(self._count, filter or {})
+
+    async def estimated_document_count(self) -> int:
+        def count(conn):
+            self._ensure(conn)
+            return conn.execute(f"SELECT count(*) FROM {self.table}").fetchone()[0]
+
+        return await self.database.run(count)
+
+    async def distinct(self, key: str, filter: dict = None) -> list:
+        found = []
+        for doc in await self.find(filter).to_list(None):
+            for value in _candidates(_values(doc, key.split("."))):
+                if value not in found:
+                    found.append(value)
+        return found
+
+    async def insert_one(self, document: dict) -> SimpleNamespace:
+        def insert(conn):
+            self._ensure(conn)
+            return self._insert(conn, document)
+
+        return SimpleNamespace(inserted_id=await self.database.run(insert), acknowledged=True)
+
+    async def insert_many(self, documents: List[dict], **kwargs) -> SimpleNamespace:
+        def insert(conn):
+            self._ensure(conn)
+            with transaction(conn):
+                return [self._insert(conn, doc) for doc in documents]
+
+        return SimpleNamespace(inserted_ids=await self.database.run(insert), acknowledged=True)
+
+    async def update_one(self, filter: dict, update: dict, upsert: bool = False, **kwargs) -> SimpleNamespace:
+        result, _ = await self.database.run(lambda conn: self._update(conn, filter, update, upsert=upsert))
+        return result
+
+    async def update_many(
+        self, filter: dict, update: dict, upsert: bool = False, **kwargs
+    ) -> SimpleNamespace:
+        result, _ = await self.database.run(
+            lambda conn: self._update(conn, filter, update, many=True, upsert=upsert)
+        )
+        return result
+
+    async def replace_one(self, filter: dict, replacement: dict, upsert: bool = False) -> SimpleNamespace:
+        def replace(conn):
+            self._ensure(conn)
+            with transaction(conn):
+                doc = next(self._matching(conn, filter, limit=1), None)
+                if doc is None:
+                    if not upsert:
+                        return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+                    new = dict(replacement)
+                    if "_id" in filter and not isinstance(filter["_id"], dict):
+                        # like MongoDB, an upsert takes the `_id` of its filter
+                        new["_id"] = filter["_id"]
+                    return SimpleNamespace(
+                        matched_count=0, modified_count=0, upserted_id=self._insert(conn, new)
+                    )
+                new = {**replacement, "_id": doc["_id"]}
+                self._write(conn, new)
+                return SimpleNamespace(matched_count=1, modified_count=int(doc != new), upserted_id=None)
+
+        return await self.database.run(replace)
+
+    async def find_one_and_update(
+        self,
+        filter: dict,
+        update: dict,
+        projection: dict = None,
+        sort=None,
+        upsert: bool = False,
+        return_document: bool = False,
+        **kwargs,
+    ) -> Optional[dict]:
+        _, (before, after) = await self.database.run(
+            lambda conn: self._update(conn, filter, update, upsert=upsert, sort=sort)
+        )
+        doc = after if return_document else before
+        return None if doc is None else apply_projection(doc, projection)
+
+    async def find_one_and_delete(self, filter: dict, projection: dict = None, **kwargs) -> Optional[dict]:
+        docs = await self.database.run(lambda conn: self._delete(conn, filter))
+        return apply_projection(docs[0], projection) if docs else None
+
+    async def delete_one(self, filter: dict) -> SimpleNamespace:
+        docs = await self.database.run(lambda conn: self._delete(conn, filter))
+        return SimpleNamespace(deleted_count=len(docs), acknowledged=True)
+
+    async def delete_many(self, filter: dict) -> SimpleNamespace:
+        docs = await self.database.run(lambda conn: self._delete(conn, filter, many=True))
+        return SimpleNamespace(deleted_count=len(docs), acknowledged=True)
+
+    async def bulk_write(self, requests: list, ordered: bool = True, **kwargs) -> SimpleNamespace:
+        """Runs pymongo write requests, such as `UpdateOne` or `DeleteMany`, one after the other."""
+        counts = dict(inserted_count=0, matched_count=0, modified_count=0, deleted_count=0, upserted_count=0)
+        for request in requests:
+            kind = type(request).__name__
+            if kind == "InsertOne":
+                await self.insert_one(request._doc)
+                counts["inserted_count"] += 1
+                continue
+            if kind in ("UpdateOne", "UpdateMany"):
+                method = self.update_one if kind == "UpdateOne" else self.update_many
+                result = await method(request._filter, request._doc, upsert=bool(request._upsert))
+            elif kind == "ReplaceOne":
+                result = await self.replace_one(request._filter, request._doc, upsert=bool(request._upsert))
+            elif kind in ("DeleteOne", "DeleteMany"):
+                method = self.delete_one if kind == "DeleteOne" else self.delete_many
+                counts["deleted_count"] += (await method(request._filter)).deleted_count
+                continue
+            else:
+                raise ValueError(f"Unsupported bulk write request {kind}.")
+            counts["matched_count"] += result.matched_count
+            counts["modified_count"] += result.modified_count
+            counts["upserted_count"] += result.upserted_id is not None
+        return SimpleNamespace(**counts, acknowledged=True)
+
+    async def create_index(self, keys, name: str = None, unique: bool = False, **kwargs) -> str:
+        if isinstance(keys, str):
+            keys = [(keys, 1)]
+        name = name or "_".join(f"{field}_{direction}" for field, direction in keys)
+        columns = ", ".join(
+            f"json_extract(doc, '{_path(field)}'){' DESC' if direction == -1 else ''}"
+            for field, direction in keys
+        )
+
+        def create(conn):
+            self._ensure(conn)
+            conn.execute(
+                f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS "
+                f"{_quote(self.name + '__' + name)} ON {self.table} ({columns})"
+            )
+
+        await self.database.run(create)
+        self._indexed.update(field for field, _ in keys)
+        return name
+
+    async def index_information(self) -> Dict[str, dict]:
+        def info(conn):
+            self._ensure(conn)
+            rows = conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ?", (self.name,)
+            )
+            return {row[0].split("__", 1)[-1]: {} for row in rows if "__" in row[0]}
+
+        return {"_id_": {}, **await self.database.run(info)}
+
+    async def drop_index(self, name: str) -> None:
+        await self.database.run(
+            lambda conn: conn.execute(f"DROP INDEX IF EXISTS {_quote(self.name + '__' + name)}")
+        )
+
+    async def drop(self) -> None:
+        def drop(conn):
+            conn.execute(f"DROP TABLE IF EXISTS {self.table}")
+            self._created = False
+
+        await self.database.run(drop)
+
+
+class SQLiteDatabase:
+    """
+    A SQLite database in WAL mode, accessed from a single dedicated thread.
+
+    Parameters
+    ----------
+    path : str
+        Path to the database file.
+    on_call : Optional[Callable[[float], None]]
+        Called with the duration of every call made through `run`.
+    """
+
+    def __init__(self, path: str, *, on_call: Optional[Callable[[float], None]] = None):
+        self.path = path
+        self.on_call = on_call
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="modmail-sqlite")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._collections: Dict[str, SQLiteCollection] = {}
+
+    def __getattr__(self, name: str) -> SQLiteCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def __getitem__(self, name: str) -> SQLiteCollection:
+        if name not in self._collections:
+            self._collections[name] = SQLiteCollection(self, name)
+        return self._collections[name]
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        logger.debug("Opened SQLite database %s.", self.path)
+        return conn
+
+    def _call(self, func: Callable, args: tuple) -> Any:
+        if self._conn is None:
+            self._conn = self._connect()
+        return func(self._conn, *args)
+
+    async def run(self, func: Callable, *args) -> Any:
+        """Runs `func(connection, *args)` on the database thread."""
+        start = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, self._call, func, args)
+        finally:
+            if self.on_call is not None:
+                self.on_call(time.perf_counter() - start)
+
+    async def close(self) -> None:
+        def close(conn):
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            conn.close()
+            self._conn = None
+
+        if self._conn is not None:
+            await self.run(close)
+        self._executor.shutdown(wait=True)
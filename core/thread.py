@@ -8,6 +8,7 @@ import time
 import traceback
 import typing
 import warnings
+from collections import OrderedDict
 from datetime import timedelta, datetime, timezone
 from types import SimpleNamespace
 
@@ -21,6 +22,7 @@ from lottie.exporters import exporters as l_exporters
 
 from core.models import DMDisabled, DummyMessage, PermissionLevel, getLogger
 from core import checks
+from core.scheduler import TimerHeap
 from core.utils import (
     is_image_url,
     parse_channel_topic,
@@ -35,6 +37,7 @@ from core.utils import (
     ConfirmThreadCreationView,
     DummyParam,
     extract_forwarded_content,
+    bounded_gather,
 )
 
 logger = getLogger(__name__)
@@ -65,8 +68,6 @@ class Thread:
         self._genesis_message = None
         self._ready_event = asyncio.Event()
         self.wait_tasks = []
-        self.close_task = None
-        self.auto_close_task = None
         self._cancelled = False
         self._dm_menu_msg_id = None
         self._dm_menu_channel_id = None
@@ -111,6 +112,16 @@ class Thread:
     def recipient(self) -> typing.Optional[typing.Union[discord.User, discord.Member]]:
         return self._recipient
 
+    @property
+    def close_task(self) -> typing.Optional[dict]:
+        """The pending scheduled close of the thread, `None` if there's none."""
+        return self.manager.closures.get((self.id, False))
+
+    @property
+    def auto_close_task(self) -> typing.Optional[dict]:
+        """The pending auto close of the thread, if any."""
+        return self.manager.closures.get((self.id, True))
+
     @property
     def recipients(self) -> typing.List[typing.Union[discord.User, discord.Member]]:
         return [self._recipient] + self._other_recipients
@@ -327,6 +338,7 @@ class Thread:
             # Delete channel
             await channel.delete(reason="Thread snoozed by moderator")
             self._channel = None
+        self.manager.reindex(self)
         return True
 
     async def restore_from_snooze(self):
@@ -421,6 +433,7 @@ class Thread:
                     reason="Thread unsnoozed/restored (recreated)",
                 )
                 self._channel = channel
+                self.manager.reindex(self)
             except Exception:
                 logger.error("Failed to recreate thread channel during unsnooze.", exc_info=True)
                 return False
@@ -451,6 +464,7 @@ class Thread:
                         reason="Thread unsnoozed/restored (recreated after NotFound)",
                     )
                     self._channel = channel
+                    self.manager.reindex(self)
                     return await channel.send(
                         content=content,
                         embeds=embeds,
@@ -485,8 +499,8 @@ class Thread:
                 )
                 log_count = None
                 try:
-                    logs = await self.bot.api.get_user_logs(self.id)
-                    log_count = sum(1 for log in logs if not log.get("open"))
+                    stats = await self.bot.api.get_user_stats(self.id)
+                    log_count = stats["closed_count"]
                 except Exception:
                     log_count = None
                 # Resolve recipient object
@@ -698,6 +712,7 @@ class Thread:
                             allowed_mentions=discord.AllowedMentions.none(),
                         )
         self.snoozed = False
+        self.manager.snoozes.cancel(self.id)
         # Store snooze_data for notification before clearing
         snooze_data_for_notify = self.snooze_data
         self.snooze_data = None
@@ -747,6 +762,7 @@ class Thread:
 
         # Ensure channel is set before processing commands
         self._channel = channel
+        self.manager.reindex(self)
 
         # Mark unsnooze as complete
         self._unsnoozing = False
@@ -819,14 +835,12 @@ class Thread:
                 return
             else:
                 self._channel = channel
+                self.manager.reindex(self)
 
         try:
-            log_url, log_data = await asyncio.gather(
-                self.bot.api.create_log_entry(recipient, channel, creator or recipient),
-                self.bot.api.get_user_logs(recipient.id),
-            )
-
-            log_count = sum(1 for log in log_data if not log["open"])
+            log_url = await self.bot.api.create_log_entry(recipient, channel, creator or recipient)
+            stats = await self.bot.api.get_user_stats(recipient.id)
+            log_count = stats["closed_count"]
         except Exception:
             logger.error("An error occurred while posting logs to the database.", exc_info=True)
             log_url = log_count = None
@@ -1033,10 +1047,6 @@ class Thread:
 
         return embed
 
-    async def _close_after(self, after, closer, silent, delete_channel, message):
-        await asyncio.sleep(after)
-        return self.bot.loop.create_task(self._close(closer, silent, delete_channel, message, True))
-
     async def close(
         self,
         *,
@@ -1049,31 +1059,23 @@ class Thread:
     ) -> None:
         """Close a thread now or after a set time in seconds"""
 
-        # restarts the after timer
-        await self.cancel_closure(auto_close)
-
+        # a scheduled close and an auto close are kept apart, scheduling
+        # either one replaces (restarts) only the pending one of its kind
         if after > 0:
-            # TODO: Add somewhere to clean up broken closures
-            #  (when channel is already deleted)
-            now = discord.utils.utcnow()
-            items = {
-                # 'initiation_time': now.isoformat(),
-                "time": (now + timedelta(seconds=after)).isoformat(),
-                "closer_id": closer.id,
+            closure = {
+                # whole seconds, so closes scheduled again within the same second aren't stored again
+                "due": discord.utils.utcnow().replace(microsecond=0) + timedelta(seconds=after),
+                "closer_id": str(closer.id),
                 "silent": silent,
                 "delete_channel": delete_channel,
                 "message": message,
                 "auto_close": auto_close,
             }
-            self.bot.config["closures"][str(self.id)] = items
-            await self.bot.config.update()
-
-            task = asyncio.create_task(self._close_after(after, closer, silent, delete_channel, message))
-
-            if auto_close:
-                self.auto_close_task = task
-            else:
-                self.close_task = task
+            key = (self.id, auto_close)
+            unchanged = self.manager.closures.get(key) == closure
+            self.manager.closures.schedule(key, closure["due"], closure)
+            if not unchanged:
+                await self.bot.api.set_closure(self.id, closure)
         else:
             await self._close(closer, silent, delete_channel, message)
 
@@ -1268,16 +1270,10 @@ class Thread:
                 logger.debug("Failed removing view from DM menu message: %s", inner_e)
 
     async def cancel_closure(self, auto_close: bool = False, all: bool = False) -> None:
-        if self.close_task is not None and (not auto_close or all):
-            self.close_task.cancel()
-            self.close_task = None
-        if self.auto_close_task is not None and (auto_close or all):
-            self.auto_close_task.cancel()
-            self.auto_close_task = None
-
-        to_update = self.bot.config["closures"].pop(str(self.id), None)
-        if to_update is not None:
-            await self.bot.config.update()
+        for kind in (False, True) if all else (auto_close,):
+            self.manager.cancel_closure((self.id, kind))
+            # the stored closure may not be scheduled yet, before `load_closures` ran at startup
+            await self.bot.api.delete_closure(self.id, kind)
 
     async def _restart_close_timer(self):
         """
@@ -1293,7 +1289,7 @@ class Thread:
         # Set timeout seconds
         seconds = timeout.total_seconds()
         # seconds = 20  # Uncomment to debug with just 20 seconds
-        reset_time = discord.utils.utcnow() + timedelta(seconds=seconds)
+        reset_time = discord.utils.utcnow().replace(microsecond=0) + timedelta(seconds=seconds)
         human_time = discord.utils.format_dt(reset_time)
 
         if self.bot.config.get("thread_auto_close_silently"):
@@ -1418,21 +1414,15 @@ class Thread:
         except ValueError:
             raise ValueError("Malformed thread message.")
 
+        relay = await self._get_relay(joint_id)
         messages = [message1]
         for user in self.recipients:
-            async for msg in user.history():
-                if either_direction:
-                    if msg.id == joint_id:
-                        return message1, msg
-
-                if not (msg.embeds and msg.embeds[0].author.url):
-                    continue
-                try:
-                    if int(msg.embeds[0].author.url.split("#")[-1]) == joint_id:
-                        messages.append(msg)
-                        break
-                except ValueError:
-                    continue
+            msg = await self._find_dm_copy(user, joint_id, relay, either_direction)
+            if msg is None:
+                continue
+            if either_direction and msg.id == joint_id:
+                return message1, msg
+            messages.append(msg)
 
         if len(messages) > 1:
             return messages
@@ -1494,8 +1484,18 @@ class Thread:
             # could be None too, if that's the case we'll reassign this variable from
             # thread message we fetch in the next step
 
+        if self.channel is None:
+            raise ValueError("Thread channel message not found.")
+
         linked_messages = []
-        if self.channel is not None:
+        relay_id = joint_id if joint_id is not None else message.id
+        relay = await self._get_relay(relay_id)
+        if relay is not None and relay.get("thread_message_id"):
+            try:
+                linked_messages.append(await self.channel.fetch_message(int(relay["thread_message_id"])))
+            except discord.NotFound:
+                raise ValueError("Thread channel message not found.")
+        else:
             async for msg in self.channel.history():
                 if not msg.embeds:
                     continue
@@ -1513,8 +1513,6 @@ class Thread:
                     break
             else:
                 raise ValueError("Thread channel message not found.")
-        else:
-            raise ValueError("Thread channel message not found.")
 
         if get_thread_channel:
             # end early as we only want the main message from thread channel
@@ -1526,28 +1524,59 @@ class Thread:
                 # still None, supress this and return the thread message
                 logger.error("Malformed thread message.")
                 return linked_messages
+        if joint_id != relay_id:
+            relay = await self._get_relay(joint_id)
 
         for user in self.recipients:
             if user.dm_channel == message.channel:
                 continue
-            async for other_msg in user.history():
-                if either_direction:
-                    if other_msg.id == joint_id:
-                        linked_messages.append(other_msg)
-                        break
-
-                if not other_msg.embeds:
-                    continue
-
-                other_joint_id = get_joint_id(other_msg)
-                if other_joint_id is not None and other_joint_id == joint_id:
-                    linked_messages.append(other_msg)
-                    break
+            other_msg = await self._find_dm_copy(user, joint_id, relay, either_direction)
+            if other_msg is not None:
+                linked_messages.append(other_msg)
             else:
                 logger.error("Linked message from recipient %s not found.", user)
 
         return linked_messages
 
+    async def _get_relay(self, joint_id: int) -> typing.Optional[dict]:
+        """The copies of a relayed message recorded for the current thread channel, if any."""
+        if self.channel is None:
+            return None
+        try:
+            relay = await self.bot.api.get_relay(joint_id)
+        except Exception:
+            logger.warning("Failed to look up relayed message %s.", joint_id, exc_info=True)
+            return None
+        if not relay or relay.get("channel_id") != str(self.channel.id):
+            # recorded in a channel that no longer exists, e.g. before the thread was snoozed
+            return None
+        return relay
+
+    async def _find_dm_copy(
+        self, user, joint_id: int, relay: typing.Optional[dict], either_direction: bool = False
+    ) -> typing.Optional[discord.Message]:
+        """
+        Finds the copy of a relayed message in the DMs of a recipient, or with
+        `either_direction` the message itself if they sent it. The history is
+        only scanned when the relay map has no record of it.
+        """
+        entry = ((relay or {}).get("recipients") or {}).get(str(user.id))
+        if entry is not None:
+            if entry.get("source") and not either_direction:
+                return None
+            channel = user.dm_channel or await user.create_dm()
+            try:
+                return await channel.fetch_message(int(entry["message_id"]))
+            except discord.NotFound:
+                return None
+
+        async for msg in user.history():
+            if either_direction and msg.id == joint_id:
+                return msg
+            if msg.embeds and get_joint_id(msg) == joint_id:
+                return msg
+        return None
+
     async def edit_dm_message(self, message: discord.Message, content: str) -> None:
         try:
             linked_messages = await self.find_linked_message_from_dm(message)
@@ -1578,9 +1607,7 @@ class Thread:
         )
 
         # Log as 'note' type for logviewer
-        self.bot.loop.create_task(
-            self.bot.api.append_log(message, message_id=msg.id, channel_id=self.channel.id, type_="note")
-        )
+        await self.bot.api.append_log(message, message_id=msg.id, channel_id=self.channel.id, type_="note")
 
         return msg
 
@@ -1824,7 +1851,7 @@ class Thread:
             await self.wait_until_ready()
 
         if not from_mod and not note:
-            self.bot.loop.create_task(self.bot.api.append_log(message, channel_id=self.channel.id))
+            await self.bot.api.append_log(message, channel_id=self.channel.id)
 
         destination = destination or self.channel
 
@@ -2212,8 +2239,35 @@ class Thread:
             await asyncio.gather(*additional_images)
             self.ready = True
 
+        await self._record_relay(message, msg, destination, from_mod)
         return msg
 
+    async def _record_relay(self, message, msg: discord.Message, destination, from_mod: bool) -> None:
+        """Adds a copy sent by `send` to the relay map."""
+        joint_id = get_joint_id(msg)
+        if joint_id is None or self.channel is None:
+            # plain DMs have no joint ID to be found by
+            return
+        try:
+            if isinstance(msg.channel, discord.DMChannel):
+                await self.bot.api.record_relay(
+                    joint_id, self.channel.id, recipient_id=destination.id, dm_message_id=msg.id
+                )
+            elif not from_mod and joint_id == message.id:
+                # the recipient's own message is linked too, to be found from the thread channel
+                await self.bot.api.record_relay(
+                    joint_id,
+                    msg.channel.id,
+                    thread_message_id=msg.id,
+                    recipient_id=message.author.id,
+                    dm_message_id=message.id,
+                    source=True,
+                )
+            else:
+                await self.bot.api.record_relay(joint_id, msg.channel.id, thread_message_id=msg.id)
+        except Exception:
+            logger.warning("Failed to record relayed message %s.", msg.id, exc_info=True)
+
     async def get_notifications(self) -> str:
         key = str(self.id)
         mentions: typing.List[str] = []
@@ -2272,6 +2326,7 @@ class Thread:
 
         self._other_recipients += users
         self._other_recipients = list(set(self._other_recipients))
+        self.manager.reindex(self)
 
         ids = ",".join(str(i.id) for i in self._other_recipients)
 
@@ -2290,6 +2345,7 @@ class Thread:
 
         for u in users:
             self._other_recipients.remove(u)
+        self.manager.reindex(self)
 
         if self._other_recipients:
             ids = ",".join(str(i.id) for i in self._other_recipients)
@@ -2352,17 +2408,305 @@ class Thread:
                 logger.error(f"Error processing queued command: {e}", exc_info=True)
 
 
+class ThreadCache(dict):
+    """
+    The threads of a `ThreadManager` by recipient ID, which keeps the
+    manager's indexes up to date as threads are added and removed.
+    """
+
+    def __init__(self, manager: "ThreadManager"):
+        super().__init__()
+        self.manager = manager
+
+    def __setitem__(self, key: int, thread: Thread) -> None:
+        previous = self.get(key)
+        if previous is not None and previous is not thread:
+            self.manager._unindex(previous)
+        super().__setitem__(key, thread)
+        self.manager._index(thread)
+
+    def __delitem__(self, key: int) -> None:
+        thread = self[key]
+        super().__delitem__(key)
+        self.manager._unindex(thread)
+
+    def pop(self, key: int, *default):
+        if key not in self:
+            return super().pop(key, *default)
+        thread = super().pop(key)
+        self.manager._unindex(thread)
+        return thread
+
+    def clear(self) -> None:
+        for thread in list(self.values()):
+            self.manager._unindex(thread)
+        super().clear()
+
+
 class ThreadManager:
     """Class that handles storing, finding and creating Modmail threads."""
 
+    # scheduled closes and unsnoozes run at once at most
+    JOB_CONCURRENCY = 5
+    # users known to have no thread that are remembered, least recently seen first out
+    NON_RECIPIENTS_SIZE = 10000
+
     def __init__(self, bot):
         self.bot = bot
-        self.cache = {}
+        self.cache = ThreadCache(self)
         self.closing = set()
+        # channel ID -> thread and recipient ID, including other recipients -> thread, for cached threads
+        self._channels: typing.Dict[int, Thread] = {}
+        self._recipients: typing.Dict[int, Thread] = {}
+        self._indexed: typing.Dict[int, typing.Tuple[Thread, typing.Optional[int], typing.Set[int]]] = {}
+        # users known to have no thread, and channel ID -> topic of channels known not to be threads
+        self._non_recipients: "OrderedDict[int, None]" = OrderedDict()
+        self._plain_channels: typing.Dict[int, typing.Optional[str]] = {}
+        # scheduled closes and snoozed threads' wake times by recipient ID
+        # after downtime, overdue jobs all come due at startup
+        self.closures = TimerHeap(self._run_closure, name="scheduled close", concurrency=self.JOB_CONCURRENCY)
+        self._closures_loaded = False
+        self._cancelled_closures: typing.Set[typing.Tuple[int, bool]] = set()
+        self.snoozes = TimerHeap(self._run_unsnooze, name="auto-unsnooze", concurrency=self.JOB_CONCURRENCY)
+
+    def cancel_closure(self, key: typing.Tuple[int, bool]) -> None:
+        """Cancels a scheduled close, even one stored but not loaded yet."""
+        self.closures.cancel(key)
+        if not self._closures_loaded:
+            self._cancelled_closures.add(key)
+
+    def _index(self, thread: Thread) -> None:
+        self._unindex(thread)
+        channel_id = getattr(thread.channel, "id", None)
+        user_ids = {thread.id} | {user.id for user in thread._other_recipients}
+        self._indexed[thread.id] = (thread, channel_id, user_ids)
+        if channel_id is not None:
+            self._channels[channel_id] = thread
+            self._plain_channels.pop(channel_id, None)
+        for user_id in user_ids:
+            self._recipients[user_id] = thread
+        self._forget_non_recipients(user_ids)
+
+    def _unindex(self, thread: Thread) -> None:
+        indexed, channel_id, user_ids = self._indexed.get(thread.id, (None, None, set()))
+        if indexed is not thread:
+            return
+        del self._indexed[thread.id]
+        if self._channels.get(channel_id) is thread:
+            del self._channels[channel_id]
+        for user_id in user_ids:
+            if self._recipients.get(user_id) is thread:
+                del self._recipients[user_id]
+
+    def reindex(self, thread: Thread) -> None:
+        """Updates the indexes after the channel or the recipients of a thread changed."""
+        if self.cache.get(thread.id) is thread:
+            self._index(thread)
+
+    def channel_created(self, channel: discord.TextChannel) -> None:
+        """Forgets that the users named in the topic of a new channel have no thread."""
+        _, user_id, other_ids = parse_channel_topic(channel.topic)
+        self._forget_non_recipients([user_id, *other_ids])
+
+    def _is_non_recipient(self, user_id: int) -> bool:
+        if user_id not in self._non_recipients:
+            return False
+        self._non_recipients.move_to_end(user_id)
+        return True
+
+    def _add_non_recipient(self, user_id: int) -> None:
+        self._non_recipients[user_id] = None
+        self._non_recipients.move_to_end(user_id)
+        while len(self._non_recipients) > self.NON_RECIPIENTS_SIZE:
+            self._non_recipients.popitem(last=False)
+
+    def _forget_non_recipients(self, user_ids: typing.Iterable[int]) -> None:
+        for user_id in user_ids:
+            self._non_recipients.pop(user_id, None)
+
+    def channel_deleted(self, channel: discord.TextChannel) -> None:
+        """Stops finding threads by a deleted channel, they stay cached, e.g. when snoozed."""
+        self._plain_channels.pop(channel.id, None)
+        thread = self._channels.pop(channel.id, None)
+        if thread is not None:
+            _, _, user_ids = self._indexed[thread.id]
+            self._indexed[thread.id] = (thread, None, user_ids)
+
+    def _find_indexed(self, *, channel_id: int = None, recipient_id: int = None) -> typing.Optional[Thread]:
+        if channel_id is not None:
+            thread = self._channels.get(channel_id)
+            valid = thread is not None and getattr(thread.channel, "id", None) == channel_id
+        else:
+            thread = self._recipients.get(recipient_id)
+            valid = thread is not None and (
+                recipient_id == thread.id or recipient_id in {u.id for u in thread._other_recipients}
+            )
+        if valid and self.cache.get(thread.id) is thread:
+            return thread
+        return None
+
+    async def load_closures(self) -> typing.List[dict]:
+        """
+        Schedules the stored thread closes, after moving those still kept
+        in the `closures` config to the database.
+
+        Returns the scheduled closes. Overdue ones run right away, at most
+        `JOB_CONCURRENCY` at a time.
+        """
+        legacy = self.bot.config["closures"]
+        if legacy:
+
+            async def migrate(item):
+                recipient_id, items = item
+                closure = {key: value for key, value in items.items() if key != "time"}
+                closure["due"] = datetime.fromisoformat(items["time"]).astimezone(timezone.utc)
+                closure["closer_id"] = str(items["closer_id"])
+                await self.bot.api.set_closure(recipient_id, closure)
+
+            def progress(done, total):
+                if done % 100 == 0 and done < total:
+                    logger.info("Moved %d of %d scheduled close(s) to the database.", done, total)
+
+            results = await bounded_gather(
+                migrate, list(legacy.items()), limit=self.JOB_CONCURRENCY, progress=progress
+            )
+            for error in results:
+                if isinstance(error, Exception):
+                    raise error
+            self.bot.config["closures"] = {}
+            await self.bot.config.update()
+            logger.info("Moved %d scheduled close(s) from the config to the database.", len(legacy))
+
+        closures = []
+        for closure in await self.bot.api.get_closures():
+            key = (int(closure["recipient_id"]), closure.get("auto_close", False))
+            # cancelled or scheduled again while the closures were loading
+            if key in self._cancelled_closures or key in self.closures:
+                continue
+            self.closures.schedule(key, closure["due"], closure)
+            closures.append(closure)
+        self._closures_loaded = True
+        self._cancelled_closures.clear()
+        self.closures.start()
+        logger.info("There are %d thread(s) pending to be closed.", len(closures))
+        return closures
+
+    async def _run_closure(self, key: typing.Tuple[int, bool], closure: dict) -> None:
+        recipient_id, auto_close = key
+        await self.bot.api.delete_closure(recipient_id, auto_close)
+        thread = await self.find(recipient_id=recipient_id)
+        if thread is None:
+            # the channel was deleted
+            logger.debug("Failed to close thread for recipient %s.", recipient_id)
+            return
+        logger.debug("Closing thread for recipient %s.", recipient_id)
+        await thread._close(
+            await self.bot.get_or_fetch_user(int(closure["closer_id"])),
+            closure["silent"],
+            closure["delete_channel"],
+            closure["message"],
+            True,
+        )
+
+    async def load_snoozes(self) -> int:
+        """
+        Schedules the automatic unsnooze of snoozed threads, then follows
+        snoozes by other instances through a change stream when available.
+
+        Returns the number of snoozed threads.
+        """
+        snoozes = await self.bot.api.get_snoozes()
+        for recipient_id, wake_at in snoozes:
+            self._snooze_changed(recipient_id, wake_at)
+        self.snoozes.start()
+        logger.info("There are %d snoozed thread(s).", len(snoozes))
+        self.bot.loop.create_task(self._watch_snoozes())
+        return len(snoozes)
+
+    def _snooze_changed(self, recipient_id: int, wake_at: typing.Optional[datetime]) -> None:
+        if wake_at is None:
+            self.snoozes.cancel(recipient_id)
+        else:
+            self.snoozes.schedule(recipient_id, wake_at)
+
+    async def _watch_snoozes(self) -> None:
+        try:
+            watched = await self.bot.api.watch_snoozes(self._snooze_changed)
+        except Exception:
+            logger.error("Stopped watching snoozed threads.", exc_info=True)
+        else:
+            if not watched:
+                logger.debug("Change streams are unavailable, only snoozes by this instance are scheduled.")
 
-    async def populate_cache(self) -> None:
+    async def _run_unsnooze(self, recipient_id: int, _) -> None:
+        thread = await self.find(recipient_id=recipient_id)
+        if thread is None:
+            return
+        if not thread.snoozed or not thread.snooze_data:
+            # e.g. snoozed before a restart, or by another instance
+            log_entry = await self.bot.api.logs.find_one({"recipient.id": str(thread.id), "snoozed": True})
+            if log_entry is None:
+                return
+            thread.snoozed = True
+            thread.snooze_data = log_entry.get("snooze_data")
+        if await thread.restore_from_snooze():
+            logger.info("Thread for %s automatically unsnoozed.", recipient_id)
+            try:
+                if thread.channel is not None:
+                    await thread.channel.send("⏰ This thread has been automatically unsnoozed.")
+            except Exception as e:
+                logger.info("Failed to notify channel after auto-unsnooze: %s", e)
+
+    async def populate_cache(self, *, concurrency: int = 10) -> None:
+        """
+        Caches the threads of every channel in the modmail guild.
+
+        All channel topics are parsed first, then the recipients they name
+        are resolved with at most `concurrency` requests at a time. Threads
+        not cached yet are still found on demand by `find` meanwhile.
+        """
+        started = time.perf_counter()
+        pending = []
         for channel in self.bot.modmail_guild.text_channels:
-            await self.find(channel=channel)
+            _, user_id, other_ids = parse_channel_topic(channel.topic)
+            if user_id == -1:
+                self._plain_channels[channel.id] = channel.topic
+            elif user_id not in self.cache:
+                pending.append((channel, user_id, other_ids))
+
+        users = {}
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def resolve(user_id):
+            async with semaphore:
+                try:
+                    users[user_id] = await self.bot.get_or_fetch_user(user_id)
+                except discord.NotFound:
+                    pass
+                except discord.HTTPException as e:
+                    logger.warning("Failed to fetch thread recipient %s: %s", user_id, e)
+
+        user_ids = {uid for _, user_id, other_ids in pending for uid in (user_id, *other_ids)}
+        await asyncio.gather(*(resolve(user_id) for user_id in user_ids))
+
+        resolved = 0
+        for channel, user_id, other_ids in pending:
+            recipient = users.get(user_id)
+            if recipient is None or user_id in self.cache or channel.id in self.closing:
+                # unknown user, or already found on demand or closed meanwhile
+                continue
+            other_recipients = [users[uid] for uid in other_ids if uid in users]
+            self.cache[user_id] = thread = Thread(self, recipient, channel, other_recipients)
+            thread.ready = True
+            resolved += 1
+
+        logger.info(
+            "Cached %d thread(s) from %d channel(s), resolving %d user(s) in %.2fs.",
+            resolved,
+            len(pending),
+            len(users),
+            time.perf_counter() - started,
+        )
 
     def __len__(self):
         return len(self.cache)
@@ -2384,15 +2728,18 @@ class ThreadManager:
         if recipient is None and channel is not None and isinstance(channel, discord.TextChannel):
             if channel.id in self.closing:
                 return None
+            thread = self._find_indexed(channel_id=channel.id)
+            if thread is not None:
+                _, user_id, _ = parse_channel_topic(channel.topic)
+                if user_id != thread.id:
+                    logger.debug("Found thread with tempered ID.")
+                    await channel.edit(topic=f"User ID: {thread.id}")
+                return thread
+            if channel.id in self._plain_channels and self._plain_channels[channel.id] == channel.topic:
+                return None
             thread = await self._find_from_channel(channel)
             if thread is None:
-                user_id, thread = next(
-                    ((k, v) for k, v in self.cache.items() if v.channel == channel),
-                    (-1, None),
-                )
-                if thread is not None:
-                    logger.debug("Found thread with tempered ID.")
-                    await channel.edit(topic=f"User ID: {user_id}")
+                self._plain_channels[channel.id] = channel.topic
             return thread
 
         if recipient:
@@ -2440,6 +2787,9 @@ class ThreadManager:
                         self.cache.pop(getattr(thread, "id", None), None)
                         thread = None
         else:
+            thread = self._find_indexed(recipient_id=recipient_id)
+            if thread is not None or self._is_non_recipient(recipient_id):
+                return thread
 
             def check(topic):
                 _, user_id, other_ids = parse_channel_topic(topic)
@@ -2450,7 +2800,9 @@ class ThreadManager:
                 self.bot.modmail_guild.text_channels,
             )
 
-            if channel:
+            if not channel:
+                self._add_non_recipient(recipient_id)
+            else:
                 thread = await Thread.from_channel(self, channel)
                 if thread.recipient:
                     # only save if data is valid.
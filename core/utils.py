@@ -1,8 +1,10 @@
+import asyncio
 import base64
 import functools
 import contextlib
 import re
 import typing
+from collections import Counter
 from datetime import datetime, timezone
 from difflib import get_close_matches
 from itertools import takewhile, zip_longest
@@ -30,13 +32,16 @@ __all__ = [
     "match_other_recipients",
     "create_thread_channel",
     "create_not_found_embed",
+    "NgramIndex",
     "parse_alias",
+    "compile_alias",
     "normalize_alias",
     "format_description",
     "trigger_typing",
     "safe_typing",
     "escape_code_block",
     "tryint",
+    "bounded_gather",
     "get_top_role",
     "get_joint_id",
     "extract_block_timestamp",
@@ -358,13 +363,54 @@ def match_other_recipients(text: str) -> typing.List[int]:
     return parse_channel_topic(text)[2]
 
 
+class NgramIndex:
+    """
+    Finds the names close to a word without comparing it to every name.
+
+    Names are indexed by their character bigrams. Only the names sharing
+    the most bigrams with the word are compared with `difflib`.
+
+    Parameters
+    ----------
+    names : Iterable[str]
+        The names to index.
+    candidates : int
+        How many of the names sharing the most bigrams are compared.
+    """
+
+    def __init__(self, names: typing.Iterable[str], *, candidates: int = 50):
+        self.names = set(names)
+        self.candidates = candidates
+        self._index: typing.Dict[str, typing.List[str]] = {}
+        for name in self.names:
+            for gram in self.ngrams(name):
+                self._index.setdefault(gram, []).append(name)
+
+    @staticmethod
+    def ngrams(word: str) -> typing.Set[str]:
+        # padded, so the first and last characters count too
+        word = f" {word} "
+        return {word[i : i + 2] for i in range(len(word) - 1)}
+
+    def close_matches(self, word: str, n: int = 2, cutoff: float = 0.6) -> typing.List[str]:
+        """Like `difflib.get_close_matches`, among the names sharing the most bigrams with `word`."""
+        shared = Counter()
+        for gram in self.ngrams(word):
+            shared.update(self._index.get(gram, ()))
+        candidates = [name for name, _ in shared.most_common(self.candidates)]
+        return get_close_matches(word, candidates, n=n, cutoff=cutoff)
+
+
 def create_not_found_embed(word, possibilities, name, n=2, cutoff=0.6) -> discord.Embed:
     # Single reference of Color.red()
     embed = discord.Embed(
         color=discord.Color.red(),
         description=f"**{name.capitalize()} `{word}` cannot be found.**",
     )
-    val = get_close_matches(word, possibilities, n=n, cutoff=cutoff)
+    if isinstance(possibilities, NgramIndex):
+        val = possibilities.close_matches(word, n=n, cutoff=cutoff)
+    else:
+        val = get_close_matches(word, possibilities, n=n, cutoff=cutoff)
     if val:
         embed.description += "\nHowever, perhaps you meant...\n" + "\n".join(val)
     return embed
@@ -402,9 +448,28 @@ def parse_alias(alias, *, split=True):
     return aliases
 
 
+@functools.lru_cache(maxsize=1024)
+def compile_alias(alias: str) -> typing.Tuple[str, ...]:
+    """
+    The steps of an alias, parsed once per definition.
+
+    Parameters
+    ----------
+    alias : str
+        The alias, as stored in the config.
+
+    Returns
+    -------
+    Tuple[str, ...]
+        The steps, empty if the alias is invalid.
+    """
+    return tuple(parse_alias(alias))
+
+
 def normalize_alias(alias, message=""):
-    aliases = parse_alias(alias)
-    contents = parse_alias(message, split=False)
+    aliases = compile_alias(alias)
+    # arguments are only quoted or split when there are some
+    contents = parse_alias(message, split=False) if message.strip() else []
 
     final_aliases = []
     for a, content in zip_longest(aliases, contents):
@@ -486,6 +551,48 @@ def get_top_role(member: discord.Member, hoisted=True):
             return role
 
 
+async def bounded_gather(
+    func: typing.Callable[[typing.Any], typing.Awaitable[typing.Any]],
+    items: typing.Sequence[typing.Any],
+    *,
+    limit: int,
+    progress: typing.Optional[typing.Callable[[int, int], None]] = None,
+) -> typing.List[typing.Any]:
+    """
+    Awaits `func(item)` for every item, with at most `limit` running at once.
+
+    Parameters
+    ----------
+    func : Callable[[Any], Awaitable[Any]]
+        The coroutine function run on each item.
+    items : Sequence[Any]
+        The items.
+    limit : int
+        How many items are processed at once.
+    progress : Optional[Callable[[int, int], None]]
+        Called with the number of items done and the number of items, after each item.
+
+    Returns
+    -------
+    List[Any]
+        The results in the order of the items, the exception raised for the failed ones.
+    """
+    semaphore = asyncio.Semaphore(limit)
+    done = 0
+
+    async def run(item):
+        nonlocal done
+        async with semaphore:
+            try:
+                return await func(item)
+            finally:
+                done += 1
+                if progress is not None:
+                    progress(done, len(items))
+
+    return await asyncio.gather(*(run(item) for item in items), return_exceptions=True)
+
+
 async def create_thread_channel(bot, recipient, category, overwrites, *, name=None, errors_raised=None):
     name = name or bot.format_channel_name(recipient)
     errors_raised = errors_raised or []
@@ -0,0 +1,83 @@
+import asyncio
+from copy import deepcopy
+from types import SimpleNamespace
+
+import pytest
+
+from core.clients import SQLiteClient
+from core.config import ConfigManager
+from core.models import ConfigConflictError
+
+
+class FakeConfigApi:
+    """
+    Keeps the configuration document in memory, with the same
+    versioning as `MongoDBClient.update_config`.
+    """
+
+    def __init__(self):
+        self.doc = {"bot_id": 0}
+        self.writes = []
+        self.watcher = None
+
+    def edit(self, **changes) -> dict:
+        """Changes configurations like another instance would."""
+        self.doc.update(changes)
+        self.doc["_version"] = self.doc.get("_version", 0) + 1
+        if self.watcher is not None:
+            self.watcher(deepcopy(self.doc))
+        return self.doc
+
+    async def get_config(self) -> dict:
+        return deepcopy(self.doc)
+
+    async def update_config(self, data, *, unset=None, version=None):
+        if version is not None and self.doc.get("_version", 0) != version:
+            raise ConfigConflictError(f"Configurations are not at version {version} anymore.")
+        self.writes.append((deepcopy(data), list(unset or [])))
+        self.doc.update(deepcopy(data))
+        for k in unset or []:
+            self.doc.pop(k, None)
+        if version is not None:
+            self.doc["_version"] = version + 1
+        if self.watcher is not None:
+            self.watcher(deepcopy(self.doc))
+
+    async def get_config_version(self) -> int:
+        return self.doc.get("_version", 0)
+
+    async def watch_config(self, callback) -> bool:
+        self.watcher = callback
+        # like a change stream, watches until cancelled
+        await asyncio.Event().wait()
+        return True
+
+
+@pytest.fixture
+def config_api():
+    return FakeConfigApi()
+
+
+@pytest.fixture
+def config(config_api):
+    config = ConfigManager(SimpleNamespace(api=config_api))
+    config.populate_cache()
+    return config
+
+
+@pytest.fixture
+def sqlite_client(tmp_path):
+    """A `SQLiteClient` of a stand-in bot, `setup_indexes` still has to be awaited."""
+    bot = SimpleNamespace(
+        config={
+            "connection_uri": f"sqlite:///{tmp_path / 'modmail.db'}",
+            "log_url": "https://example.com",
+            "log_url_prefix": "logs",
+            "verify_db_indexes": False,
+        },
+        startup_profiler=SimpleNamespace(record=lambda kind, duration: None),
+        session=None,
+        guild_id=1,
+        user=SimpleNamespace(id=0),
+    )
+    return SQLiteClient(bot)
@@ -0,0 +1,58 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from bot import ModmailBot
+from core.blocklist import BlockList
+from core.config import ConfigManager
+
+
+class BlockApi:
+    def __init__(self):
+        self.blocks = {}
+
+    async def set_block(self, kind, id_, block):
+        self.blocks[kind, str(id_)] = block
+
+    async def delete_block(self, kind, id_):
+        self.blocks.pop((kind, str(id_)), None)
+
+
+def make_blocks():
+    bot = SimpleNamespace(config=ConfigManager(None), api=BlockApi())
+    bot.config.populate_cache()
+    bot.blocks = BlockList(bot)
+    return bot
+
+
+def test_remembered_users_are_evicted_least_recently_used_first(monkeypatch):
+    monkeypatch.setattr(BlockList, "MAX_DECISIONS", 2)
+    blocks = make_blocks().blocks
+    blocks.allow(1, blocks.decision_token())
+    blocks.allow(2, blocks.decision_token())
+    assert blocks.is_allowed(1)
+
+    blocks.allow(3, blocks.decision_token())
+    assert blocks.is_allowed(1)
+    assert not blocks.is_allowed(2)
+    assert blocks.is_allowed(3)
+
+
+def test_blocked_users_follow_the_blocks():
+    async def main():
+        bot = make_blocks()
+        blocked_users = ModmailBot.blocked_users.fget(bot)
+        assert blocked_users is ModmailBot.blocked_users.fget(bot)
+
+        await bot.blocks.add("user", 42, "spam")
+        assert blocked_users == {"42": "spam"}
+        assert ModmailBot.blocked_roles.fget(bot) == {}
+        with pytest.raises(TypeError):
+            blocked_users["43"] = "spam"
+
+        await bot.blocks.remove("user", 42)
+        assert blocked_users == {}
+        bot.blocks.expiry.stop()
+
+    asyncio.run(main())
@@ -0,0 +1,87 @@
+import asyncio
+from datetime import timedelta
+from types import SimpleNamespace
+
+import discord
+
+from core.thread import Thread, ThreadManager
+
+
+class FakeClosureApi:
+    def __init__(self):
+        self.closures = {}
+        self.writes = 0
+
+    async def get_closures(self):
+        return [dict(closure) for closure in self.closures.values()]
+
+    async def set_closure(self, recipient_id, closure):
+        self.writes += 1
+        self.closures[(int(recipient_id), closure.get("auto_close", False))] = {
+            "recipient_id": str(recipient_id),
+            **closure,
+        }
+
+    async def delete_closure(self, recipient_id, auto_close=False):
+        self.closures.pop((int(recipient_id), auto_close), None)
+
+
+def make_manager():
+    bot = SimpleNamespace(api=FakeClosureApi(), config={"closures": {}})
+    return ThreadManager(bot)
+
+
+def stored_closure(recipient_id, auto_close=False):
+    return {
+        "recipient_id": str(recipient_id),
+        "due": discord.utils.utcnow() + timedelta(hours=1),
+        "closer_id": "1",
+        "silent": False,
+        "delete_channel": True,
+        "message": None,
+        "auto_close": auto_close,
+    }
+
+
+def test_cancel_before_closures_are_loaded():
+    async def main():
+        manager = make_manager()
+        api = manager.bot.api
+        api.closures[(5, False)] = stored_closure(5)
+        api.closures[(6, False)] = stored_closure(6)
+
+        await Thread(manager, 5).cancel_closure()
+        assert (5, False) not in api.closures
+
+        await manager.load_closures()
+        assert (5, False) not in manager.closures
+        assert (6, False) in manager.closures
+        manager.closures.stop()
+
+    asyncio.run(main())
+
+
+def test_scheduling_the_same_close_again_is_not_stored_again(monkeypatch):
+    now = discord.utils.utcnow()
+    monkeypatch.setattr(discord.utils, "utcnow", lambda: now)
+
+    async def main():
+        manager = make_manager()
+        await manager.load_closures()
+        thread = Thread(manager, 5)
+        closer = SimpleNamespace(id=1)
+
+        await thread.close(closer=closer, after=3600, auto_close=True)
+        await thread.close(closer=closer, after=3600, auto_close=True)
+        assert manager.bot.api.writes == 1
+        await thread.close(closer=closer, after=7200, auto_close=True)
+        assert manager.bot.api.writes == 2
+
+        # a scheduled close and an auto close are kept apart
+        await thread.close(closer=closer, after=60)
+        assert thread.close_task is not None and thread.auto_close_task is not None
+        await thread.cancel_closure(auto_close=True)
+        assert thread.auto_close_task is None and thread.close_task is not None
+        manager.closures.stop()
+
+    asyncio.run(main())
@@ -0,0 +1,130 @@
+import asyncio
+
+
+def test_get_caches_converted_values(config):
+    config["main_color"] = "#123456"
+    assert config.get("main_color") == 0x123456
+    hits = config.conversion_hits
+    assert config.get("main_color") == 0x123456
+    assert config.conversion_hits == hits + 1
+
+    config["main_color"] = "#654321"
+    assert config.get("main_color") == 0x654321
+
+
+def test_update_without_changes_keeps_generation(config):
+    async def main():
+        await config.update(flush=True)
+        generation = config.generation
+        await config.update(flush=True)
+        assert config.generation == generation
+        config["snippets"]["hi"] = "hello"
+        await config.update(flush=True)
+        assert config.generation_of("snippets") > generation
+        assert config.generation_of("main_color") <= generation
+
+    asyncio.run(main())
+
+
+def test_in_place_change_after_refresh_is_written(config, config_api):
+    async def main():
+        config_api.doc["snippets"] = {"a": "x"}
+        await config.refresh()
+        config.get("snippets")
+        # reconnecting refreshes the configurations with equal but new objects
+        await config.refresh()
+        config["snippets"]["b"] = "y"
+        await config.update(flush=True)
+
+        assert config_api.doc["snippets"] == {"a": "x", "b": "y"}
+        assert config.get("snippets") == {"a": "x", "b": "y"}
+        assert config.get("snippets") is config.get("snippets", convert=False)
+
+    asyncio.run(main())
+
+
+def test_changing_converted_permissions_leaves_config_alone(config):
+    config["level_permissions"] = {"SUPPORTER": ["1"]}
+    config.get("level_permissions")["SUPPORTER"].append("2")
+    assert config.get("level_permissions") == {"SUPPORTER": ["1"]}
+    assert config.get("level_permissions", convert=False) == {"SUPPORTER": ["1"]}
+
+
+def test_conflicting_write_merges_and_retries(config, config_api):
+    async def main():
+        await config.refresh()
+        config_api.edit(main_color="#111111")
+        config["prefix"] = "!"
+        await config.update(flush=True)
+
+        assert config.write_conflicts == 1
+        assert config_api.doc["prefix"] == "!"
+        assert config_api.doc["main_color"] == "#111111"
+        assert config.get("main_color") == 0x111111
+        assert config.version == config_api.doc["_version"]
+
+    asyncio.run(main())
+
+
+def test_apply_remote_keeps_unwritten_changes(config, config_api):
+    async def main():
+        config_api.doc.update(prefix="?", main_color="#111111", _version=1)
+        await config.refresh()
+        config["prefix"] = "!"
+        config_api.doc.update(prefix="$", main_color="#222222", mention="@staff", _version=2)
+        doc = await config_api.get_config()
+
+        assert sorted(config.apply_remote(doc)) == ["main_color", "mention"]
+        assert config["prefix"] == "!"
+        assert config.get("main_color") == 0x222222
+        assert config["mention"] == "@staff"
+        assert config.version == 2
+
+        await config.update(flush=True)
+        assert config_api.doc["prefix"] == "!"
+        assert config.write_conflicts == 0
+
+    asyncio.run(main())
+
+
+def test_write_against_an_older_stored_version(config, config_api):
+    async def main():
+        config_api.doc.update(_version=5)
+        await config.refresh()
+        config_api.doc.update(_version=1)
+        config["prefix"] = "!"
+        await config.update(flush=True)
+
+        assert config.write_conflicts == 1
+        assert config_api.doc["prefix"] == "!"
+
+    asyncio.run(main())
+
+
+def test_watcher_applies_remote_changes(config, config_api):
+    async def main():
+        await config.refresh()
+        config.start_watching()
+        await asyncio.sleep(0)
+        config_api.edit(mention="@staff")
+        assert config["mention"] == "@staff"
+        await config.close()
+
+    asyncio.run(main())
+
+
+def test_debounced_update_is_written_on_close(config, config_api):
+    async def main():
+        await config.refresh()
+        config["prefix"] = "!"
+        await config.update()
+        config["mention"] = "@staff"
+        await config.update()
+        assert config_api.writes == []
+
+        await config.close()
+        assert config_api.writes == [({"prefix": "!", "mention": "@staff"}, [])]
+        await asyncio.sleep(config.update_delay + 0.1)
+        assert len(config_api.writes) == 1
+
+    asyncio.run(main())
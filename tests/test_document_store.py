@@ -0,0 +1,294 @@
+"""
+Query, update and projection semantics of the SQLite document store,
+checked against MongoDB as well when `MODMAIL_TEST_MONGODB_URI` is set.
+"""
+
+import asyncio
+import os
+import secrets
+from contextlib import asynccontextmanager
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument, UpdateOne
+
+from core.clients import LogStream
+from core.sqlite import SQLiteDatabase
+
+MONGODB_URI = os.environ.get("MODMAIL_TEST_MONGODB_URI")
+
+BACKENDS = [
+    "sqlite",
+    pytest.param(
+        "mongodb", marks=pytest.mark.skipif(not MONGODB_URI, reason="MODMAIL_TEST_MONGODB_URI is not set")
+    ),
+]
+
+DOCS = [
+    {"_id": 1, "key": "a", "open": True, "count": 3, "recipient": {"id": "10"}, "tags": ["x", "y"]},
+    {"_id": 2, "key": "b", "open": False, "count": 1, "recipient": {"id": "11"}, "closed_at": "2024-01-02"},
+    {"_id": 3, "key": "c", "open": False, "count": 2, "recipient": {"id": "10"}, "closed_at": "2024-01-03"},
+    {"_id": 4, "key": "d", "open": 1, "count": "2", "messages": [{"message_id": "m1"}, {"message_id": "m2"}]},
+    {"_id": 5, "key": "e", "open": False, "count": 5, "closed_at": "2024-01-03", "snoozed": None},
+]
+
+
+@asynccontextmanager
+async def open_collection(backend: str, path):
+    if backend == "sqlite":
+        db = SQLiteDatabase(str(path / "modmail.db"))
+        try:
+            yield db.documents
+        finally:
+            await db.close()
+    else:
+        client = AsyncIOMotorClient(MONGODB_URI)
+        db = client[f"modmail_test_{secrets.token_hex(4)}"]
+        try:
+            yield db.documents
+        finally:
+            await client.drop_database(db.name)
+            client.close()
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request):
+    return request.param
+
+
+@pytest.fixture(params=[False, True], ids=["unindexed", "indexed"])
+def run(request, backend, tmp_path):
+    """Runs a test coroutine with a collection of `DOCS`, with or without indexes on the queried fields."""
+
+    def run(test):
+        async def main():
+            async with open_collection(backend, tmp_path) as collection:
+                if request.param:
+                    for field in ("key", "open", "count", "recipient.id", "closed_at"):
+                        await collection.create_index([(field, 1)])
+                await collection.insert_many([dict(doc) for doc in DOCS])
+                await test(collection)
+
+        asyncio.run(main())
+
+    return run
+
+
+QUERIES = [
+    ({"key": "a"}, [1]),
+    ({"key": {"$eq": "b"}}, [2]),
+    ({"open": True}, [1]),
+    ({"open": 1}, [4]),
+    ({"open": False, "recipient.id": "10"}, [3]),
+    ({"count": 2}, [3]),
+    ({"count": "2"}, [4]),
+    ({"tags": "y"}, [1]),
+    ({"messages.message_id": "m2"}, [4]),
+    ({"snoozed": None}, [1, 2, 3, 4, 5]),
+    ({"closed_at": {"$exists": True}}, [2, 3, 5]),
+    ({"closed_at": {"$exists": False}}, [1, 4]),
+    ({"count": {"$gt": 1, "$lte": 3}}, [1, 3]),
+    ({"closed_at": {"$lt": "2024-01-03"}}, [2]),
+    ({"count": {"$in": [1, 5, "2"]}}, [2, 4, 5]),
+    ({"open": {"$in": [True]}}, [1]),
+    ({"key": {"$ne": "a"}}, [2, 3, 4, 5]),
+    ({"key": {"$regex": "^[ab]"}}, [1, 2]),
+    ({"_id": {"$in": [2, 4]}}, [2, 4]),
+    ({"$and": [{"open": False}, {"count": {"$gte": 2}}]}, [3, 5]),
+    ({"$or": [{"key": "a"}, {"recipient.id": "11"}]}, [1, 2]),
+    ({"$or": [{"key": "a"}, {"key": {"$regex": "e"}}]}, [1, 5]),
+    (
+        {
+            "$and": [
+                {"open": False},
+                {
+                    "$or": [
+                        {"closed_at": {"$lt": "2024-01-03"}},
+                        {"closed_at": "2024-01-03", "_id": {"$lt": 5}},
+                    ]
+                },
+            ]
+        },
+        [2, 3],
+    ),
+]
+
+
+@pytest.mark.parametrize("query, expected", QUERIES, ids=[str(q) for q, _ in QUERIES])
+def test_find_and_count(run, query, expected):
+    async def test(collection):
+        docs = await collection.find(query).to_list(None)
+        assert sorted(doc["_id"] for doc in docs) == expected
+        assert await collection.count_documents(query) == len(expected)
+
+    run(test)
+
+
+def test_sort_skip_and_limit(run):
+    async def test(collection):
+        query = {"open": False}
+        sort = [("closed_at", -1), ("_id", -1)]
+        docs = await collection.find(query, sort=sort).to_list(None)
+        assert [doc["_id"] for doc in docs] == [5, 3, 2]
+        docs = await collection.find(query, sort=sort, skip=1, limit=1).to_list(None)
+        assert [doc["_id"] for doc in docs] == [3]
+        docs = await collection.find({"key": {"$regex": "[a-e]"}}).sort("count", 1).limit(2).to_list(None)
+        assert [doc["_id"] for doc in docs] == [2, 3]
+
+    run(test)
+
+
+def test_log_stream_pages(run):
+    async def test(collection):
+        stream = LogStream(collection, {"open": False}, page_size=2, projection={"key": 1})
+        assert [doc["key"] for doc in await stream.next_page()] == ["e", "c"]
+        assert [doc["key"] for doc in await stream.next_page()] == ["b"]
+        assert stream.exhausted
+        assert await stream.count() == 3
+
+    run(test)
+
+
+def test_projection(run):
+    async def test(collection):
+        doc = await collection.find_one({"_id": 1}, {"key": 1, "recipient.id": 1})
+        assert doc == {"_id": 1, "key": "a", "recipient": {"id": "10"}}
+        doc = await collection.find_one({"_id": 1}, {"key": 1, "_id": 0})
+        assert doc == {"key": "a"}
+        doc = await collection.find_one({"_id": 2}, {"recipient": 0, "closed_at": 0})
+        assert doc == {"_id": 2, "key": "b", "open": False, "count": 1}
+        doc = await collection.find_one({"_id": 4}, {"messages": {"$slice": -1}})
+        assert doc["messages"] == [{"message_id": "m2"}]
+        assert doc["key"] == "d"
+
+    run(test)
+
+
+def test_updates(run):
+    async def test(collection):
+        await collection.update_one(
+            {"_id": 1},
+            {
+                "$set": {"recipient.name": "user"},
+                "$inc": {"count": 2},
+                "$push": {"tags": {"$each": ["z", "x"]}},
+                "$unset": {"open": 1},
+            },
+        )
+        doc = await collection.find_one({"_id": 1})
+        assert doc["recipient"] == {"id": "10", "name": "user"}
+        assert doc["count"] == 5
+        assert doc["tags"] == ["x", "y", "z", "x"]
+        assert "open" not in doc
+
+        await collection.update_one({"_id": 1}, {"$addToSet": {"tags": "y"}, "$pull": {"tags": "x"}})
+        assert (await collection.find_one({"_id": 1}))["tags"] == ["y", "z"]
+        await collection.update_one({"_id": 4}, {"$pull": {"messages": {"message_id": "m1"}}})
+        assert (await collection.find_one({"_id": 4}))["messages"] == [{"message_id": "m2"}]
+
+        result = await collection.update_many({"open": False}, {"$set": {"archived": True}})
+        assert (result.matched_count, result.modified_count) == (3, 3)
+        result = await collection.update_many({"open": False}, {"$set": {"archived": True}})
+        assert (result.matched_count, result.modified_count) == (3, 0)
+
+    run(test)
+
+
+def test_upserts(run):
+    async def test(collection):
+        result = await collection.update_one(
+            {"_id": 6, "recipient.id": "12"},
+            {"$setOnInsert": {"created": True}, "$inc": {"count": 1}},
+            upsert=True,
+        )
+        assert result.upserted_id == 6
+        doc = await collection.find_one({"_id": 6})
+        assert doc == {"_id": 6, "recipient": {"id": "12"}, "created": True, "count": 1}
+
+        await collection.update_one(
+            {"_id": 6}, {"$setOnInsert": {"created": False}, "$inc": {"count": 1}}, upsert=True
+        )
+        assert await collection.find_one({"_id": 6}, {"_id": 0, "created": 1, "count": 1}) == {
+            "created": True,
+            "count": 2,
+        }
+
+        await collection.bulk_write(
+            [
+                UpdateOne({"_id": 7}, {"$set": {"key": "g"}}, upsert=True),
+                UpdateOne({"_id": 1}, {"$inc": {"count": 1}}),
+            ]
+        )
+        assert (await collection.find_one({"_id": 7}))["key"] == "g"
+        assert (await collection.find_one({"_id": 1}))["count"] == 4
+
+    run(test)
+
+
+def test_find_one_and_update(run):
+    async def test(collection):
+        before = await collection.find_one_and_update(
+            {"open": False}, {"$inc": {"count": 10}}, sort=[("count", 1)]
+        )
+        assert (before["_id"], before["count"]) == (2, 1)
+        after = await collection.find_one_and_update(
+            {"_id": 2}, {"$inc": {"count": 10}}, {"count": 1}, return_document=ReturnDocument.AFTER
+        )
+        assert after == {"_id": 2, "count": 21}
+        assert await collection.find_one_and_update({"_id": 99}, {"$set": {"key": "z"}}) is None
+
+    run(test)
+
+
+def test_replace_and_delete(run):
+    async def test(collection):
+        replacement = {"key": "A", "open": True}
+        result = await collection.replace_one({"key": "a"}, replacement)
+        assert (result.matched_count, result.modified_count) == (1, 1)
+        assert replacement == {"key": "A", "open": True}
+        assert await collection.find_one({"_id": 1}) == {"_id": 1, "key": "A", "open": True}
+
+        result = await collection.replace_one({"_id": 8}, {"key": "h"}, upsert=True)
+        assert result.upserted_id == 8
+
+        assert (await collection.delete_many({"open": False})).deleted_count == 3
+        assert (await collection.delete_one({"key": {"$in": ["A", "d"]}})).deleted_count == 1
+        assert await collection.count_documents({}) == 2
+
+    run(test)
+
+
+def test_distinct(run):
+    async def test(collection):
+        assert sorted(await collection.distinct("recipient.id")) == ["10", "11"]
+        assert sorted(await collection.distinct("_id", {"open": False})) == [2, 3, 5]
+
+    run(test)
+
+
+def test_sqlite_evaluates_log_stream_pages(tmp_path):
+    async def main():
+        db = SQLiteDatabase(str(tmp_path / "modmail.db"))
+        try:
+            logs = db.logs
+            await logs.create_index([("guild_id", 1), ("closed_at", -1)])
+            query = {
+                "$and": [
+                    {"guild_id": "0", "open": False},
+                    {"$or": [{"closed_at": {"$lt": "x"}}, {"closed_at": "x", "_id": {"$lt": 1}}]},
+                ]
+            }
+            where, params, exact = logs._where(query)
+            assert "closed_at" in where and "guild_id" in where
+            assert params[0] == "0"
+            assert not exact
+            plan = " ".join(await logs.find(query, sort=[("closed_at", -1), ("_id", -1)]).explain())
+            assert "USING INDEX" in plan
+
+            assert logs._where(
+                {"$and": [{"guild_id": "0"}, {"$or": [{"closed_at": "x"}, {"closed_at": "y"}]}]}
+            )[2]
+        finally:
+            await db.close()
+
+    asyncio.run(main())
@@ -0,0 +1,42 @@
+import asyncio
+
+from core.clients import LogWriteBuffer
+from core.models import LogWriteError
+
+
+class FlakyClient:
+    """Fails to write the messages of `failing` channels once."""
+
+    def __init__(self, *failing):
+        self.failing = set(failing)
+        self.logs = {}
+
+    async def write_log_messages(self, batch):
+        unwritten = {cid: entries for cid, entries in batch.items() if cid in self.failing}
+        for cid, entries in batch.items():
+            if cid not in unwritten:
+                self.logs.setdefault(cid, []).extend(e["message_id"] for e in entries)
+        self.failing.clear()
+        if unwritten:
+            raise LogWriteError("Failed.", unwritten)
+
+
+def test_partial_failure_retries_only_unwritten_messages():
+    async def main():
+        client = FlakyClient("2")
+        buffer = LogWriteBuffer(client, max_delay=60)
+        for cid, message_id in [("1", "a"), ("2", "b"), ("1", "c"), ("2", "d")]:
+            buffer.push(cid, {"message_id": message_id})
+
+        await buffer.flush()
+        assert client.logs == {"1": ["a", "c"]}
+        assert buffer.depth == 2
+        assert "b" in buffer and "a" not in buffer
+
+        buffer.push("2", {"message_id": "e"})
+        await buffer.flush()
+        assert client.logs == {"1": ["a", "c"], "2": ["b", "d", "e"]}
+        assert buffer.depth == 0
+        assert buffer.written_count == 5
+
+    asyncio.run(main())
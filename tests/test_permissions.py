@@ -0,0 +1,108 @@
+import asyncio
+from types import SimpleNamespace
+
+import discord
+from discord.ext import commands
+
+from bot import ModmailBot
+from core.checks import PermissionCache, check_permissions, has_permissions_predicate
+from core.config import ConfigManager
+from core.models import PermissionLevel
+
+
+class Member:
+    def __init__(self, id_: int, roles: list):
+        self.id = id_
+        self.roles = roles
+
+
+def make_context(roles=(1, 2)):
+    """A context of an author with `roles`, for a bot whose supporters have role 2."""
+    guild = SimpleNamespace(id=1)
+    command = SimpleNamespace(checks=[has_permissions_predicate(PermissionLevel.SUPPORTER)])
+
+    async def is_owner(user):
+        return False
+
+    bot = SimpleNamespace(
+        config=ConfigManager(None),
+        permission_cache=PermissionCache(),
+        blocks=SimpleNamespace(invalidate=lambda user_id: None),
+        user=SimpleNamespace(id=0),
+        modmail_guild=guild,
+        is_owner=is_owner,
+        get_command=lambda name: command,
+    )
+    bot.config.populate_cache()
+    bot.command_perm = lambda name: ModmailBot.command_perm(bot, name)
+    bot.config["level_permissions"] = {"SUPPORTER": ["2"]}
+
+    author = Member(42, [discord.Object(id=n) for n in roles])
+    channel = SimpleNamespace(permissions_for=lambda member: SimpleNamespace(administrator=False))
+    return SimpleNamespace(bot=bot, author=author, guild=guild, channel=channel)
+
+
+def test_decisions_are_remembered():
+    async def main():
+        ctx = make_context()
+        cache = ctx.bot.permission_cache
+        assert await check_permissions(ctx, "reply")
+        assert await check_permissions(ctx, "reply")
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    asyncio.run(main())
+
+
+def test_changing_roles_drops_the_decision():
+    async def main():
+        ctx = make_context()
+        cache = ctx.bot.permission_cache
+        assert await check_permissions(ctx, "reply")
+
+        before = Member(ctx.author.id, list(ctx.author.roles))
+        ctx.author.roles = [discord.Object(id=1)]
+        assert not await check_permissions(ctx, "reply")
+        assert cache.misses == 2
+
+        await ModmailBot.on_member_update(ctx.bot, before, ctx.author)
+        assert len(cache) == 0
+
+    asyncio.run(main())
+
+
+def test_only_permission_configurations_drop_the_decisions():
+    async def main():
+        ctx = make_context()
+        cache = ctx.bot.permission_cache
+        config = ctx.bot.config
+        generation = config.generation_of(*PermissionCache.CONFIG_KEYS)
+        assert await check_permissions(ctx, "reply")
+
+        config["main_color"] = "#123456"
+        assert config.generation_of(*PermissionCache.CONFIG_KEYS) == generation
+        assert await check_permissions(ctx, "reply")
+        assert cache.misses == 1
+
+        config["level_permissions"] = {"SUPPORTER": ["-1"]}
+        assert config.generation_of(*PermissionCache.CONFIG_KEYS) != generation
+        assert not await check_permissions(ctx, "reply")
+        assert cache.misses == 2
+
+    asyncio.run(main())
+
+
+def test_adding_and_removing_cogs_drops_the_decisions():
+    async def main():
+        bot = ModmailBot.__new__(ModmailBot)
+        commands.Bot.__init__(bot, command_prefix="?", intents=discord.Intents.none())
+        bot.permission_cache = PermissionCache()
+
+        bot.permission_cache.set((42, 1, 0, "reply"), True)
+        await bot.add_cog(commands.Cog(name="Test"))
+        assert len(bot.permission_cache) == 0
+
+        bot.permission_cache.set((42, 1, 0, "reply"), True)
+        await bot.remove_cog("Test")
+        assert len(bot.permission_cache) == 0
+
+    asyncio.run(main())
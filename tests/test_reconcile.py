@@ -0,0 +1,69 @@
+import asyncio
+import logging
+from datetime import timedelta
+from types import SimpleNamespace
+
+import discord
+
+from core.profiler import StartupProfiler
+from core.reconcile import StartupReconciler
+
+
+class Api:
+    def __init__(self, open_logs):
+        self.open_logs = open_logs
+        self.batches = []
+
+    async def get_open_logs(self, projection):
+        return self.open_logs
+
+    async def close_logs(self, logs, data):
+        self.batches.append(len(logs))
+        return len(logs)
+
+
+def make_bot(open_logs, closures=(), snoozes=0):
+    async def load_closures():
+        return list(closures)
+
+    async def load_snoozes():
+        if snoozes is None:
+            raise RuntimeError("snoozes are unavailable")
+        return snoozes
+
+    user = SimpleNamespace(
+        id=0, name="bot", discriminator="0", display_avatar=SimpleNamespace(url="https://example.com")
+    )
+    return SimpleNamespace(
+        api=Api(open_logs),
+        threads=SimpleNamespace(load_closures=load_closures, load_snoozes=load_snoozes),
+        startup_profiler=StartupProfiler(),
+        get_channel=lambda channel_id: object() if channel_id == 1 else None,
+        user=user,
+    )
+
+
+def test_orphaned_logs_are_closed_in_batches(monkeypatch, caplog):
+    monkeypatch.setattr(StartupReconciler, "ORPHAN_BATCH_SIZE", 2)
+    logs = [{"_id": n, "channel_id": str(n)} for n in range(1, 7)]
+    now = discord.utils.utcnow()
+    bot = make_bot(logs, closures=[{"due": now - timedelta(hours=1)}, {"due": now + timedelta(hours=1)}])
+
+    with caplog.at_level(logging.INFO, logger="core.reconcile"):
+        totals = asyncio.run(StartupReconciler(bot).run())
+
+    assert bot.api.batches == [2, 2, 1]
+    assert totals == {"closures": 2, "overdue closures": 1, "snoozes": 0, "orphaned logs": 5}
+    assert "Closed 4 orphaned log(s), 4 of 5 checked." in caplog.text
+    for name in ("closures", "snoozes", "orphaned logs"):
+        assert f"Startup reconciliation of {name} done" in caplog.text
+
+
+def test_failed_job_does_not_stop_the_others(caplog):
+    bot = make_bot([{"_id": 1, "channel_id": "2"}], snoozes=None)
+
+    with caplog.at_level(logging.INFO, logger="core.reconcile"):
+        totals = asyncio.run(StartupReconciler(bot).run())
+
+    assert totals == {"closures": 0, "overdue closures": 0, "orphaned logs": 1}
+    assert "Failed to reconcile snoozes at startup." in caplog.text
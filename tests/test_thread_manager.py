@@ -0,0 +1,100 @@
+import asyncio
+from types import SimpleNamespace
+
+import discord
+
+from core.thread import Thread, ThreadManager
+
+
+class Channel(discord.TextChannel):
+    """A text channel without a connection, whose topic edits are recorded."""
+
+    def __init__(self, id_, topic):
+        self.id = id_
+        self.topic = topic
+        self.edits = []
+
+    async def edit(self, **fields):
+        self.edits.append(fields)
+        self.topic = fields.get("topic", self.topic)
+
+
+class Guild:
+    def __init__(self, channels):
+        self.channels = channels
+        self.scans = 0
+
+    @property
+    def text_channels(self):
+        self.scans += 1
+        return self.channels
+
+
+def make_manager(channels=()):
+    guild = Guild(list(channels))
+    return ThreadManager(SimpleNamespace(modmail_guild=guild))
+
+
+def test_non_recipients_are_bounded():
+    async def main():
+        manager = make_manager()
+        manager.NON_RECIPIENTS_SIZE = 2
+        guild = manager.bot.modmail_guild
+        for user_id in (1, 2, 1, 3):
+            assert await manager.find(recipient_id=user_id) is None
+        assert guild.scans == 3
+        # 2 was seen least recently
+        assert list(manager._non_recipients) == [1, 3]
+        assert await manager.find(recipient_id=2) is None
+        assert guild.scans == 4
+
+    asyncio.run(main())
+
+
+def test_find_by_channel_compares_the_topic_user_id():
+    async def main():
+        manager = make_manager()
+        thread_id = 123456789012345678
+        channel = Channel(100, f"User ID: {thread_id}9")
+        manager.cache[thread_id] = Thread(manager, thread_id, channel)
+
+        assert (await manager.find(channel=channel)).id == thread_id
+        # "User ID: <thread ID>" is part of the topic, but the topic names another user
+        assert channel.edits == [{"topic": f"User ID: {thread_id}"}]
+
+        channel.edits.clear()
+        assert (await manager.find(channel=channel)).id == thread_id
+        assert channel.edits == []
+
+    asyncio.run(main())
+
+
+def test_automatic_unsnooze_notifies_the_channel():
+    async def main():
+        manager = make_manager()
+        channel = Channel(500, "")
+        channel.sent = []
+
+        async def send(content):
+            channel.sent.append(content)
+
+        async def restore_from_snooze():
+            thread.snoozed = False
+            return True
+
+        thread = SimpleNamespace(
+            snoozed=True,
+            snooze_data={"category_id": 1},
+            channel=channel,
+            restore_from_snooze=restore_from_snooze,
+        )
+        channel.send = send
+
+        async def find(recipient_id):
+            return thread if recipient_id == 42 else None
+
+        manager.find = find
+        await manager._run_unsnooze(42, None)
+        assert channel.sent == ["⏰ This thread has been automatically unsnoozed."]
+
+    asyncio.run(main())
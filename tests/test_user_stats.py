@@ -0,0 +1,54 @@
+import asyncio
+from types import SimpleNamespace
+
+
+def user(id_):
+    return SimpleNamespace(id=id_, name=f"user{id_}", discriminator="0", display_avatar=None)
+
+
+def test_stats_follow_logs(sqlite_client):
+    async def main():
+        api = sqlite_client
+        try:
+            await api.setup_indexes()
+            recipient = user(5)
+            await api.create_log_entry(recipient, SimpleNamespace(id=100), recipient)
+            stats = await api.get_user_stats(5)
+            assert (stats["thread_count"], stats["closed_count"], stats["open"]) == (1, 0, True)
+            assert "incomplete" not in stats
+
+            closed = {"open": False, "closed_at": "2024-01-01 00:00:00+00:00"}
+            await api.post_log(100, closed)
+            # closing a log again doesn't count it twice
+            await api.post_log(100, closed)
+            stats = await api.get_user_stats(5)
+            assert (stats["thread_count"], stats["closed_count"], stats["open"]) == (1, 1, False)
+            assert stats["last_closed_at"] == closed["closed_at"]
+        finally:
+            await api.db.close()
+
+    asyncio.run(main())
+
+
+def test_stats_of_earlier_threads_are_computed_once(sqlite_client):
+    async def main():
+        api = sqlite_client
+        try:
+            await api.setup_indexes()
+            # threads from before the statistics were kept
+            await api.logs.insert_many(
+                [
+                    {"key": "a", "open": False, "recipient": {"id": "5"}, "guild_id": "1", "closed_at": "1"},
+                    {"key": "b", "open": False, "recipient": {"id": "5"}, "guild_id": "1", "closed_at": "2"},
+                ]
+            )
+            recipient = user(5)
+            await api.create_log_entry(recipient, SimpleNamespace(id=100), recipient)
+            stats = await api.get_user_stats(5)
+            assert (stats["thread_count"], stats["closed_count"], stats["open"]) == (3, 2, True)
+            assert stats["last_closed_at"] == "2"
+            assert "incomplete" not in stats
+        finally:
+            await api.db.close()
+
+    asyncio.run(main())